@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import List, Literal
 
@@ -14,12 +14,19 @@ class PathsConfig:
     data_dir: Path = BASE_DIR / "data"
     uploads_dir: Path = BASE_DIR / "data" / "uploads"
     vector_store_dir: Path = BASE_DIR / "data" / "vector_store"
-    leads_csv: Path = BASE_DIR / "data" / "leads.csv"
+    leads_db: Path = BASE_DIR / "data" / "leads.sqlite"
+    leads_csv: Path = BASE_DIR / "data" / "leads.csv"  # CSV store before leads_db; imported once
+    embedding_cache_dir: Path = BASE_DIR / "data" / "embedding_cache"
+    answer_cache_db: Path = BASE_DIR / "data" / "answer_cache.sqlite"
+    traces_jsonl: Path = BASE_DIR / "data" / "traces.jsonl"
+    sessions_db: Path = BASE_DIR / "data" / "sessions.sqlite"
+    analytics_db: Path = BASE_DIR / "data" / "analytics.sqlite"
 
     def ensure(self) -> None:
         self.data_dir.mkdir(exist_ok=True, parents=True)
         self.uploads_dir.mkdir(exist_ok=True, parents=True)
         self.vector_store_dir.mkdir(exist_ok=True, parents=True)
+        self.embedding_cache_dir.mkdir(exist_ok=True, parents=True)
 
 
 @dataclass
@@ -27,15 +34,98 @@ class LLMConfig:
     provider: str = os.getenv("LLM_PROVIDER", "dummy")  # "openai", "dummy", etc.
     model_name: str = os.getenv("LLM_MODEL", "gpt-4o-mini")
     api_key: str | None = os.getenv("LLM_API_KEY")  # or taken from st.secrets
+    # Pooled async HTTP client (services/async_llm_client.py), used for "openai".
+    async_client: bool = os.getenv("LLM_ASYNC_CLIENT", "1") == "1"
+    base_url: str = os.getenv("LLM_BASE_URL", "https://api.openai.com/v1")  # any OpenAI-compatible API
+    timeout_s: float = 60.0  # per request (read / write / pool)
+    connect_timeout_s: float = 5.0
+    max_retries: int = 3  # on 429 / 5xx / connection errors
+    backoff_base_s: float = 0.5  # jittered exponential backoff: base * 2**attempt
+    backoff_max_s: float = 8.0
+    max_concurrency: int = 8  # in-flight requests (and pooled connections) per process
+    rate_limit_rps: float = 5.0  # token bucket refill rate, 0 = unlimited
+    rate_limit_burst: int = 10  # token bucket capacity
 
 
 @dataclass
 class RAGConfig:
     embedding_model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
+    fallback_embedding: str = "ngram"  # used without SentenceTransformer: "ngram" or "bytes"
+    fallback_embedding_dim: int = 768
+    index_metric: str = "cosine"  # "cosine" (unit vectors, inner product) or "l2"
+    # Index factory: "auto" picks flat / HNSW / IVF-PQ from the chunk count.
+    index_type: str = "auto"  # "auto", "flat", "hnsw" or "ivfpq"
+    hnsw_min_vectors: int = 50_000  # auto: flat below this
+    ivfpq_min_vectors: int = 1_000_000  # auto: HNSW below this, IVF-PQ above
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 80
+    hnsw_ef_search: int = 128  # higher = better recall, slower queries
+    ivf_nlist: int = 0  # 0 = 4 * sqrt(n_vectors)
+    ivf_nprobe: int = 16  # lists scanned per query
+    ivf_train_sample: int = 100_000  # vectors sampled to train IVF-PQ
+    pq_m: int = 0  # PQ sub-quantizers, 0 = dim / 8
+    pq_nbits: int = 8
     top_k: int = 5
     score_threshold: float = 0.35  # filter low-similarity chunks
+    # Hybrid search: BM25 keyword matches (exact plan names, codes, prices) fused
+    # with vector hits by reciprocal rank; scores are then fused ranks in [0, 1].
+    hybrid_search: bool = True
+    hybrid_candidates: int = 20  # hits taken from each retriever before fusion
+    rrf_k: int = 60  # reciprocal-rank fusion constant: 1 / (rrf_k + rank)
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
+    # Re-ranking: RAGChain fetches `rerank_candidates` hits and keeps the best top_k.
+    reranker: str = "mmr"  # "mmr" (diversity), "cross_encoder" (local model, else mmr) or "none"
+    reranker_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    rerank_candidates: int = 50
+    rerank_batch_size: int = 16  # (question, chunk) pairs per cross-encoder call
+    rerank_budget_ms: float = 150.0  # over budget: keep the retrieval order
+    rerank_mmr_lambda: float = 0.7  # 1 = relevance only, 0 = diversity only
+    rerank_cache_entries: int = 20_000  # cached cross-encoder scores
+    chunker: str = "structure"  # "structure" (headings / paragraphs / sentences) or "fixed" (char window)
     chunk_size_chars: int = 1200
     chunk_overlap_chars: int = 250
+    incremental_ingestion: bool = True  # only re-embed new / changed documents
+    ingestion_workers: int = 0  # PDF parser processes, 0 = min(4, CPUs), 1 = in-process
+    ingestion_queue_size: int = 8  # parsed files buffered ahead of the embedder
+    embed_batch_size: int = 256  # chunks embedded and added to the index at a time
+    embedding_cache_entries: int = 50_000  # on-disk embedding cache size (0 = memory only)
+    embedding_cache_memory_entries: int = 4096  # in-memory LRU in front of the disk cache
+    answer_cache_enabled: bool = True  # semantic cache of final answers in front of the LLM
+    answer_cache_threshold: float = 0.92  # min cosine similarity between questions for a hit
+    answer_cache_ttl_s: float = 86_400.0  # 0 = never expire
+    answer_cache_entries: int = 5000  # LRU-evicted above this
+    context_max_tokens: int = 1500  # token budget for retrieved context in the prompt
+    context_merge_neighbours: bool = True  # merge adjacent chunks of a page, dropping their overlap
+
+
+@dataclass
+class TracingConfig:
+    enabled: bool = os.getenv("TRACING_ENABLED", "1") == "1"
+    jsonl_export: bool = os.getenv("TRACE_JSONL", "0") == "1"  # append turns to paths.traces_jsonl
+    prometheus_port: int = int(os.getenv("METRICS_PORT", "0"))  # /metrics endpoint, 0 = off
+
+
+@dataclass
+class SessionConfig:
+    # Per-session agent state and chat history (services/session_store.py).
+    # "sqlite" is shared by workers on one host, "redis" by workers anywhere.
+    backend: str = os.getenv("SESSION_BACKEND", "sqlite")  # "memory", "sqlite" or "redis"
+    ttl_s: float = float(os.getenv("SESSION_TTL_S", "86400"))  # idle sessions expire, 0 = never
+    redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    max_history_messages: int = 50  # chat messages kept per session, 0 = all
+
+
+@dataclass
+class IntentConfig:
+    # Niche keyword packs for the intent classifier (rag_pipeline/intent_classifier.py),
+    # added to the built-in sales / support / chit-chat terms.
+    keyword_packs: Path = Path(os.getenv("INTENT_KEYWORD_PACKS", str(BASE_DIR / "app" / "intent_keywords.json")))
+    # "embedding" classifies with the retrieval model (nearest intent centroid of
+    # `examples`), reusing the turn's query vector; keywords decide when it is unsure.
+    mode: str = os.getenv("INTENT_MODE", "keywords")  # "keywords" or "embedding"
+    examples: Path = Path(os.getenv("INTENT_EXAMPLES", str(BASE_DIR / "app" / "intent_examples.json")))
+    min_confidence: float = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.05"))  # cosine margin over the runner-up
 
 
 @dataclass
@@ -47,6 +137,9 @@ class AppConfig:
     default_niche: str
     themes: List[Literal["Dark", "Light"]]
     default_theme: Literal["Dark", "Light"]
+    tracing: TracingConfig = field(default_factory=TracingConfig)
+    session: SessionConfig = field(default_factory=SessionConfig)
+    intent: IntentConfig = field(default_factory=IntentConfig)
 
 
 def load_config() -> AppConfig:
@@ -15,7 +15,9 @@ if str(ROOT_DIR) not in sys.path:
 # Imports
 # -------------------------------------------------------------------------
 import logging
-from typing import List, Dict
+import time
+import uuid
+from typing import List
 
 import streamlit as st
 
@@ -23,10 +25,12 @@ from app.config import load_config
 from rag_pipeline.ingestion import IngestionEngine
 from rag_pipeline.retrieval import VectorStore
 from rag_pipeline.rag_chain import RAGChain
-from rag_pipeline.agent import Agent
-from services.llm_client import get_llm_client
-from services.lead_store import LeadStore
-from services.analytics import AnalyticsStore
+from rag_pipeline.context_packer import ContextPacker
+from rag_pipeline.query_context import QueryContext
+from rag_pipeline.agent import Agent, get_embedding_intent_classifier, get_intent_classifier
+from rag_pipeline.registry import get_registry
+from services.session_store import SessionState
+from services.tracing import configure_tracer
 from ui.styling import APP_CSS
 
 # -------------------------------------------------------------------------
@@ -38,6 +42,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+LEADS_PAGE_SIZE = 50
+
 # -------------------------------------------------------------------------
 # Streamlit page config
 # -------------------------------------------------------------------------
@@ -54,24 +60,52 @@ st.markdown(APP_CSS, unsafe_allow_html=True)
 # Load config + initialize core components
 # -------------------------------------------------------------------------
 cfg = load_config()
-llm_client, llm_label = get_llm_client(cfg.llm)
-
-ingestion_engine = IngestionEngine(cfg.paths, cfg.rag)
-vector_store = VectorStore(cfg.paths, cfg.rag)
-vector_store.load()  # safe even if index not built yet
 
-rag_chain = RAGChain(llm_client, vector_store)
-agent = Agent()
-lead_store = LeadStore(cfg.paths.leads_csv)
-analytics = AnalyticsStore()
+# Heavy resources (embedding model, FAISS index, LLM client) live in a
+# process-wide registry so Streamlit reruns and concurrent sessions reuse them.
+registry = get_registry()
+tracer = configure_tracer(
+    jsonl_path=cfg.paths.traces_jsonl if cfg.tracing.jsonl_export else None,
+    prometheus_port=cfg.tracing.prometheus_port,
+    enabled=cfg.tracing.enabled,
+)
+llm_client, llm_label = registry.llm_client(cfg.llm)
+
+# The embedding model (Torch), FAISS index and answer cache load in a
+# background thread; until then the page renders without them and shows a
+# "warming up" banner instead of blocking the first paint.
+registry.warm_up(cfg.paths, cfg.rag)
+warm = registry.is_warm()
+context_packer = ContextPacker(cfg.rag.context_max_tokens, cfg.rag.context_merge_neighbours)
+ingestion_engine: IngestionEngine | None = None
+vector_store: VectorStore | None = None
+answer_cache = None
+reranker = None
+rag_chain: RAGChain | None = None
+if warm:
+    ingestion_engine = IngestionEngine(cfg.paths, cfg.rag, registry=registry)
+    vector_store = registry.vector_store(cfg.paths, cfg.rag)
+    answer_cache = registry.answer_cache(cfg.paths, cfg.rag)
+    reranker = registry.reranker(cfg.paths, cfg.rag)
+    rag_chain = RAGChain(llm_client, vector_store, answer_cache=answer_cache, packer=context_packer, reranker=reranker)
+lead_store = registry.lead_store(cfg.paths)
+analytics = registry.analytics_store(cfg.paths)
+session_store = registry.session_store(cfg.paths, cfg.session)
 
 # -------------------------------------------------------------------------
 # Session state
 # -------------------------------------------------------------------------
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history: List[Dict[str, str]] = []
-if "questions_count" not in st.session_state:
-    st.session_state.questions_count = 0
+# Chat history and lead progress live in the session store, keyed by a
+# random session id generated server-side and kept in st.session_state.
+# The id is never taken from the URL: anyone with a shared link could
+# otherwise resume (and read) someone else's conversation.
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if "sid" in st.query_params:  # links from the old URL-keyed sessions
+    del st.query_params["sid"]
+session_id = st.session_state.session_id
+session = session_store.get(session_id) or SessionState()
+
 if "niche" not in st.session_state:
     st.session_state.niche = cfg.default_niche
 
@@ -81,6 +115,17 @@ if "niche" not in st.session_state:
 with st.sidebar:
     st.markdown("#### Niche")
     st.session_state.niche = st.selectbox("Business niche", cfg.niches, index=0)
+    if cfg.intent.mode == "embedding" and vector_store is not None:
+        classifier = get_embedding_intent_classifier(
+            vector_store.embedder,
+            st.session_state.niche,
+            cfg.intent.examples,
+            cfg.intent.keyword_packs,
+            cfg.intent.min_confidence,
+        )
+    else:
+        classifier = get_intent_classifier(st.session_state.niche, cfg.intent.keyword_packs)
+    agent = Agent(session.lead, classifier=classifier)
 
     st.markdown("---")
     st.markdown("#### Upload business docs")
@@ -102,14 +147,32 @@ with st.sidebar:
     st.caption("Upload pricing, services, and policy docs to power the assistant.")
 
     st.markdown("---")
-    if st.button("⚙️ Index uploaded docs", use_container_width=True):
+    if st.button("⚙️ Index uploaded docs", use_container_width=True, disabled=not warm):
         if not uploaded_paths:
             st.error("Please upload at least one document to index.")
         else:
+            progress_bar = st.progress(0.0, text="Indexing documents into the vector store...")
+
+            def _show_progress(p) -> None:
+                done = p.files_done / p.files_total if p.files_total else 1.0
+                progress_bar.progress(
+                    min(done, 1.0),
+                    text=(
+                        f"{p.files_done}/{p.files_total} files · {p.pages} pages · "
+                        f"{p.embedded}/{p.chunks} chunks embedded "
+                        f"({p.embeddings_per_sec:.0f} emb/s)"
+                    ),
+                )
+
             with st.spinner("Indexing documents into the vector store..."):
-                n_chunks = ingestion_engine.ingest_files(uploaded_paths)
+                n_chunks = ingestion_engine.ingest_files(uploaded_paths, progress=_show_progress)
+                progress_bar.empty()
                 if n_chunks > 0:
-                    vector_store.load()
+                    # ingest_files() invalidated the cached store; fetch the fresh one.
+                    vector_store = registry.vector_store(cfg.paths, cfg.rag)
+                    rag_chain = RAGChain(
+                        llm_client, vector_store, answer_cache=answer_cache, packer=context_packer, reranker=reranker
+                    )
                     st.success(
                         f"Indexed {len(uploaded_paths)} file(s) into {n_chunks} chunks."
                     )
@@ -117,8 +180,7 @@ with st.sidebar:
                     st.warning("No chunks were produced. Check that your docs contain text.")
 
     if st.button("🧹 Clear chat history", use_container_width=True):
-        st.session_state.chat_history = []
-        st.session_state.questions_count = 0
+        session_store.put(session_id, SessionState(lead=agent.lead_state))
         st.experimental_rerun()
 
     st.markdown("---")
@@ -157,13 +219,32 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# -------------------------------------------------------------------------
+# Warm-up banner
+# -------------------------------------------------------------------------
+if not warm:
+
+    @st.fragment(run_every=1.0)
+    def _warmup_banner() -> None:
+        # Polls without rerunning the page; one full rerun once resources are loaded.
+        if registry.is_warm():
+            st.rerun()
+        st.info(
+            "Warming up the embedding model and knowledge base… "
+            "Chat and indexing unlock in a moment; the dashboard is already live."
+        )
+
+    _warmup_banner()
+
 # -------------------------------------------------------------------------
 # KPIs / analytics base data
 # -------------------------------------------------------------------------
-lead_rows = lead_store.load_leads()
-n_leads = len(lead_rows)
-sales_count = sum(1 for r in analytics.records if r.intent == "sales")
-support_count = sum(1 for r in analytics.records if r.intent == "support")
+n_leads = lead_store.count()
+n_chunks_indexed = len(vector_store.chunks) if vector_store is not None else "…"
+# Pre-aggregated counters: constant cost per rerun however many turns are logged.
+intent_counts = analytics.get_intent_counts()
+sales_count = intent_counts.get("sales", 0)
+support_count = intent_counts.get("support", 0)
 
 # -------------------------------------------------------------------------
 # Main tabs: Workspace + Operations
@@ -178,7 +259,7 @@ with tab_workspace:
             f"""
         <div class="metric-card">
           <div class="metric-label">Files indexed</div>
-          <div class="metric-value">{len(vector_store.chunks)}</div>
+          <div class="metric-value">{n_chunks_indexed}</div>
         </div>
         """,
             unsafe_allow_html=True,
@@ -227,42 +308,49 @@ with tab_workspace:
             unsafe_allow_html=True,
         )
 
-        for msg in st.session_state.chat_history:
+        for msg in session.chat_history:
             avatar = "🧑" if msg["role"] == "user" else "🤖"
             with st.chat_message(msg["role"], avatar=avatar):
                 st.markdown(msg["content"])
 
         user_message = st.chat_input(
             "Ask a sales or support question about your business..."
+            if warm
+            else "Warming up the co‑pilot…",
+            disabled=not warm,
         )
 
         if user_message:
-            st.session_state.chat_history.append(
+            session.chat_history.append(
                 {"role": "user", "content": user_message}
             )
-            st.session_state.questions_count += 1
+            session.questions_count += 1
 
             with st.chat_message("user", avatar="🧑"):
                 st.markdown(user_message)
 
-            with st.chat_message("assistant", avatar="🤖"):
+            with st.chat_message("assistant", avatar="🤖"), tracer.trace("chat_turn") as turn:
                 with st.spinner("Thinking with your business docs..."):
-                    answer, retrieved, retrieved_ids = rag_chain.answer(
-                        user_message, st.session_state.chat_history
+                    # Embedded once, lazily, and shared by retrieval, the answer
+                    # cache and the embedding intent classifier.
+                    query = QueryContext(
+                        user_message, embed=vector_store.embed_queries, count_tokens=context_packer.counter.count
                     )
-                    final_answer, intent, lead_completed, lead_payload = agent.process_turn(
-                        user_message, answer
+                    answer_stream, retrieved, retrieved_ids = rag_chain.answer_stream(
+                        query, session.chat_history
                     )
-
-                    analytics.add_record(
-                        question=user_message,
-                        answer=final_answer,
-                        intent=intent.value,
-                        retrieved_ids=retrieved_ids,
-                    )
-
-                    if lead_completed and lead_payload is not None:
-                        summary = f"Lead from chat · niche={st.session_state.niche}"
+                # Tokens render as they arrive; the agent's lead follow-up is
+                # appended once the answer is complete.
+                answer = st.write_stream(answer_stream)
+                if not isinstance(answer, str):
+                    answer = "".join(str(part) for part in answer)
+                final_answer, intent, lead_completed, lead_payload = agent.process_turn(
+                    query, answer
+                )
+
+                if lead_completed and lead_payload is not None:
+                    summary = f"Lead from chat · niche={st.session_state.niche}"
+                    with tracer.span("lead_write"):
                         lead_store.append_lead(
                             source="chat",
                             name=lead_payload["name"],
@@ -271,20 +359,36 @@ with tab_workspace:
                             interest=lead_payload["interest"],
                             conversation_summary=summary,
                         )
-                        st.success(
-                            "Lead captured and stored. Review it in the Operations dashboard."
-                        )
-
-                    st.markdown(final_answer)
+                    tracer.incr("leads_captured_total")
+                    st.success(
+                        "Lead captured and stored. Review it in the Operations dashboard."
+                    )
 
-                    if retrieved:
-                        with st.expander("Sources used in this answer"):
-                            for rc in retrieved:
-                                meta = rc.metadata
-                                label = f"{meta.source}"
-                                if meta.page:
-                                    label += f", page {meta.page}"
-                                st.markdown(f"- **{label}**  \nScore: {rc.score:.2f}")
+                follow_up = final_answer[len(answer):]
+                if follow_up.strip():
+                    st.markdown(follow_up)
+
+                if retrieved:
+                    with st.expander("Sources used in this answer"):
+                        for rc in retrieved:
+                            meta = rc.metadata
+                            label = f"{meta.source}"
+                            if meta.page:
+                                label += f", page {meta.page}"
+                            st.markdown(f"- **{label}**  \nScore: {rc.score:.2f}")
+
+            session.chat_history.append({"role": "assistant", "content": final_answer})
+            session.lead = agent.lead_state  # process_turn() starts a new LeadState after a capture
+            session_store.put(session_id, session)
+
+            analytics.add_record(
+                question=user_message,
+                answer=final_answer,
+                intent=intent.value,
+                retrieved_ids=retrieved_ids,
+                trace={**turn.stage_totals(), "total": turn.total_ms},
+                niche=st.session_state.niche,
+            )
 
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -299,9 +403,9 @@ with tab_workspace:
 
         st.markdown(f"- **Niche:** {st.session_state.niche}")
         st.markdown(f"- **LLM backend:** {llm_label}")
-        st.markdown(f"- **Indexed chunks:** {len(vector_store.chunks)}")
+        st.markdown(f"- **Indexed chunks:** {n_chunks_indexed}")
         st.markdown(f"- **Total leads:** {n_leads}")
-        st.markdown(f"- **Questions this session:** {st.session_state.questions_count}")
+        st.markdown(f"- **Questions this session:** {session.questions_count}")
 
         st.markdown("---")
         st.markdown("**Intent mix**")
@@ -309,6 +413,9 @@ with tab_workspace:
         if intent_counts:
             for name, count in intent_counts.items():
                 st.markdown(f"- **{name}**: {count}")
+            # The current hour and the 23 before it: exactly 24 hourly buckets.
+            last_day = analytics.timeseries("hour", since=(int(time.time() // 3600) - 23) * 3600)
+            st.caption(f"{sum(n for _, n in last_day)} questions in the last 24 h")
         else:
             st.caption("No questions yet. Start chatting to see intent analytics.")
 
@@ -327,16 +434,23 @@ with tab_ops:
             unsafe_allow_html=True,
         )
 
-        if vector_store.chunks:
-            docs: Dict[str, int] = {}
-            for c in vector_store.chunks:
-                docs.setdefault(c.source, 0)
-                docs[c.source] += 1
+        docs = vector_store.source_counts() if vector_store is not None else {}
+        if not warm:
+            st.caption("Loading the knowledge base…")
+        elif docs:
             for name, count in docs.items():
                 st.markdown(f"- {name} · {count} chunks")
         else:
             st.info("No documents indexed yet. Upload and index files from the sidebar.")
 
+        if answer_cache is not None:
+            cache_stats = answer_cache.stats()
+            st.caption(
+                f"Answer cache: {cache_stats['entries']} answers · "
+                f"hit rate {cache_stats['hit_rate']:.0%} "
+                f"({cache_stats['hits']} hits / {cache_stats['misses']} misses)"
+            )
+
         st.markdown("</div>", unsafe_allow_html=True)
 
     # Leads CRM table
@@ -348,7 +462,13 @@ with tab_ops:
             unsafe_allow_html=True,
         )
 
-        if lead_rows:
+        if n_leads:
+            # One page at a time: the table never loads the whole store.
+            n_pages = -(-n_leads // LEADS_PAGE_SIZE)
+            page = st.number_input(
+                f"Page (of {n_pages}, newest first)", min_value=1, max_value=n_pages, value=1, step=1
+            )
+            lead_rows = lead_store.query(limit=LEADS_PAGE_SIZE, offset=(int(page) - 1) * LEADS_PAGE_SIZE)
             st.dataframe(lead_rows, hide_index=True, use_container_width=True)
         else:
             st.caption(
@@ -357,3 +477,42 @@ with tab_ops:
             )
 
         st.markdown("</div>", unsafe_allow_html=True)
+
+    # Latency breakdown
+    st.markdown('<div class="dash-panel">', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="panel-title">Latency breakdown</div>'
+        '<div class="panel-caption">Per-stage timings of the RAG pipeline in this worker process.</div>',
+        unsafe_allow_html=True,
+    )
+
+    stage_stats = tracer.summary()
+    if stage_stats:
+        st.dataframe(
+            [
+                {
+                    "stage": stage,
+                    "count": int(s["count"]),
+                    "p50 (ms)": round(s["p50_ms"], 1),
+                    "p95 (ms)": round(s["p95_ms"], 1),
+                    "p99 (ms)": round(s["p99_ms"], 1),
+                    "mean (ms)": round(s["mean_ms"], 1),
+                }
+                for stage, s in stage_stats.items()
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+        last_record = analytics.last_record()
+        if last_record is not None and last_record.trace:
+            last = last_record.trace
+            st.caption(
+                "Last turn: " + " · ".join(f"{stage} {ms:.0f} ms" for stage, ms in last.items())
+            )
+        counters = tracer.counters()
+        if counters:
+            st.caption(" · ".join(f"{name} = {value:g}" for name, value in sorted(counters.items())))
+    else:
+        st.caption("No timings yet. Ask a question or index documents to populate this panel.")
+
+    st.markdown("</div>", unsafe_allow_html=True)
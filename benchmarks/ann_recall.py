@@ -0,0 +1,114 @@
+"""
+Recall@k vs. latency of the ANN index tiers against the exact flat baseline.
+
+    python -m benchmarks.ann_recall --n 200000 --dim 384 --k 5
+    python -m benchmarks.ann_recall --n 50000 --out ann.json
+
+Vectors are synthetic clustered unit vectors (a stand-in for MiniLM
+embeddings). Every tier is built with rag_pipeline.vector_index.build_index,
+i.e. exactly what ingestion would build, and swept over its search knob.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from dataclasses import replace
+from typing import Dict, List
+
+import numpy as np
+
+from app.config import RAGConfig
+from rag_pipeline.vector_index import build_index, configure_search, index_type_of, prepare_vectors
+
+
+def synthetic_vectors(n: int, dim: int, n_clusters: int = 256, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32")
+    labels = rng.integers(0, n_clusters, size=n)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype("float32")
+    return prepare_vectors(vectors, "cosine")
+
+
+def _time_queries(index, queries: np.ndarray, k: int) -> Dict[str, float | np.ndarray]:
+    # One query at a time, like the chat path; latencies in milliseconds.
+    latencies = np.empty(len(queries))
+    ids = np.empty((len(queries), k), dtype="int64")
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, found = index.search(q.reshape(1, -1), k)
+        latencies[i] = (time.perf_counter() - start) * 1000
+        ids[i] = found[0]
+    return {
+        "ids": ids,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "qps": float(len(queries) / (latencies.sum() / 1000)),
+    }
+
+
+def _recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def run(n: int, dim: int, k: int, n_queries: int) -> List[Dict[str, float | str]]:
+    vectors = synthetic_vectors(n, dim)
+    queries = synthetic_vectors(n_queries, dim, seed=1)
+    ids = np.arange(n, dtype="int64")
+    base = RAGConfig()
+
+    results: List[Dict[str, float | str]] = []
+
+    def record(label: str, cfg: RAGConfig, index, build_s: float) -> None:
+        configure_search(index, cfg)
+        timing = _time_queries(index, queries, k)
+        row = {
+            "index": label,
+            f"recall@{k}": _recall(timing.pop("ids"), truth),
+            "build_s": build_s,
+            **timing,
+        }
+        results.append(row)
+        print(json.dumps(row))
+
+    start = time.perf_counter()
+    flat_cfg = replace(base, index_type="flat")
+    flat = build_index(vectors, ids, "cosine", flat_cfg)
+    flat_build = time.perf_counter() - start
+    _, truth = flat.search(queries, k)
+    record("flat", flat_cfg, flat, flat_build)
+
+    start = time.perf_counter()
+    hnsw = build_index(vectors, ids, "cosine", replace(base, index_type="hnsw"))
+    hnsw_build = time.perf_counter() - start
+    for ef in (16, 32, 64, 128, 256):
+        record(f"hnsw efSearch={ef}", replace(base, index_type="hnsw", hnsw_ef_search=ef), hnsw, hnsw_build)
+
+    start = time.perf_counter()
+    ivf_cfg = replace(base, index_type="ivfpq")
+    ivfpq = build_index(vectors, ids, "cosine", ivf_cfg)
+    ivf_build = time.perf_counter() - start
+    if index_type_of(ivfpq) == "ivfpq":  # falls back to flat when n is too small to train
+        for nprobe in (1, 4, 16, 64):
+            record(f"ivfpq nprobe={nprobe}", replace(ivf_cfg, ivf_nprobe=nprobe), ivfpq, ivf_build)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100_000, help="number of indexed vectors")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.n, args.dim, args.k, args.queries)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"n": args.n, "dim": args.dim, "k": args.k, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Throughput and boundary quality of the "structure" chunker against the
+"fixed" character window on large documents.
+
+    python -m benchmarks.chunking --mb 8
+    python -m benchmarks.chunking --mb 32 --out chunking.json
+
+Documents are synthetic Markdown (benchmarks.corpus.large_document) in three
+layouts: lines wrapped like exported text, the same text split into
+PDF-sized pages (chunked page by page, as parse_file does for PDFs), and one
+paragraph per line. Both chunkers run with the default RAGConfig size and
+overlap, each timed best-of `--repeat`. Besides MB/s the report shows how
+often a chunk ends mid-sentence or starts mid-word, and how many chunks
+carry a section.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import time
+from typing import Callable, Dict, List, Tuple
+
+from app.config import RAGConfig
+from benchmarks.corpus import large_document
+from rag_pipeline.chunk_store import ChunkMetadata
+from rag_pipeline.chunking import chunk_structured
+from rag_pipeline.ingestion import chunk_text
+
+LINES_PER_PAGE = 45
+
+
+def _fixed(pages: List[str], size: int, overlap: int) -> List[ChunkMetadata]:
+    chunks: List[ChunkMetadata] = []
+    for number, text in enumerate(pages, start=1):
+        chunks.extend(chunk_text(text, "bench.md", number if len(pages) > 1 else None, size, overlap))
+    return chunks
+
+
+def _structure(pages: List[str], size: int, overlap: int) -> List[ChunkMetadata]:
+    chunks: List[ChunkMetadata] = []
+    section = None
+    for number, text in enumerate(pages, start=1):
+        page_chunks, section = chunk_structured(
+            text, "bench.md", number if len(pages) > 1 else None, size, overlap, section
+        )
+        chunks.extend(page_chunks)
+    return chunks
+
+
+CHUNKERS: Dict[str, Callable[[List[str], int, int], List[ChunkMetadata]]] = {
+    "fixed": _fixed,
+    "structure": _structure,
+}
+
+
+def layouts(n_chars: int) -> Dict[str, List[str]]:
+    """Layout name -> the document as a list of pages."""
+    wrapped = large_document(n_chars, wrap=90)
+    lines = wrapped.split("\n")
+    return {
+        "wrapped": [wrapped],
+        "pdf_pages": ["\n".join(lines[i : i + LINES_PER_PAGE]) for i in range(0, len(lines), LINES_PER_PAGE)],
+        "long_lines": [large_document(n_chars, wrap=None)],
+    }
+
+
+def _best_times(
+    pages: List[str], size: int, overlap: int, repeat: int
+) -> Dict[str, Tuple[float, List[ChunkMetadata]]]:
+    """Best wall time and the chunks of every chunker, runs interleaved so both see the same machine state."""
+    best: Dict[str, Tuple[float, List[ChunkMetadata]]] = {}
+    for _ in range(repeat):
+        for name, chunker in CHUNKERS.items():
+            gc.collect()
+            start = time.perf_counter()
+            chunks = chunker(pages, size, overlap)
+            elapsed = time.perf_counter() - start
+            if name not in best or elapsed < best[name][0]:
+                best[name] = (elapsed, chunks)
+    return best
+
+
+def boundary_quality(chunks: List[ChunkMetadata], text: str) -> Dict[str, float]:
+    """Share of chunks ending without end punctuation / starting inside a word."""
+    n = max(1, len(chunks))
+    words = set(text.split())
+    mid_sentence = sum(1 for c in chunks if c.content[-1] not in ".!?\"')]")
+    cut_words = sum(1 for c in chunks if c.content.split(None, 1)[0] not in words)
+    return {
+        "mid_sentence_end": mid_sentence / n,
+        "mid_word_start": cut_words / n,
+        "with_section": sum(1 for c in chunks if c.section) / n,
+    }
+
+
+def run(mb: float, repeat: int, cfg: RAGConfig | None = None) -> List[Dict[str, float | str]]:
+    cfg = cfg or RAGConfig()
+    results: List[Dict[str, float | str]] = []
+    for layout, pages in layouts(int(mb * 1e6)).items():
+        size_mb = sum(len(page.encode("utf-8")) for page in pages) / 1e6
+        text = "\n".join(pages)
+        timings = _best_times(pages, cfg.chunk_size_chars, cfg.chunk_overlap_chars, repeat)
+        for name, (seconds, chunks) in timings.items():
+            row = {
+                "layout": layout,
+                "chunker": name,
+                "mb": size_mb,
+                "mb_per_s": size_mb / seconds,
+                "chunks": len(chunks),
+                "mean_chunk_chars": sum(len(c.content) for c in chunks) / max(1, len(chunks)),
+                **boundary_quality(chunks, text),
+            }
+            results.append(row)
+            print(json.dumps(row))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=8.0, help="size of each synthetic document")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.mb, args.repeat)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"mb": args.mb, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Synthetic business-document corpora for the benchmarks.
+
+Text is assembled from a fixed vocabulary of pricing / booking / policy
+sentences with a seeded RNG, so the same arguments always produce the same
+files. PDFs are written with a tiny built-in writer (no extra dependency)
+and read back through pypdf by the ingestion code like real uploads.
+"""
+from __future__ import annotations
+
+import random
+from pathlib import Path
+from typing import List
+
+SUBJECTS = [
+    "The gold membership", "Our premium package", "The starter plan", "A personal training session",
+    "The family bundle", "Online course access", "The dinner tasting menu", "A dental check-up",
+    "Weekend brunch", "The annual subscription", "Group yoga", "The consultation",
+]
+FACTS = [
+    "costs ${price} per month", "includes {n} sessions per week", "can be cancelled with {n} days notice",
+    "is refunded within {n} business days", "is available from {h}am to {h2}pm", "requires a ${price} deposit",
+    "comes with a free trial of {n} days", "can be booked online or by phone", "is discounted {n}% for students",
+    "is paused for up to {n} weeks per year", "includes parking and towel service", "needs {n} hours advance booking",
+]
+HEADINGS = ["Pricing", "Bookings", "Refund policy", "Opening hours", "Memberships", "Frequently asked questions"]
+FORMATS = ("txt", "md", "pdf")
+
+# Chunking advances chunk_size - overlap characters per chunk (see RAGConfig).
+CHARS_PER_CHUNK = 1200 - 250
+
+
+def sentence(rng: random.Random) -> str:
+    fact = rng.choice(FACTS).format(
+        price=rng.randint(9, 199), n=rng.randint(1, 30), h=rng.randint(6, 10), h2=rng.randint(5, 11)
+    )
+    return f"{rng.choice(SUBJECTS)} {fact}."
+
+
+def paragraph(rng: random.Random, n_chars: int) -> str:
+    parts: List[str] = []
+    size = 0
+    while size < n_chars:
+        s = sentence(rng)
+        parts.append(s)
+        size += len(s) + 1
+    return " ".join(parts)
+
+
+def questions(n: int, seed: int = 1) -> List[str]:
+    """Customer-style questions over the same vocabulary."""
+    rng = random.Random(seed)
+    templates = ["How much is {s}?", "What does {s} include?", "Can I cancel {s}?", "When is {s} available?"]
+    return [rng.choice(templates).format(s=rng.choice(SUBJECTS).lower()) for _ in range(n)]
+
+
+CHAT_OPENERS = ["", "", "Hi! ", "Hello, ", "Thanks. ", "Quick one: ", "Sorry, this is urgent: "]
+CHAT_TEMPLATES = [
+    "How much is {s}?", "Is there a discount on {s}?", "I'd like to book {s} for Friday.",
+    "What are the prices for {s}?", "I have a problem with {s}, the app shows an error.",
+    "Can I get a refund for {s}?", "I want to cancel {s}.", "What does {s} include?",
+    "When is {s} available?", "Is parking included with {s}?", "Where are you located?",
+    "How are you today?", "Thanks, that's all!", "Do you ship this to Canada?",
+]
+
+
+def chat_messages(n: int, seed: int = 2) -> List[str]:
+    """Inbound chat messages of every intent (greetings, sales, support, general questions)."""
+    rng = random.Random(seed)
+    return [
+        rng.choice(CHAT_OPENERS) + rng.choice(CHAT_TEMPLATES).format(s=rng.choice(SUBJECTS).lower())
+        for _ in range(n)
+    ]
+
+
+# ----- PDF -----
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text: str, width: int = 90) -> List[str]:
+    lines: List[str] = []
+    line = ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def write_pdf(path: Path, pages: List[str]) -> None:
+    """Write a minimal text-only PDF (Helvetica, one content stream per page)."""
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # filled in once the page tree exists
+    page_tree = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for text in pages:
+        ops = ["BT", "/F1 9 Tf", "11 TL", "50 800 Td"]
+        for line in _wrap(text):
+            ops.append(f"({_pdf_escape(line)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(
+            add(
+                b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+                b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (page_tree, font, content)
+            )
+        )
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[page_tree - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % page_tree
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    path.write_bytes(bytes(out))
+
+
+def large_document(n_chars: int, wrap: int | None = 90, seed: int = 0) -> str:
+    """
+    One long Markdown document of about `n_chars`: "##" sections of a few
+    paragraphs each, lines wrapped at `wrap` columns like exported text and
+    PDF pages (None keeps each paragraph on one line).
+    """
+    rng = random.Random(seed)
+    sections: List[str] = []
+    size = 0
+    while size < n_chars:
+        paragraphs = [paragraph(rng, rng.randint(200, 900)) for _ in range(rng.randint(2, 6))]
+        if wrap is not None:
+            paragraphs = ["\n".join(_wrap(p, wrap)) for p in paragraphs]
+        section = f"## {rng.choice(HEADINGS)}\n\n" + "\n\n".join(paragraphs)
+        sections.append(section)
+        size += len(section) + 2
+    return "\n\n".join(sections)
+
+
+# ----- corpus -----
+
+
+def make_corpus(
+    out_dir: Path,
+    n_chunks: int,
+    formats: tuple = FORMATS,
+    chunks_per_file: int = 20,
+    seed: int = 0,
+) -> List[Path]:
+    """
+    Write files that chunk into roughly `n_chunks` chunks with the default
+    RAGConfig chunking, cycling through `formats`. Returns the file paths.
+    """
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    n_files = max(1, -(-n_chunks // chunks_per_file))
+    per_file = max(1, n_chunks // n_files)
+    paths: List[Path] = []
+    for i in range(n_files):
+        fmt = formats[i % len(formats)]
+        path = out_dir / f"doc_{i:05d}.{fmt}"
+        if fmt == "pdf":
+            # About one chunk per page (chunks never span PDF pages).
+            write_pdf(path, [paragraph(rng, CHARS_PER_CHUNK - 100) for _ in range(per_file)])
+        else:
+            sections = []
+            remaining = per_file * CHARS_PER_CHUNK
+            while remaining > 0:
+                body = paragraph(rng, min(remaining, 2 * CHARS_PER_CHUNK))
+                heading = rng.choice(HEADINGS)
+                sections.append(f"## {heading}\n\n{body}" if fmt == "md" else f"{heading}\n{body}")
+                remaining -= len(body)
+            path.write_text("\n\n".join(sections), encoding="utf-8")
+        paths.append(path)
+    return paths
@@ -0,0 +1,162 @@
+"""
+Recall@k and latency of hybrid (BM25 + vector, reciprocal-rank fusion)
+retrieval against dense-only retrieval on a synthetic pricing catalogue.
+
+    python -m benchmarks.hybrid --plans 5000
+    python -m benchmarks.hybrid --plans 20000 --real-model --out hybrid.json
+
+Every plan is a "###" section (one chunk): a name built from a shared
+vocabulary ("Yoga Gold 12-month"), a unique SKU code and price, and filler
+sentences from benchmarks.corpus. Queries ask for one plan by SKU, by price
+or by name, the way customers type them; a query is a hit when a chunk
+containing that SKU / price / name is in the top k. Both modes search the
+same ingested store (ingestion always writes the BM25 index). Without
+--real-model the NumPy fallback embedding stands in for SentenceTransformer.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import shutil
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.config import PathsConfig, RAGConfig
+from benchmarks.corpus import sentence
+from rag_pipeline.ingestion import IngestionEngine
+from rag_pipeline.lexical_index import LEXICAL_FILE
+from rag_pipeline.registry import ResourceRegistry
+
+LINES = ["Gym", "Yoga", "Swim", "Online", "Clinic", "Dining", "Pilates", "Climbing"]
+TIERS = ["Gold", "Silver", "Bronze", "Platinum", "Starter", "Family", "Student", "Corporate"]
+MONTHS = [1, 3, 6, 12, 24]
+PLANS_PER_FILE = 200
+
+
+def pricing_catalog(out_dir: Path, n_plans: int, n_queries: int, seed: int = 0) -> Tuple[List[Path], List[Dict[str, str]]]:
+    """Write the catalogue as Markdown files; returns them and the queries ({"kind", "query", "target"})."""
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    skus = rng.sample(range(1000, 100_000), n_plans)
+    cents = rng.sample(range(900, 90_000), n_plans)  # unique prices
+    plans = []
+    for sku_number, price_cents in zip(skus, cents):
+        line, tier, months = rng.choice(LINES), rng.choice(TIERS), rng.choice(MONTHS)
+        plans.append(
+            {
+                "name": f"{line} {tier} {months}-month",
+                "sku": f"{line[:2].upper()}{tier[0]}-{sku_number}",
+                "price": f"${price_cents // 100}.{price_cents % 100:02d}",
+            }
+        )
+
+    paths: List[Path] = []
+    for start in range(0, n_plans, PLANS_PER_FILE):
+        sections = []
+        for plan in plans[start:start + PLANS_PER_FILE]:
+            filler = " ".join(sentence(rng) for _ in range(rng.randint(2, 4)))
+            sections.append(
+                f"### {plan['name']} (SKU {plan['sku']})\n\n"
+                f"The {plan['name']} plan costs {plan['price']} per month. {filler}"
+            )
+        path = out_dir / f"catalog_{start // PLANS_PER_FILE:04d}.md"
+        path.write_text("\n\n".join(sections), encoding="utf-8")
+        paths.append(path)
+
+    templates = {
+        "sku": ("What is included in {sku}?", "sku"),
+        "price": ("Which plan is {price}?", "price"),
+        "name": ("How much is the {name} plan?", "name"),
+    }
+    queries = []
+    for i in range(n_queries):
+        kind = list(templates)[i % len(templates)]
+        template, field = templates[kind]
+        plan = rng.choice(plans)
+        queries.append({"kind": kind, "query": template.format(**plan), "target": plan[field]})
+    return paths, queries
+
+
+def _evaluate(store, queries: List[Dict[str, str]], k: int) -> Dict[str, float]:
+    times = np.empty(len(queries))
+    hits: Dict[str, List[bool]] = {}
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        results = store.search(q["query"], top_k=k)
+        times[i] = time.perf_counter() - start
+        hits.setdefault(q["kind"], []).append(any(q["target"] in rc.metadata.content for rc in results))
+    every = [h for kind in hits.values() for h in kind]
+    return {
+        f"recall@{k}": sum(every) / len(every),
+        **{f"recall@{k}_{kind}": sum(h) / len(h) for kind, h in hits.items()},
+        "p50_ms": float(np.percentile(times, 50) * 1000),
+        "p95_ms": float(np.percentile(times, 95) * 1000),
+    }
+
+
+def run(n_plans: int, n_queries: int = 300, k: int = 5, real_model: bool = False) -> Dict[str, Dict[str, float]]:
+    work_dir = Path(tempfile.mkdtemp(prefix="rag_hybrid_"))
+    try:
+        cfg = RAGConfig(answer_cache_enabled=False)
+        paths = PathsConfig(
+            data_dir=work_dir,
+            uploads_dir=work_dir / "corpus",
+            vector_store_dir=work_dir / "vector_store",
+            leads_csv=work_dir / "leads.csv",
+            embedding_cache_dir=work_dir / "embedding_cache",
+            answer_cache_db=work_dir / "answer_cache.sqlite",
+            traces_jsonl=work_dir / "traces.jsonl",
+        )
+        files, queries = pricing_catalog(paths.uploads_dir, n_plans, n_queries)
+        registry = ResourceRegistry()
+        if not real_model:
+            registry._models[cfg.embedding_model_name] = None  # fallback embedding, no model load
+        start = time.perf_counter()
+        IngestionEngine(paths, cfg, registry=registry).ingest_files(files)
+        ingest_s = time.perf_counter() - start
+
+        store = registry.vector_store(paths, cfg)
+        results: Dict[str, Dict[str, float]] = {
+            "corpus": {
+                "plans": n_plans,
+                "chunks": len(store.chunks),
+                "ingest_s": ingest_s,
+                "bm25_mb": (paths.vector_store_dir / LEXICAL_FILE).stat().st_size / 1e6,
+            }
+        }
+        for mode, hybrid in (("dense", False), ("hybrid", True)):
+            store.cfg = replace(cfg, hybrid_search=hybrid)
+            store.search(queries[0]["query"])  # warm-up
+            results[mode] = {"embedder": store.embedder.name, **_evaluate(store, queries, k)}
+        for name, row in results.items():
+            print(json.dumps({"name": name, **row}))
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--real-model", action="store_true", help="embed with SentenceTransformer")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    results = run(args.plans, args.queries, args.k, args.real_model)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
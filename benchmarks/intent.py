@@ -0,0 +1,232 @@
+"""
+Throughput of the compiled intent classifier against the previous
+substring classifier, with the built-in keywords and with large niche packs;
+with --accuracy, accuracy and latency of the keyword, embedding and hybrid
+(embedding, keywords when unsure) modes on a labelled message set.
+
+    python -m benchmarks.intent --messages 20000
+    python -m benchmarks.intent --terms 0,1000,5000 --out intent.json
+    python -m benchmarks.intent --accuracy --real-model
+
+Messages are synthetic chat turns (benchmarks.corpus.chat_messages). For each
+pack size the built-in pack is extended with that many generated terms, split
+between sales and support; the substring baseline scans the same terms. Each
+classifier is timed best-of `--repeat`, runs interleaved. `agreement` is the
+share of messages both classify the same way; the differences are the
+substring false positives ("hi" in "this") the compiled matcher avoids, and
+messages where the weighted score outranks the first list that matched
+("a problem with my package" is support).
+
+The labelled set (LABELLED) is held out from app/intent_examples.json, the
+examples the embedding centroids are built from: paraphrases with and
+without keywords ("how much is it to join?"). Latency is per message: the
+embedding mode is timed both encoding the message itself and reusing a
+query vector, as it does in the app. Without --real-model the NumPy
+fallback embedding stands in for SentenceTransformer.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+from app.config import IntentConfig, PathsConfig, RAGConfig
+from benchmarks.corpus import chat_messages
+from rag_pipeline.embeddings import Embedder
+from rag_pipeline.intent_classifier import (
+    CHITCHAT_KEYWORDS,
+    DEFAULT_PACK,
+    SALES_KEYWORDS,
+    SUPPORT_KEYWORDS,
+    EmbeddingIntentClassifier,
+    Intent,
+    IntentClassifier,
+    load_intent_examples,
+)
+from rag_pipeline.registry import ResourceRegistry
+
+SYLLABLES = ["ka", "lo", "mi", "ner", "tu", "vex", "sha", "dri", "po", "zen", "qui", "rab"]
+
+
+S, U, G, C = Intent.SALES, Intent.SUPPORT, Intent.GENERAL, Intent.CHITCHAT
+LABELLED: List[Tuple[str, Intent]] = [
+    ("how much is it to join?", S), ("what would a year cost me?", S), ("any promo codes right now?", S),
+    ("I'd like to become a member", S), ("can I grab a spot in tomorrow's class?", S),
+    ("what's the price of the family bundle?", S), ("do you do payment plans?", S),
+    ("how much for two people?", S), ("is the first visit free?", S), ("what's the fee for a check-up?", S),
+    ("can you hold a table for 8pm?", S), ("I want to buy the online course", S),
+    ("what are the membership options?", S), ("is it cheaper if I pay yearly?", S),
+    ("my card got declined", U), ("I can't get into the members area", U), ("please stop charging me", U),
+    ("I need to cancel tomorrow's booking", U), ("the food was cold when it arrived", U),
+    ("your app logs me out every time", U), ("where is my refund?", U), ("the course videos are broken", U),
+    ("I was billed for a class I didn't attend", U), ("I forgot my password", U),
+    ("my appointment got moved without notice", U), ("the receipt shows the wrong amount", U),
+    ("what time do you close on sundays?", G), ("is there somewhere to park?", G), ("are kids allowed?", G),
+    ("which bus stops near you?", G), ("do you have showers?", G), ("is the menu gluten free?", G),
+    ("who teaches the evening classes?", G), ("where exactly are you?", G), ("do you speak spanish?", G),
+    ("are you open on christmas?", G), ("can I bring my own towel?", G), ("how big is the studio?", G),
+    ("hey!", C), ("good evening", C), ("thanks so much", C), ("cheers mate", C), ("how's it going?", C),
+    ("see you later", C), ("you're the best", C), ("ok cool thanks", C), ("hello hello", C), ("morning!", C),
+]
+
+
+def legacy_classifier(sales: List[str], support: List[str]) -> Callable[[str], Intent]:
+    """The substring classifier this module replaced (agent.classify_intent before the compiled matcher)."""
+
+    def classify(message: str) -> Intent:
+        text = message.lower()
+        if any(k in text for k in sales):
+            return Intent.SALES
+        if any(k in text for k in support):
+            return Intent.SUPPORT
+        if any(k in text for k in CHITCHAT_KEYWORDS):
+            return Intent.CHITCHAT
+        return Intent.GENERAL
+
+    return classify
+
+
+def synthetic_terms(n: int, seed: int = 0) -> List[str]:
+    """`n` distinct made-up words and two-word phrases (a niche vocabulary)."""
+    rng = random.Random(seed)
+    terms: set = set()
+    while len(terms) < n:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        terms.add(word if rng.random() < 0.8 else f"{word} {rng.choice(SYLLABLES)}{rng.choice(SYLLABLES)}")
+    return sorted(terms)
+
+
+def _best_rate(fn: Callable[[], object], n_messages: int, best: Dict[str, float], name: str) -> None:
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    rate = n_messages / (time.perf_counter() - start)
+    best[name] = max(best.get(name, 0.0), rate)
+
+
+def run(n_messages: int, term_counts: List[int], repeat: int) -> List[Dict[str, float | int]]:
+    messages = chat_messages(n_messages)
+    results: List[Dict[str, float | int]] = []
+    for n_terms in term_counts:
+        extra = synthetic_terms(n_terms)
+        sales, support = extra[::2], extra[1::2]
+        pack = {
+            Intent.SALES: {**DEFAULT_PACK[Intent.SALES], **{t: 1.0 for t in sales}},
+            Intent.SUPPORT: {**DEFAULT_PACK[Intent.SUPPORT], **{t: 1.0 for t in support}},
+            Intent.CHITCHAT: DEFAULT_PACK[Intent.CHITCHAT],
+        }
+        start = time.perf_counter()
+        classifier = IntentClassifier([pack])
+        compile_ms = (time.perf_counter() - start) * 1000
+        legacy = legacy_classifier(SALES_KEYWORDS + sales, SUPPORT_KEYWORDS + support)
+
+        runs: Dict[str, Callable[[], List[Intent]]] = {
+            "legacy": lambda: [legacy(m) for m in messages],
+            "classify": lambda: [classifier.classify(m) for m in messages],
+            "classify_many": lambda: classifier.classify_many(messages),
+        }
+        best: Dict[str, float] = {}
+        for _ in range(repeat):
+            for name, fn in runs.items():
+                _best_rate(fn, n_messages, best, name)
+
+        old, new = runs["legacy"](), runs["classify_many"]()
+        row = {
+            "terms": len(classifier),
+            "messages": n_messages,
+            "compile_ms": compile_ms,
+            **{f"{name}_msgs_per_s": rate for name, rate in best.items()},
+            "speedup": best["classify_many"] / best["legacy"],
+            "agreement": sum(a == b for a, b in zip(old, new)) / n_messages,
+        }
+        results.append(row)
+        print(json.dumps(row))
+    return results
+
+
+def _embedder(real_model: bool) -> Embedder:
+    cfg = RAGConfig()
+    if real_model:
+        registry = ResourceRegistry()
+        model = registry.embedding_model(cfg.embedding_model_name)
+        if model is not None:
+            return Embedder(model, cfg.embedding_model_name, registry.embedding_dim(cfg.embedding_model_name))
+        print("SentenceTransformer not available; using the fallback embedding")
+    return Embedder(None, cfg.embedding_model_name, cfg.fallback_embedding_dim, fallback=cfg.fallback_embedding)
+
+
+def _best_ms_per_message(fn: Callable[[], object], n: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 / n
+
+
+def run_accuracy(real_model: bool = False, repeat: int = 5) -> List[Dict[str, float | str]]:
+    cfg = IntentConfig()
+    texts = [text for text, _ in LABELLED]
+    labels = [label for _, label in LABELLED]
+    embedder = _embedder(real_model)
+    keywords = IntentClassifier()
+    examples = load_intent_examples(cfg.examples)
+    modes = {
+        "keywords": keywords,
+        "embedding": EmbeddingIntentClassifier(embedder, examples, keywords, min_confidence=0.0),
+        "hybrid": EmbeddingIntentClassifier(embedder, examples, keywords, min_confidence=cfg.min_confidence),
+    }
+    vectors = embedder.embed(texts)  # the query vectors retrieval would have computed
+    results: List[Dict[str, float | str]] = []
+    for name, classifier in modes.items():
+        predicted = [classifier.classify(text, vector) for text, vector in zip(texts, vectors)]
+        sales = [p for p, label in zip(predicted, labels) if label == Intent.SALES]
+        row: Dict[str, float | str] = {
+            "mode": name,
+            "embedder": embedder.name,
+            "messages": len(texts),
+            "accuracy": sum(p == label for p, label in zip(predicted, labels)) / len(texts),
+            # A sales message classified as anything else is a missed lead.
+            "sales_recall": sales.count(Intent.SALES) / len(sales),
+            "ms_per_message": _best_ms_per_message(
+                lambda: [classifier.classify(text, vector) for text, vector in zip(texts, vectors)], len(texts), repeat
+            ),
+        }
+        if name != "keywords":
+            # What reusing the query vector saves: the same calls, encoding each message.
+            row["ms_per_message_encoding"] = _best_ms_per_message(
+                lambda: [classifier.classify(text) for text in texts], len(texts), repeat
+            )
+            row["low_confidence_share"] = sum(
+                c < classifier.min_confidence for c in classifier.predict(vectors)[1]
+            ) / len(texts)
+        results.append(row)
+        print(json.dumps(row))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--terms", default="0,1000,5000", help="comma-separated niche pack sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--accuracy", action="store_true", help="compare the classifier modes on LABELLED instead")
+    parser.add_argument("--real-model", action="store_true", help="embed with SentenceTransformer (--accuracy)")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.accuracy:
+        report = {"labelled": len(LABELLED), "results": run_accuracy(args.real_model, args.repeat)}
+    else:
+        report = {"messages": args.messages, "results": run(args.messages, [int(t) for t in args.terms.split(",")], args.repeat)}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Latency and context size of the re-ranking modes (none / MMR / cross-encoder)
+on the synthetic pricing catalogue of benchmarks.hybrid.
+
+    python -m benchmarks.rerank --plans 5000
+    python -m benchmarks.rerank --plans 5000 --real-model --out rerank.json
+
+Each catalogue file is ingested twice (a "-faq" copy), so every plan has a
+near-duplicate chunk, the way pricing tables get repeated across a brochure
+and an FAQ. For each mode the benchmark runs RAGChain's retrieval step: fetch
+`rerank_candidates` hits, re-rank, keep top_k, pack the prompt context. It
+reports recall@k (a chunk containing the target SKU / price / name),
+`duplicate_share` (kept chunks whose text another kept chunk repeats),
+context tokens and chunks, and p50 / p95 of the re-rank step alone. The
+cross-encoder mode needs --real-model (sentence-transformers); without it
+the NumPy fallback embedding stands in for SentenceTransformer.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import shutil
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from app.config import PathsConfig, RAGConfig
+from benchmarks.hybrid import pricing_catalog
+from rag_pipeline.context_packer import ContextPacker
+from rag_pipeline.ingestion import IngestionEngine
+from rag_pipeline.query_context import as_query_context
+from rag_pipeline.registry import ResourceRegistry
+
+
+def run(
+    n_plans: int, n_queries: int = 200, real_model: bool = False, budget_ms: float = 150.0
+) -> Dict[str, Dict[str, float | str]]:
+    work_dir = Path(tempfile.mkdtemp(prefix="rag_rerank_"))
+    try:
+        cfg = RAGConfig(answer_cache_enabled=False, rerank_budget_ms=budget_ms)
+        paths = PathsConfig(
+            data_dir=work_dir,
+            uploads_dir=work_dir / "corpus",
+            vector_store_dir=work_dir / "vector_store",
+            leads_csv=work_dir / "leads.csv",
+            embedding_cache_dir=work_dir / "embedding_cache",
+            answer_cache_db=work_dir / "answer_cache.sqlite",
+            traces_jsonl=work_dir / "traces.jsonl",
+        )
+        files, queries = pricing_catalog(paths.uploads_dir, n_plans, n_queries)
+        for path in list(files):
+            copy = path.with_name(f"{path.stem}-faq{path.suffix}")
+            shutil.copyfile(path, copy)
+            files.append(copy)
+        registry = ResourceRegistry()
+        if not real_model:
+            registry._models[cfg.embedding_model_name] = None  # fallback embedding, no model load
+            registry._cross_encoders[cfg.reranker_model] = None
+        IngestionEngine(paths, cfg, registry=registry).ingest_files(files)
+        store = registry.vector_store(paths, cfg)
+        packer = ContextPacker(cfg.context_max_tokens, cfg.context_merge_neighbours)
+
+        results: Dict[str, Dict[str, float | str]] = {}
+        for mode in ("none", "mmr", "cross_encoder"):
+            reranker = registry.reranker(paths, replace(cfg, reranker=mode))
+            if reranker.mode != mode:
+                print(f"{mode}: model not available, skipped")
+                continue
+            times = np.empty(len(queries))
+            hits, duplicates, tokens, chunks = [], [], [], []
+            for i, q in enumerate(queries):
+                query = as_query_context(q["query"], store.embed_queries)
+                candidates = store.search(query, top_k=reranker.candidates)
+                start = time.perf_counter()
+                kept = reranker.rerank(query, candidates, store.revision)
+                times[i] = time.perf_counter() - start
+                texts = [rc.metadata.content for rc in kept]
+                hits.append(any(q["target"] in text for text in texts))
+                duplicates.append(1 - len(set(texts)) / max(len(texts), 1))
+                packed = packer.pack(kept)
+                tokens.append(packed.tokens)
+                chunks.append(len(kept))
+            results[mode] = {
+                "embedder": store.embedder.name,
+                "candidates": reranker.candidates,
+                f"recall@{cfg.top_k}": float(np.mean(hits)),
+                "duplicate_share": float(np.mean(duplicates)),
+                "context_tokens": float(np.mean(tokens)),
+                "context_chunks": float(np.mean(chunks)),
+                "p50_ms": float(np.percentile(times, 50) * 1000),
+                "p95_ms": float(np.percentile(times, 95) * 1000),
+            }
+            print(json.dumps({"mode": mode, **results[mode]}))
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--budget-ms", type=float, default=150.0)
+    parser.add_argument("--real-model", action="store_true", help="embed and re-rank with sentence-transformers")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    results = run(args.plans, args.queries, args.real_model, args.budget_ms)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
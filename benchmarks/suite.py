@@ -0,0 +1,344 @@
+"""
+Reproducible benchmark suite for the hot paths: chunking, embedding,
+index build, search and an end-to-end RAGChain turn.
+
+    python -m benchmarks.suite --sizes 10,1000,10000 --out bench.json
+    python -m benchmarks.suite --sizes 1000 --compare bench.json --tolerance 0.2
+
+For every corpus size (in chunks) a synthetic TXT / MD / PDF corpus is
+generated (benchmarks.corpus) and measured:
+
+- chunking:   parse_file throughput (files, chunks and MB per second), and
+              MB per second of the "fixed" chunker for reference (see also
+              benchmarks.chunking)
+- embedding:  fallback "ngram" and "bytes" throughput; the real
+              SentenceTransformer too with --real-model
+- ingestion:  IngestionEngine.ingest_files wall time
+- index:      build_index time for the flat tier and the auto-selected tier
+- search:     VectorStore.search p50 / p95 / QPS for several top_k values,
+              plus batched search_many QPS
+- end-to-end: RAGChain.answer with DummyLLMClient (answer cache disabled)
+- memory:     process RSS high-water mark after each stage (ru_maxrss)
+- imports:    cold import time of the app's modules in a fresh interpreter
+              (`python -X importtime`), with the slowest modules listed
+
+Results are written as JSON. With --compare, metrics are checked against a
+previous result file: times / latencies / memory may not grow, throughputs
+may not shrink, by more than --tolerance. The exit code is 1 on regression.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import faiss
+import numpy as np
+
+from app.config import PathsConfig, RAGConfig
+from benchmarks.corpus import make_corpus, questions
+from rag_pipeline.embeddings import Embedder
+from rag_pipeline.ingestion import IngestionEngine, parse_file
+from rag_pipeline.rag_chain import RAGChain
+from rag_pipeline.registry import ResourceRegistry
+from rag_pipeline.vector_index import build_index, choose_index_type, prepare_vectors
+from services.llm_client import DummyLLMClient
+
+TOP_KS = (1, 5, 20)
+ROOT_DIR = Path(__file__).resolve().parents[1]
+# What app/main_app.py imports before the first paint.
+APP_MODULES = (
+    "rag_pipeline.ingestion",
+    "rag_pipeline.retrieval",
+    "rag_pipeline.rag_chain",
+    "rag_pipeline.agent",
+    "rag_pipeline.registry",
+    "services.lead_store",
+    "services.analytics",
+    "services.tracing",
+)
+# Must stay off the cold-start path (loaded lazily / by the warm-up thread).
+HEAVY_MODULES = ("faiss.swigfaiss", "sentence_transformers", "torch")
+
+
+def max_rss_mb() -> float:
+    """Process RSS high-water mark so far, in MB (0.0 where unsupported)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _latencies(fn: Callable[[str], object], queries: List[str]) -> Dict[str, float]:
+    times = np.empty(len(queries))
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        fn(q)
+        times[i] = time.perf_counter() - start
+    return {
+        "p50_ms": float(np.percentile(times, 50) * 1000),
+        "p95_ms": float(np.percentile(times, 95) * 1000),
+        "qps": float(len(queries) / times.sum()) if times.sum() > 0 else 0.0,
+    }
+
+
+def _throughput(n: int, seconds: float) -> float:
+    return n / seconds if seconds > 0 else 0.0
+
+
+def bench_size(n_chunks: int, work_dir: Path, n_queries: int, real_model: bool) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    cfg = RAGConfig(answer_cache_enabled=False)
+    paths = PathsConfig(
+        data_dir=work_dir,
+        uploads_dir=work_dir / "corpus",
+        vector_store_dir=work_dir / "vector_store",
+        leads_csv=work_dir / "leads.csv",
+        embedding_cache_dir=work_dir / "embedding_cache",
+        answer_cache_db=work_dir / "answer_cache.sqlite",
+        traces_jsonl=work_dir / "traces.jsonl",
+    )
+    files = make_corpus(paths.uploads_dir, n_chunks)
+    registry = ResourceRegistry()
+    if not real_model:
+        # Cache "no model" up front so ingestion / search use the fallback
+        # embedding without trying to load SentenceTransformer.
+        registry._models[cfg.embedding_model_name] = None
+    n_bytes = sum(p.stat().st_size for p in files)
+
+    # ----- chunking -----
+    start = time.perf_counter()
+    chunks = []
+    for path in files:
+        chunks.extend(parse_file(path, cfg.chunk_size_chars, cfg.chunk_overlap_chars)[0])
+    elapsed = time.perf_counter() - start
+    texts = [c.content for c in chunks]
+    out["chunks"] = len(chunks)
+    out["chunking_s"] = elapsed
+    out["chunking_files_per_s"] = _throughput(len(files), elapsed)
+    out["chunking_chunks_per_s"] = _throughput(len(chunks), elapsed)
+    out["chunking_mb_per_s"] = _throughput(n_bytes / 1e6, elapsed)
+    start = time.perf_counter()
+    for path in files:
+        parse_file(path, cfg.chunk_size_chars, cfg.chunk_overlap_chars, chunker="fixed")
+    out["chunking_fixed_mb_per_s"] = _throughput(n_bytes / 1e6, time.perf_counter() - start)
+    out["rss_after_chunking_mb"] = max_rss_mb()
+
+    # ----- embedding -----
+    for mode in ("ngram", "bytes"):
+        embedder = Embedder(None, cfg.embedding_model_name, cfg.fallback_embedding_dim, fallback=mode)
+        start = time.perf_counter()
+        embedder.embed(texts)
+        out[f"embed_{mode}_chunks_per_s"] = _throughput(len(texts), time.perf_counter() - start)
+    if real_model:
+        model = registry.embedding_model(cfg.embedding_model_name)
+        if model is not None:
+            embedder = Embedder(model, cfg.embedding_model_name, registry.embedding_dim(cfg.embedding_model_name))
+            start = time.perf_counter()
+            embedder.embed(texts)
+            out["embed_model_chunks_per_s"] = _throughput(len(texts), time.perf_counter() - start)
+    out["rss_after_embedding_mb"] = max_rss_mb()
+
+    # ----- index build -----
+    vectors = prepare_vectors(
+        Embedder(None, cfg.embedding_model_name, cfg.fallback_embedding_dim).embed(texts), cfg.index_metric
+    )
+    ids = np.arange(len(vectors), dtype="int64")
+    start = time.perf_counter()
+    build_index(vectors, ids, cfg.index_metric, replace(cfg, index_type="flat"))
+    out["index_build_flat_s"] = time.perf_counter() - start
+    start = time.perf_counter()
+    build_index(vectors, ids, cfg.index_metric, cfg)
+    out["index_build_auto_s"] = time.perf_counter() - start
+    out["index_tier_auto"] = ("flat", "hnsw", "ivfpq").index(choose_index_type(len(vectors), cfg))
+    del vectors
+    out["rss_after_index_mb"] = max_rss_mb()
+
+    # ----- ingestion -----
+    engine = IngestionEngine(paths, cfg, registry=registry)
+    start = time.perf_counter()
+    engine.ingest_files(files)
+    out["ingest_s"] = time.perf_counter() - start
+    out["ingest_chunks_per_s"] = _throughput(len(chunks), out["ingest_s"])
+    out["rss_after_ingest_mb"] = max_rss_mb()
+
+    # ----- search -----
+    store = registry.vector_store(paths, cfg)
+    qs = questions(n_queries)
+    store.search(qs[0])  # warm-up
+    for k in TOP_KS:
+        for name, value in _latencies(lambda q: store.search(q, top_k=k), qs).items():
+            out[f"search_k{k}_{name}"] = value
+    start = time.perf_counter()
+    store.search_many(qs, top_k=5)
+    out["search_many_k5_qps"] = _throughput(len(qs), time.perf_counter() - start)
+    out["rss_after_search_mb"] = max_rss_mb()
+
+    # ----- end-to-end -----
+    chain = RAGChain(DummyLLMClient(), store)
+    for name, value in _latencies(lambda q: chain.answer(q, []), qs).items():
+        out[f"answer_{name}"] = value
+    out["rss_peak_mb"] = max_rss_mb()
+    return out
+
+
+# ----- import profile -----
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Rows of `-X importtime` output: module, self_ms, cumulative_ms, depth."""
+    rows: List[Dict[str, Any]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        name = parts[2].rstrip()
+        rows.append(
+            {
+                "module": name.strip(),
+                "self_ms": int(parts[0]) / 1000,
+                "cumulative_ms": int(parts[1]) / 1000,
+                "depth": (len(name) - len(name.lstrip())) // 2,
+            }
+        )
+    return rows
+
+
+def import_profile(modules: tuple = APP_MODULES, top: int = 15) -> Dict[str, Any]:
+    """Cold import of `modules` in a fresh interpreter under `-X importtime`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = parse_importtime(proc.stderr)
+    loaded = {row["module"] for row in rows}
+    return {
+        "total_ms": sum(row["self_ms"] for row in rows),
+        "modules": len(rows),
+        "heavy_loaded": [name for name in HEAVY_MODULES if name in loaded],
+        "slowest_self": sorted(rows, key=lambda r: r["self_ms"], reverse=True)[:top],
+        "top_level": sorted(
+            (r for r in rows if r["depth"] == 0), key=lambda r: r["cumulative_ms"], reverse=True
+        )[:top],
+    }
+
+
+# ----- regression comparison -----
+
+
+def lower_is_better(metric: str) -> bool | None:
+    """Direction of a metric from its name; None for informational ones."""
+    if metric.endswith("_per_s") or metric.endswith("qps"):
+        return False
+    if metric.endswith("_s") or metric.endswith("_ms") or metric.endswith("_mb"):
+        return True
+    return None
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[Dict[str, object]]:
+    """Rows for every metric present in both runs; `regressed` marks slowdowns beyond `tolerance`."""
+    rows: List[Dict[str, object]] = []
+    for size, metrics in current["results"].items():
+        base = baseline.get("results", {}).get(size)
+        if base is None:
+            continue
+        for metric, value in metrics.items():
+            direction = lower_is_better(metric)
+            old = base.get(metric)
+            if direction is None or not old or old <= 0:
+                continue
+            change = (value - old) / old
+            regressed = change > tolerance if direction else change < -tolerance
+            rows.append(
+                {"size": size, "metric": metric, "baseline": old, "current": value, "change": change, "regressed": regressed}
+            )
+    return rows
+
+
+def _print_comparison(rows: List[Dict[str, object]]) -> None:
+    for row in rows:
+        flag = "REGRESSION" if row["regressed"] else ""
+        print(
+            f"{row['size']:>8} {row['metric']:<32} {row['baseline']:>12.4g} -> {row['current']:>12.4g} "
+            f"({row['change']:+.1%}) {flag}"
+        )
+
+
+def run(sizes: List[int], n_queries: int, real_model: bool) -> Dict:
+    results: Dict[str, Dict[str, float]] = {}
+    profile = import_profile()
+    # Compared like any other result; the full profile is kept alongside.
+    results["import"] = {"cold_import_ms": profile["total_ms"], "modules": profile["modules"]}
+    print(json.dumps({"size": "import", **results["import"]}), file=sys.stderr)
+    for n in sizes:
+        work_dir = Path(tempfile.mkdtemp(prefix=f"rag-bench-{n}-"))
+        try:
+            print(f"# {n} chunks", file=sys.stderr)
+            results[str(n)] = bench_size(n, work_dir, n_queries, real_model)
+            print(json.dumps({"size": n, **results[str(n)]}), file=sys.stderr)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "faiss": getattr(faiss, "__version__", "unknown"),
+            "queries": n_queries,
+            "real_model": real_model,
+        },
+        "results": results,
+        "import_profile": profile,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,10000", help="comma-separated corpus sizes in chunks (10 .. 100000)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--real-model", action="store_true", help="also benchmark the SentenceTransformer model")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown (0.15 = 15%%)")
+    args = parser.parse_args()
+    # The fallback embedder warns on every query; keep the report readable.
+    logging.basicConfig(level=logging.ERROR)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = run(sizes, args.queries, args.real_model)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance)
+        _print_comparison(rows)
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
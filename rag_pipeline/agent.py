@@ -2,54 +2,27 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass, field
-from enum import Enum
 from typing import Dict, Tuple
 
+from rag_pipeline.intent_classifier import (  # noqa: F401  (re-exported)
+    SALES_KEYWORDS,
+    SUPPORT_KEYWORDS,
+    EmbeddingIntentClassifier,
+    Intent,
+    IntentClassifier,
+    get_embedding_intent_classifier,
+    get_intent_classifier,
+)
+from rag_pipeline.query_context import QueryContext, as_query_context
+from services.tracing import get_tracer
+
 logger = logging.getLogger(__name__)
+tracer = get_tracer()
 
 
-class Intent(str, Enum):
-    SALES = "sales"
-    SUPPORT = "support"
-    GENERAL = "general"
-    CHITCHAT = "chit-chat"
-
-
-SALES_KEYWORDS = [
-    "price",
-    "pricing",
-    "cost",
-    "membership",
-    "package",
-    "plan",
-    "offer",
-    "discount",
-    "book",
-    "booking",
-    "reserve",
-    "signup",
-    "sign up",
-]
-SUPPORT_KEYWORDS = [
-    "problem",
-    "issue",
-    "error",
-    "cancel",
-    "refund",
-    "help",
-    "support",
-]
-
-
-def classify_intent(message: str) -> Intent:
-    text = message.lower()
-    if any(k in text for k in SALES_KEYWORDS):
-        return Intent.SALES
-    if any(k in text for k in SUPPORT_KEYWORDS):
-        return Intent.SUPPORT
-    if any(w in text for w in ["hi", "hello", "how are you", "thanks"]):
-        return Intent.CHITCHAT
-    return Intent.GENERAL
+def classify_intent(message: str, niche: str | None = None) -> Intent:
+    """Keyword intent of one message (see rag_pipeline.intent_classifier)."""
+    return get_intent_classifier(niche).classify(message)
 
 
 @dataclass
@@ -71,8 +44,16 @@ class Agent:
       - decides when to ask follow-up questions
     """
 
-    def __init__(self):
-        self.lead_state: LeadState = LeadState()
+    def __init__(
+        self,
+        lead_state: LeadState | None = None,
+        classifier: IntentClassifier | EmbeddingIntentClassifier | None = None,
+    ):
+        # Pass a session's saved state (services.session_store) to resume it,
+        # and the niche's classifier (get_intent_classifier(niche), or
+        # get_embedding_intent_classifier for IntentConfig.mode "embedding").
+        self.lead_state: LeadState = lead_state or LeadState()
+        self.classifier = classifier or get_intent_classifier()
 
     def update_from_user_message(self, message: str) -> None:
         """
@@ -110,48 +91,54 @@ class Agent:
 
     def process_turn(
         self,
-        user_message: str,
+        user_message: str | QueryContext,
         rag_answer: str,
     ) -> Tuple[str, Intent, bool, Dict[str, str] | None]:
         """
+        Pass the turn's QueryContext so an embedding classifier reuses the
+        vector retrieval computed instead of encoding the message again.
+
         Returns:
           final_answer_text,
           intent,
           lead_completed_flag,
           lead_payload (if completed)
         """
-        intent = classify_intent(user_message)
-        logger.info("Classified intent '%s' for user message: %s", intent, user_message)
-
-        self.update_from_user_message(user_message)
-
-        lead_payload: Dict[str, str] | None = None
-        lead_completed = False
-        final_answer = rag_answer
-
-        # Only push for leads on sales-focused messages
-        if intent == Intent.SALES:
-            if not self.lead_state.interest:
-                # treat last user message as potential interest if they mention plan/package
-                self.lead_state.interest = user_message
-
-            if self.lead_state.is_complete():
-                lead_completed = True
-                lead_payload = {
-                    "name": self.lead_state.name or "",
-                    "email": self.lead_state.email or "",
-                    "phone": self.lead_state.phone or "",
-                    "interest": self.lead_state.interest or "",
-                }
-                final_answer += (
-                    "\n\nIt looks like we have enough details to contact you. "
-                    "Our team will follow up shortly with the best offer."
-                )
-                # Reset state for next lead
-                self.lead_state = LeadState()
-            else:
-                q = self.next_lead_question()
-                if q:
-                    final_answer += "\n\n" + q
+        query = as_query_context(user_message)
+        user_message = query.text
+        with tracer.span("agent"):
+            intent = self.classifier.classify_query(query)
+            logger.info("Classified intent '%s' for user message: %s", intent, user_message)
+
+            self.update_from_user_message(user_message)
+
+            lead_payload: Dict[str, str] | None = None
+            lead_completed = False
+            final_answer = rag_answer
+
+            # Only push for leads on sales-focused messages
+            if intent == Intent.SALES:
+                if not self.lead_state.interest:
+                    # treat last user message as potential interest if they mention plan/package
+                    self.lead_state.interest = user_message
+
+                if self.lead_state.is_complete():
+                    lead_completed = True
+                    lead_payload = {
+                        "name": self.lead_state.name or "",
+                        "email": self.lead_state.email or "",
+                        "phone": self.lead_state.phone or "",
+                        "interest": self.lead_state.interest or "",
+                    }
+                    final_answer += (
+                        "\n\nIt looks like we have enough details to contact you. "
+                        "Our team will follow up shortly with the best offer."
+                    )
+                    # Reset state for next lead
+                    self.lead_state = LeadState()
+                else:
+                    q = self.next_lead_question()
+                    if q:
+                        final_answer += "\n\n" + q
 
         return final_answer, intent, lead_completed, lead_payload
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    space TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    chunk_key TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    answer TEXT NOT NULL,
+    expires REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_space ON answers (space, last_used);
+"""
+
+
+def chunk_key(chunk_ids: List[str]) -> str:
+    """Order-insensitive key for the set of chunks an answer was grounded on."""
+    return "\x1f".join(sorted(set(chunk_ids)))
+
+
+class AnswerCache:
+    """
+    Semantic cache of RAG answers, in front of the LLM call.
+
+    A cached answer is reused when a new question
+      - embeds within `threshold` cosine similarity of the cached question
+        (nearest neighbour over all live entries, one matrix product),
+      - retrieved exactly the same set of chunk ids,
+      - was searched against the same index revision (re-ingestion changes
+        `IndexManifest.revision`, so stale answers are never served), and
+      - comes from the same `namespace` (LLM model / prompt variant).
+
+    Entries expire after `ttl_s` and the least recently used one is evicted
+    when `max_entries` is reached. Rows are persisted in SQLite (WAL), keyed
+    by embedding `space`, and loaded into NumPy arrays on start-up. Several
+    workers may share the database: each `put` also trims the table to the
+    `max_entries` most recently used rows of the space.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        space: str,
+        dim: int,
+        threshold: float = 0.92,
+        ttl_s: float = 86_400.0,
+        max_entries: int = 5000,
+    ):
+        self.db_path = Path(db_path)
+        self.space = space
+        self.dim = dim
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.capacity = max(1, max_entries)
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # Slot arrays; `_row_ids == 0` marks a free slot (SQLite ids start at 1).
+        self._vectors = np.zeros((self.capacity, dim), dtype="float32")
+        self._row_ids = np.zeros(self.capacity, dtype="int64")
+        self._expires = np.zeros(self.capacity, dtype="float64")
+        self._last_used = np.zeros(self.capacity, dtype="float64")
+        self._key_codes = np.full(self.capacity, -1, dtype="int64")
+        self._answers: List[str | None] = [None] * self.capacity
+        # (namespace, chunk_key, revision) -> code, reference-counted by slot.
+        self._codes: Dict[Tuple[str, str, str], int] = {}
+        self._code_keys: Dict[int, Tuple[str, str, str]] = {}
+        self._code_refs: Dict[int, int] = {}
+        self._next_code = 0
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._load()
+
+    # ----- storage -----
+
+    def _acquire_code(self, namespace: str, chunks: str, revision: str) -> int:
+        key = (namespace, chunks, revision)
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = self._next_code
+            self._code_keys[code] = key
+            self._next_code += 1
+        self._code_refs[code] = self._code_refs.get(code, 0) + 1
+        return code
+
+    def _release_code(self, code: int) -> None:
+        """Forget a code once no slot uses it (old revisions / chunk sets)."""
+        self._code_refs[code] -= 1
+        if self._code_refs[code] == 0:
+            del self._code_refs[code]
+            del self._codes[self._code_keys.pop(code)]
+
+    def _load(self) -> None:
+        now = time.time()
+        self._db.execute("DELETE FROM answers WHERE space = ? AND expires <= ?", (self.space, now))
+        rows = self._db.execute(
+            "SELECT id, namespace, chunk_key, revision, embedding, answer, expires, last_used "
+            "FROM answers WHERE space = ? ORDER BY last_used DESC LIMIT ?",
+            (self.space, self.capacity),
+        ).fetchall()
+        self._db.commit()
+        slot = 0
+        for row_id, namespace, chunks, revision, blob, answer, expires, last_used in rows:
+            vec = np.frombuffer(blob, dtype="float32")
+            if vec.shape != (self.dim,):
+                continue
+            self._vectors[slot] = vec
+            self._row_ids[slot] = row_id
+            self._expires[slot] = expires
+            self._last_used[slot] = last_used
+            self._key_codes[slot] = self._acquire_code(namespace, chunks, revision)
+            self._answers[slot] = answer
+            slot += 1
+        logger.info("Answer cache ready at %s: %d entries", self.db_path, slot)
+
+    def _free_slot(self, now: float) -> int:
+        """A free slot, dropping expired entries or else the least recently used one."""
+        free = np.flatnonzero(self._row_ids == 0)
+        if len(free):
+            return int(free[0])
+        expired = np.flatnonzero(self._expires <= now)
+        slot = int(expired[0]) if len(expired) else int(np.argmin(self._last_used))
+        self._drop(slot)
+        return slot
+
+    def _drop(self, slot: int) -> None:
+        self._db.execute("DELETE FROM answers WHERE id = ?", (int(self._row_ids[slot]),))
+        self._row_ids[slot] = 0
+        self._release_code(int(self._key_codes[slot]))
+        self._key_codes[slot] = -1
+        self._answers[slot] = None
+
+    def _trim(self, now: float) -> None:
+        """
+        Keep at most `capacity` live rows of this space in the table. Other
+        workers' rows are only removed here; their in-memory copies stay
+        valid until evicted.
+        """
+        self._db.execute("DELETE FROM answers WHERE space = ? AND expires <= ?", (self.space, now))
+        self._db.execute(
+            "DELETE FROM answers WHERE space = ? AND id NOT IN "
+            "(SELECT id FROM answers WHERE space = ? ORDER BY last_used DESC LIMIT ?)",
+            (self.space, self.space, self.capacity),
+        )
+
+    @staticmethod
+    def _unit(vector: np.ndarray) -> np.ndarray:
+        vec = np.asarray(vector, dtype="float32").reshape(-1)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else vec
+
+    # ----- public API -----
+
+    def get(self, query_vector: np.ndarray, chunk_ids: List[str], revision: str, namespace: str = "") -> str | None:
+        """Return a cached answer for this question / retrieval, or None."""
+        q = self._unit(query_vector)
+        key = (namespace, chunk_key(chunk_ids), revision)
+        with self._lock:
+            now = time.time()
+            code = self._codes.get(key)
+            if code is not None:
+                match = (self._key_codes == code) & (self._expires > now)
+                candidates = np.flatnonzero(match)
+                if len(candidates):
+                    sims = self._vectors[candidates] @ q
+                    best = int(np.argmax(sims))
+                    if sims[best] >= self.threshold:
+                        slot = int(candidates[best])
+                        self._last_used[slot] = now
+                        self._db.execute(
+                            "UPDATE answers SET last_used = ? WHERE id = ?", (now, int(self._row_ids[slot]))
+                        )
+                        self._db.commit()
+                        self.hits += 1
+                        return self._answers[slot]
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        query_vector: np.ndarray,
+        chunk_ids: List[str],
+        revision: str,
+        answer: str,
+        namespace: str = "",
+    ) -> None:
+        q = self._unit(query_vector)
+        chunks = chunk_key(chunk_ids)
+        with self._lock:
+            now = time.time()
+            expires = now + self.ttl_s if self.ttl_s > 0 else float("inf")
+            slot = self._free_slot(now)
+            cur = self._db.execute(
+                "INSERT INTO answers (space, namespace, chunk_key, revision, embedding, answer, expires, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.space, namespace, chunks, revision, q.tobytes(), answer, expires, now),
+            )
+            self._trim(now)
+            self._db.commit()
+            self._vectors[slot] = q
+            self._row_ids[slot] = cur.lastrowid
+            self._expires[slot] = expires
+            self._last_used[slot] = now
+            self._key_codes[slot] = self._acquire_code(namespace, chunks, revision)
+            self._answers[slot] = answer
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM answers WHERE space = ?", (self.space,))
+            self._db.commit()
+            self._row_ids[:] = 0
+            self._key_codes[:] = -1
+            self._answers = [None] * self.capacity
+            self._codes.clear()
+            self._code_keys.clear()
+            self._code_refs.clear()
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._row_ids))
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
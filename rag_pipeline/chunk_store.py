@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import pickle
+import shutil
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+POINTER_FILE = "chunk_store.json"
+_NO_VALUE = -1  # page number meaning None
+
+
+@dataclass
+class ChunkMetadata:
+    id: str
+    content: str
+    source: str
+    page: int | None
+    section: str | None
+
+
+def _map_blob(path: Path) -> np.ndarray:
+    # np.memmap refuses empty files.
+    if path.stat().st_size == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+class ChunkStore:
+    """
+    Read-only, memory-mapped columnar chunk metadata (replaces `chunks.pkl`).
+
+    One row per FAISS vector, rows sorted by FAISS id:
+      ids.npy                      int64 FAISS ids
+      content.bin / content_offsets.npy    UTF-8 text blob + (n+1) offsets
+      chunk_ids.bin / chunk_id_offsets.npy chunk id strings
+      sections.bin / section_offsets.npy   section titles ("" = None)
+      source_codes.npy             int32 index into `sources` (interned names)
+      pages.npy                    int32 page number (-1 = None)
+
+    Opening only maps the files, so load time does not depend on corpus size
+    and worker processes share the pages through the OS page cache.
+    ChunkMetadata objects are materialized on demand for the rows asked for.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        with (root / "vocab.json").open("r", encoding="utf-8") as f:
+            self.sources: List[str] = json.load(f)["sources"]
+
+        def col(name: str) -> np.ndarray:
+            return np.load(root / name, mmap_mode="r")
+
+        self.ids = col("ids.npy")
+        self._content = _map_blob(root / "content.bin")
+        self._content_offsets = col("content_offsets.npy")
+        self._chunk_ids = _map_blob(root / "chunk_ids.bin")
+        self._chunk_id_offsets = col("chunk_id_offsets.npy")
+        self._sections = _map_blob(root / "sections.bin")
+        self._section_offsets = col("section_offsets.npy")
+        self.source_codes = col("source_codes.npy")
+        self.pages = col("pages.npy")
+
+    @classmethod
+    def open(cls, vector_store_dir: Path) -> ChunkStore | None:
+        pointer = Path(vector_store_dir) / POINTER_FILE
+        if not pointer.exists():
+            return None
+        current = _read_pointer(pointer)["dir"]
+        try:
+            return cls(Path(vector_store_dir) / current)
+        except FileNotFoundError:
+            # Two commits landed between reading the pointer and opening the
+            # generation it named (commit keeps one previous generation).
+            logger.info("Chunk store generation %s was replaced while opening; retrying", current)
+            return cls(Path(vector_store_dir) / _read_pointer(pointer)["dir"])
+
+    # ----- row access -----
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _text(blob: np.ndarray, offsets: np.ndarray, pos: int) -> str:
+        return blob[offsets[pos]:offsets[pos + 1]].tobytes().decode("utf-8")
+
+    def row(self, pos: int) -> ChunkMetadata:
+        page = int(self.pages[pos])
+        section = self._text(self._sections, self._section_offsets, pos)
+        return ChunkMetadata(
+            id=self._text(self._chunk_ids, self._chunk_id_offsets, pos),
+            content=self._text(self._content, self._content_offsets, pos),
+            source=self.sources[self.source_codes[pos]],
+            page=None if page == _NO_VALUE else page,
+            section=section or None,
+        )
+
+    def __getitem__(self, pos: int) -> ChunkMetadata:
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError(pos)
+        return self.row(pos)
+
+    def __iter__(self) -> Iterator[ChunkMetadata]:
+        for pos in range(len(self)):
+            yield self.row(pos)
+
+    def positions(self, vector_ids: np.ndarray) -> np.ndarray:
+        """Row positions for FAISS ids (vectorized binary search); -1 if absent."""
+        vector_ids = np.asarray(vector_ids, dtype="int64")
+        if len(self.ids) == 0:
+            return np.full(vector_ids.shape, -1, dtype="int64")
+        pos = np.searchsorted(self.ids, vector_ids)
+        pos = np.minimum(pos, len(self.ids) - 1)
+        return np.where(self.ids[pos] == vector_ids, pos, -1)
+
+    def get(self, vector_id: int) -> ChunkMetadata | None:
+        pos = int(self.positions(np.array([vector_id]))[0])
+        return None if pos < 0 else self.row(pos)
+
+    def source_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.source_codes, minlength=len(self.sources))
+        return {name: int(c) for name, c in zip(self.sources, counts) if c}
+
+    def ids_by_source(self) -> Dict[str, List[int]]:
+        out: Dict[str, List[int]] = {}
+        for code, vid in zip(self.source_codes.tolist(), self.ids.tolist()):
+            out.setdefault(self.sources[code], []).append(vid)
+        return out
+
+
+class _StringColumn:
+    """Append-only UTF-8 blob written straight to disk, plus offsets."""
+
+    def __init__(self, path: Path):
+        self.file = path.open("wb")
+        self.offsets: List[int] = [0]
+
+    def append(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.file.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+
+    def copy_rows(self, blob: np.ndarray, offsets: np.ndarray, start: int, stop: int) -> None:
+        """Copy rows [start, stop) of another store's column in one write."""
+        lo, hi = int(offsets[start]), int(offsets[stop])
+        self.file.write(blob[lo:hi].tobytes())
+        base = self.offsets[-1] - lo
+        self.offsets.extend((np.asarray(offsets[start + 1:stop + 1]) + base).tolist())
+
+    def close(self, offsets_path: Path) -> None:
+        self.file.close()
+        np.save(offsets_path, np.asarray(self.offsets, dtype="int64"))
+
+
+class ChunkStoreWriter:
+    """
+    Builds a new ChunkStore generation next to the current one.
+
+    Text is streamed to disk as rows are added. `commit` switches the
+    pointer file atomically, so readers see either the old or the new store.
+    The generation it replaces is kept until the next commit, so a reader
+    that has just read the pointer can still open it; the one before that is
+    deleted (already mapped pages stay valid on POSIX).
+    """
+
+    def __init__(self, vector_store_dir: Path):
+        self.vector_store_dir = Path(vector_store_dir)
+        self.vector_store_dir.mkdir(parents=True, exist_ok=True)
+        self.name = f"chunks-{uuid.uuid4().hex[:12]}"
+        self.root = self.vector_store_dir / self.name
+        self.root.mkdir()
+
+        self._content = _StringColumn(self.root / "content.bin")
+        self._chunk_ids = _StringColumn(self.root / "chunk_ids.bin")
+        self._sections = _StringColumn(self.root / "sections.bin")
+        self._ids: List[int] = []
+        self._source_codes: List[int] = []
+        self._pages: List[int] = []
+        self._sources: Dict[str, int] = {}
+
+    def _source_code(self, source: str) -> int:
+        return self._sources.setdefault(source, len(self._sources))
+
+    def add(self, vector_id: int, chunk: ChunkMetadata) -> None:
+        self._ids.append(int(vector_id))
+        self._content.append(chunk.content)
+        self._chunk_ids.append(chunk.id)
+        self._sections.append(chunk.section or "")
+        self._source_codes.append(self._source_code(chunk.source))
+        self._pages.append(_NO_VALUE if chunk.page is None else int(chunk.page))
+
+    def copy_from(self, store: ChunkStore, keep: np.ndarray) -> None:
+        """Copy the rows of `store` where `keep` is True, run by run."""
+        keep = np.asarray(keep, dtype=bool)
+        if not keep.any():
+            return
+        remap = np.array([self._source_code(s) for s in store.sources], dtype="int64")
+        for start, stop in _runs(keep):
+            self._content.copy_rows(store._content, store._content_offsets, start, stop)
+            self._chunk_ids.copy_rows(store._chunk_ids, store._chunk_id_offsets, start, stop)
+            self._sections.copy_rows(store._sections, store._section_offsets, start, stop)
+            self._ids.extend(store.ids[start:stop].tolist())
+            self._source_codes.extend(remap[store.source_codes[start:stop]].tolist())
+            self._pages.extend(store.pages[start:stop].tolist())
+
+    def commit(self) -> ChunkStore:
+        ids = np.asarray(self._ids, dtype="int64")
+        if len(ids) > 1 and np.any(np.diff(ids) <= 0):
+            raise ValueError("ChunkStore rows must be added in increasing FAISS id order")
+
+        self._content.close(self.root / "content_offsets.npy")
+        self._chunk_ids.close(self.root / "chunk_id_offsets.npy")
+        self._sections.close(self.root / "section_offsets.npy")
+        np.save(self.root / "ids.npy", ids)
+        np.save(self.root / "source_codes.npy", np.asarray(self._source_codes, dtype="int32"))
+        np.save(self.root / "pages.npy", np.asarray(self._pages, dtype="int32"))
+        with (self.root / "vocab.json").open("w", encoding="utf-8") as f:
+            json.dump({"sources": list(self._sources)}, f)
+
+        pointer = self.vector_store_dir / POINTER_FILE
+        replaced = _read_pointer(pointer) if pointer.exists() else {}
+        previous = replaced.get("dir")
+        tmp_pointer = pointer.with_suffix(".tmp")
+        with tmp_pointer.open("w", encoding="utf-8") as f:
+            json.dump({"dir": self.name, "rows": len(ids), "previous": previous}, f)
+        os.replace(tmp_pointer, pointer)
+
+        expired = replaced.get("previous")
+        if expired and expired not in (previous, self.name):
+            shutil.rmtree(self.vector_store_dir / expired, ignore_errors=True)
+        logger.info("Chunk store written: %d rows in %s", len(ids), self.root)
+        return ChunkStore(self.root)
+
+    def abort(self) -> None:
+        for column in (self._content, self._chunk_ids, self._sections):
+            column.file.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def _read_pointer(pointer: Path) -> Dict[str, Any]:
+    with pointer.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """[start, stop) ranges of consecutive True values."""
+    padded = np.concatenate([[False], mask, [False]])
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return list(zip(edges[0::2].tolist(), edges[1::2].tolist()))
+
+
+def write_chunk_store(vector_store_dir: Path, chunks: Dict[int, ChunkMetadata]) -> ChunkStore:
+    """Write a whole id -> chunk mapping (used to migrate `chunks.pkl`)."""
+    writer = ChunkStoreWriter(vector_store_dir)
+    for vid in sorted(chunks):
+        writer.add(vid, chunks[vid])
+    return writer.commit()
+
+
+def _load_legacy_pickle(meta_path: Path) -> Dict[int, ChunkMetadata]:
+    """
+    Read a `chunks.pkl` from before the columnar store.
+
+    It holds either an id -> chunk dict, or a plain list whose positions were
+    the FAISS ids.
+    """
+    with meta_path.open("rb") as f:
+        data = pickle.load(f)
+    if isinstance(data, list):
+        return dict(enumerate(data))
+    return data
+
+
+def open_chunk_store(vector_store_dir: Path) -> ChunkStore | None:
+    """Open the current chunk store, migrating a legacy `chunks.pkl` once."""
+    store = ChunkStore.open(vector_store_dir)
+    if store is not None:
+        return store
+    legacy = Path(vector_store_dir) / "chunks.pkl"
+    if not legacy.exists():
+        return None
+    logger.info("Migrating %s to the columnar chunk store", legacy)
+    store = write_chunk_store(vector_store_dir, _load_legacy_pickle(legacy))
+    legacy.unlink()
+    return store
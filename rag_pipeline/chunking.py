@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import logging
+import re
+from typing import Iterator, List, Tuple
+
+from rag_pipeline.chunk_store import ChunkMetadata
+
+logger = logging.getLogger(__name__)
+
+# A heading line: Markdown ("## Pricing"), or a short line without end
+# punctuation that opens a paragraph (plain-text / PDF headings: "Refund
+# policy"; the lookahead rejects long lines before the heading rules backtrack).
+_MD_HEADING = r"#{1,6}[ \t]+(?P<md>[^\n]*?)[ \t#]*(?=\n|\Z)"
+_PLAIN_HEADING = r"(?=[^\n]{1,64}\n)(?P<plain>[A-Z][^\n.!?,;:]{0,58}[^\n.!?,;:\s])[ \t]*(?=\n)"
+_FIRST_HEADING_RE = re.compile(f"{_MD_HEADING}|{_PLAIN_HEADING}")
+# Headings after the first line: "\n#..." or "\n\nTitle". Every match starts
+# with a literal newline, so the regex engine skips ahead between newlines
+# instead of trying every offset.
+_HEADING_RE = re.compile(rf"\n(?:{_MD_HEADING}|\n{_PLAIN_HEADING})")
+
+# The end of a sentence (. ! ? with an optional closing quote / bracket, then
+# whitespace, then anything but a lowercase letter: "e.g. this" does not
+# split) or a blank line. A match ends where the next sentence / paragraph
+# starts. The leading character class lets the engine skip to candidates.
+_BREAK = r"[.!?\n](?:(?<=[.!?])[\"')\]]?[ \t\n]+(?=[^a-z\s])|(?<=\n)[ \t]*\n)"
+_BREAK_RE = re.compile(_BREAK)
+# The same, but the last one in the searched range (greedy prefix).
+_LAST_BREAK_RE = re.compile(r".*" + _BREAK, re.S)
+
+
+def _headings(text: str) -> Iterator[Tuple[int, str]]:
+    """(offset of the heading line, title) in document order, found lazily as chunking advances."""
+    m = _FIRST_HEADING_RE.match(text)
+    if m is not None and (m["md"] or m["plain"]):
+        yield 0, m["md"] or m["plain"]
+    for m in _HEADING_RE.finditer(text):
+        if m["md"]:
+            yield m.start() + 1, m["md"]
+        elif m["plain"]:
+            yield m.start() + 2, m["plain"]
+
+
+def chunk_structured(
+    text: str,
+    source: str,
+    page: int | None,
+    size: int,
+    overlap: int,
+    section: str | None = None,
+) -> Tuple[List[ChunkMetadata], str | None]:
+    """
+    Split `text` into chunks of at most `size` characters along its structure:
+
+      - a heading always starts a new chunk, and sets `section` for the
+        chunks below it until the next heading
+      - otherwise a chunk ends at the last paragraph / sentence boundary that
+        fits (at a space if no boundary falls in its second half, and hard at
+        `size` only for text without either)
+      - the next chunk repeats the whole sentences from the last `overlap`
+        characters of the previous one (no overlap across headings)
+
+    The text is processed in one forward pass: headings come from a lazy
+    scan that stays just ahead of the current chunk, and boundaries are
+    only searched for inside each chunk's end and overlap windows, so the
+    cost does not grow with the number of sentences. `section` carries a
+    heading over from the previous page; the section in effect at the end
+    is returned for the next one.
+    """
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    n = len(text)
+    chunks: List[ChunkMetadata] = []
+    id_prefix = f"{source}::p{page or 0}::c"
+    last_break = _LAST_BREAK_RE.match
+    first_break = _BREAK_RE.search
+    headings = _headings(text)
+    next_heading = next(headings, None)
+
+    start = n - len(text.lstrip())
+    while start < n:
+        at_heading = False
+        while next_heading is not None and next_heading[0] <= start:
+            at_heading = next_heading[0] == start
+            section = next_heading[1]
+            next_heading = next(headings, None)
+        heading_pos = next_heading[0] if next_heading is not None else n
+        limit = start + size
+        if heading_pos <= limit:
+            end = heading_pos
+        elif limit >= n:
+            end = n
+        else:
+            min_end = start + size // 2
+            m = last_break(text, min_end, limit)
+            if m is not None:
+                end = m.end()
+            else:
+                space = text.rfind(" ", min_end, limit)
+                end = space + 1 if space != -1 else limit
+
+        # `start` is never whitespace; trim the tail before slicing (one copy).
+        stop = end
+        while stop > start and text[stop - 1] in " \t\n":
+            stop -= 1
+        content = text[start:stop]
+        if content and not (at_heading and "\n" not in content):  # skip heading-only chunks
+            chunks.append(ChunkMetadata(f"{id_prefix}{len(chunks)}", content, source, page, section))
+        if end >= n:
+            break
+
+        next_start = end
+        if overlap > 0 and end != heading_pos:
+            window = start + 1 if end - overlap <= start else end - overlap
+            m = first_break(text, window, end)
+            if m is not None and m.end() < end:
+                next_start = m.end()
+            else:
+                space = text.find(" ", window, end)
+                if space != -1:
+                    next_start = space + 1
+        while next_start < n and text[next_start].isspace():
+            next_start += 1
+        start = next_start
+    return chunks, section
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, List, Tuple
+
+from rag_pipeline.retrieval import RetrievedChunk
+
+logger = logging.getLogger(__name__)
+
+# Ids written by ingestion.chunk_text: "<source>::p<page>::c<index>".
+_CHUNK_ID_RE = re.compile(r"^(?P<source>.*)::p(?P<page>\d+)::c(?P<index>\d+)$")
+# Offline approximation of a BPE tokenizer: words, up to 3 digits, punctuation.
+_TOKEN_RE = re.compile(r"\d{1,3}|[^\W\d]+|[^\w\s]")
+MIN_OVERLAP_CHARS = 20  # shorter suffix / prefix matches are treated as coincidence
+
+
+class TokenCounter:
+    """
+    Counts tokens with tiktoken when it is installed (and its encoding can be
+    loaded), else with a regex approximation that is close for English
+    prose. The encoding is loaded on first use.
+    """
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        self.encoding_name = encoding
+        self._encoding: Any | None = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> Any | None:
+        with self._lock:
+            if not self._loaded:
+                try:
+                    import tiktoken  # type: ignore
+
+                    self._encoding = tiktoken.get_encoding(self.encoding_name)
+                except Exception as e:  # not installed, or no cached encoding offline
+                    logger.warning(
+                        "tiktoken unavailable (%s); prompt token counts and context budgets are approximate", e
+                    )
+                    self._encoding = None
+                self._loaded = True
+            return self._encoding
+
+    @property
+    def exact(self) -> bool:
+        return self._load() is not None
+
+    def count(self, text: str) -> int:
+        encoding = self._load()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return len(_TOKEN_RE.findall(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The longest prefix of `text` within `max_tokens`."""
+        if max_tokens <= 0:
+            return ""
+        encoding = self._load()
+        if encoding is not None:
+            tokens = encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+        matches = list(_TOKEN_RE.finditer(text))
+        return text if len(matches) <= max_tokens else text[: matches[max_tokens].start()].rstrip()
+
+
+_COUNTER = TokenCounter()
+
+
+def get_token_counter() -> TokenCounter:
+    """Return the process-wide token counter."""
+    return _COUNTER
+
+
+def chunk_position(chunk_id: str) -> Tuple[str, int, int] | None:
+    """(source, page, index) parsed from a chunk id, or None for other id formats."""
+    m = _CHUNK_ID_RE.match(chunk_id)
+    if m is None:
+        return None
+    return m.group("source"), int(m.group("page")), int(m.group("index"))
+
+
+def overlap_length(left: str, right: str, max_chars: int | None = None) -> int:
+    """Length of the longest suffix of `left` that is also a prefix of `right`."""
+    limit = min(len(left), len(right), max_chars if max_chars is not None else len(right))
+    if limit < MIN_OVERLAP_CHARS:
+        return 0
+    probe = right[:MIN_OVERLAP_CHARS]
+    pos = left.find(probe, len(left) - limit)
+    while pos != -1:
+        if right.startswith(left[pos:]):
+            return len(left) - pos
+        pos = left.find(probe, pos + 1)
+    return 0
+
+
+@dataclass
+class ContextBlock:
+    """One passage of the prompt: a chunk, or neighbouring chunks merged."""
+
+    ids: List[str]
+    source: str
+    page: int | None
+    content: str
+    score: float
+    tokens: int = 0
+
+    def label(self) -> str:
+        label = self.source
+        if self.page:
+            label += f", page {self.page}"
+        return label
+
+    def render(self) -> str:
+        return f"[{', '.join(self.ids)}] ({self.label()})\n{self.content}"
+
+
+@dataclass
+class PackedContext:
+    blocks: List[ContextBlock] = field(default_factory=list)  # prompt order: best score first
+    tokens: int = 0  # of the rendered context text
+    dropped_ids: List[str] = field(default_factory=list)  # retrieved but over budget
+    deduped_chars: int = 0  # overlapping text removed while merging
+
+    @property
+    def ids(self) -> List[str]:
+        return [chunk_id for block in self.blocks for chunk_id in block.ids]
+
+    def sources(self) -> List[str]:
+        """Sources in prompt order, each once."""
+        return list(dict.fromkeys(block.source for block in self.blocks))
+
+    def text(self) -> str:
+        return "\n\n".join(block.render() for block in self.blocks)
+
+
+class ContextPacker:
+    """
+    Turns retrieved chunks into prompt context within a token budget:
+
+      - chunks that are neighbours on the same source / page (consecutive
+        chunk indices) are merged into one block, with the text they share
+        through the chunking overlap kept once; identical passages are dropped
+      - blocks are ranked by their best chunk score (ties broken by source,
+        page and position, so the same retrieval always packs the same way)
+      - blocks are added in that order while they fit `max_tokens`; a block
+        that does not fit is skipped in favour of smaller ones below it, and
+        the top block is truncated rather than dropped if it alone is too big
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 1500,
+        merge_neighbours: bool = True,
+        counter: TokenCounter | None = None,
+    ):
+        self.max_tokens = max_tokens
+        self.merge_neighbours = merge_neighbours
+        self.counter = counter or get_token_counter()
+
+    def _blocks(self, retrieved: List[RetrievedChunk]) -> Tuple[List[ContextBlock], int]:
+        keyed: List[Tuple[Tuple, RetrievedChunk]] = []
+        seen_content = set()
+        for rc in retrieved:
+            meta = rc.metadata
+            if meta.content in seen_content:
+                continue
+            seen_content.add(meta.content)
+            pos = chunk_position(meta.id)
+            if pos is None or not self.merge_neighbours:
+                keyed.append(((meta.source, meta.page or 0, -1, meta.id), rc))
+            else:
+                keyed.append(((meta.source, meta.page or 0, pos[2], meta.id), rc))
+        keyed.sort(key=lambda item: item[0])
+
+        blocks: List[ContextBlock] = []
+        deduped = 0
+        prev_key: Tuple | None = None
+        for key, rc in keyed:
+            meta = rc.metadata
+            last = blocks[-1] if blocks else None
+            adjacent = (
+                last is not None
+                and prev_key is not None
+                and key[2] >= 0
+                and prev_key[:2] == key[:2]
+                and prev_key[2] + 1 == key[2]
+            )
+            if adjacent:
+                shared = overlap_length(last.content, meta.content)
+                deduped += shared
+                joiner = "" if shared else "\n"
+                last.content += joiner + meta.content[shared:]
+                last.ids.append(meta.id)
+                last.score = max(last.score, rc.score)
+            else:
+                blocks.append(ContextBlock([meta.id], meta.source, meta.page, meta.content, rc.score))
+            prev_key = key
+        return blocks, deduped
+
+    def pack(self, retrieved: List[RetrievedChunk]) -> PackedContext:
+        blocks, deduped = self._blocks(retrieved)
+        blocks.sort(key=lambda b: (-b.score, b.source, b.page or 0, b.ids[0]))
+        separator = self.counter.count("\n\n")
+
+        packed = PackedContext(deduped_chars=deduped)
+        budget = self.max_tokens
+        for block in blocks:
+            cost = self.counter.count(block.render()) + (separator if packed.blocks else 0)
+            if cost > budget and not packed.blocks:
+                # Keep at least part of the best passage.
+                header = self.counter.count(block.render()) - self.counter.count(block.content)
+                block.content = self.counter.truncate(block.content, budget - header)
+                cost = self.counter.count(block.render())
+            if cost > budget or not block.content:
+                packed.dropped_ids.extend(block.ids)
+                continue
+            block.tokens = cost
+            packed.blocks.append(block)
+            packed.tokens += cost
+            budget -= cost
+        return packed
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+KEY_BYTES = 20  # sha1 digest size
+
+
+def _model_slug(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form of `text` used for cache keys."""
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache shared by ingestion and retrieval.
+
+    Entries are keyed by sha1(model name + normalized text), so identical
+    chunks and repeated customer questions skip the model forward pass.
+
+    - Disk tier (per model, in `cache_dir/<model>-<dim>/`), all memory-mapped:
+        vectors.npy  float32 (capacity, dim)
+        keys.npy     uint8 (capacity, 20) sha1 digests, all-zero = free slot
+        ticks.npy    int64 last-access tick, used for LRU eviction when full
+    - Memory tier: a small LRU of recently used vectors in front of the disk.
+
+    Several processes may map the same files; a slot's key is re-checked
+    before its vector is trusted, so a slot overwritten elsewhere is just a miss.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        model_name: str,
+        dim: int,
+        max_entries: int = 50_000,
+        memory_entries: int = 4096,
+    ):
+        self.model_name = model_name
+        self.dim = dim
+        self.capacity = max_entries
+        self.memory_entries = memory_entries
+        self.dir = Path(cache_dir) / f"{_model_slug(model_name)}-{dim}"
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[bytes, np.ndarray] = OrderedDict()
+
+        self._open()
+
+    # ----- storage -----
+
+    def _open(self) -> None:
+        if self.capacity <= 0:
+            # Memory tier only.
+            self._vectors = np.zeros((0, self.dim), dtype="float32")
+            self._keys = np.zeros((0, KEY_BYTES), dtype="uint8")
+            self._ticks = np.zeros(0, dtype="int64")
+            self._tick = 0
+            self._slots: Dict[bytes, int] = {}
+            return
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        vec_path = self.dir / "vectors.npy"
+        key_path = self.dir / "keys.npy"
+        tick_path = self.dir / "ticks.npy"
+
+        try:
+            vectors = np.load(vec_path, mmap_mode="r+")
+            keys = np.load(key_path, mmap_mode="r+")
+            ticks = np.load(tick_path, mmap_mode="r+")
+            if vectors.shape != (self.capacity, self.dim) or keys.shape != (self.capacity, KEY_BYTES):
+                raise ValueError("cache shape does not match configuration")
+        except (OSError, ValueError) as e:
+            if vec_path.exists():
+                logger.info("Recreating embedding cache at %s (%s)", self.dir, e)
+            open_memmap = np.lib.format.open_memmap
+            vectors = open_memmap(vec_path, mode="w+", dtype="float32", shape=(self.capacity, self.dim))
+            keys = open_memmap(key_path, mode="w+", dtype="uint8", shape=(self.capacity, KEY_BYTES))
+            ticks = open_memmap(tick_path, mode="w+", dtype="int64", shape=(self.capacity,))
+
+        self._vectors = vectors
+        self._keys = keys
+        self._ticks = ticks
+        self._tick = int(ticks.max()) + 1 if len(ticks) else 0
+        occupied = np.flatnonzero(keys.any(axis=1))
+        self._slots = {keys[i].tobytes(): int(i) for i in occupied}
+        logger.info("Embedding cache ready at %s: %d entries", self.dir, len(self._slots))
+
+    def _free_slots(self, n: int) -> np.ndarray:
+        """Return `n` writable slots, evicting least-recently-used entries if needed."""
+        used = self._keys.any(axis=1)
+        empty = np.flatnonzero(~used)
+        if len(empty) >= n:
+            return empty[:n]
+
+        occupied = np.flatnonzero(used)
+        need = n - len(empty)
+        lru = occupied[np.argpartition(self._ticks[occupied], need - 1)[:need]]
+        for slot in lru:
+            self._slots.pop(self._keys[slot].tobytes(), None)
+        return np.concatenate([empty, lru])
+
+    # ----- public API -----
+
+    def key(self, text: str) -> bytes:
+        payload = f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha1(payload).digest()
+
+    def get_many(
+        self,
+        texts: List[str],
+        compute: Callable[[List[str]], np.ndarray],
+    ) -> np.ndarray:
+        """
+        Return embeddings for `texts`, calling `compute` once with only the
+        texts that are not cached (deduplicated).
+        """
+        out = np.empty((len(texts), self.dim), dtype="float32")
+        missing: Dict[bytes, List[int]] = {}
+        missing_texts: List[str] = []
+
+        with self._lock:
+            for i, text in enumerate(texts):
+                k = self.key(text)
+                vec = self._lookup(k)
+                if vec is not None:
+                    out[i] = vec
+                    self.hits += 1
+                    continue
+                if k not in missing:
+                    missing[k] = []
+                    missing_texts.append(text)
+                missing[k].append(i)
+                self.misses += 1
+
+        if not missing:
+            return out
+
+        computed = np.asarray(compute(missing_texts), dtype="float32")
+        with self._lock:
+            for (k, rows), vec in zip(missing.items(), computed):
+                out[rows] = vec
+            self._store(list(missing), computed)
+        return out
+
+    def _lookup(self, k: bytes) -> np.ndarray | None:
+        vec = self._memory.get(k)
+        if vec is not None:
+            self._memory.move_to_end(k)
+            return vec
+
+        slot = self._slots.get(k)
+        if slot is None or self._keys[slot].tobytes() != k:
+            return None
+        vec = np.array(self._vectors[slot])
+        self._ticks[slot] = self._tick
+        self._tick += 1
+        self._remember(k, vec)
+        return vec
+
+    def _remember(self, k: bytes, vec: np.ndarray) -> None:
+        if self.memory_entries <= 0:
+            return
+        self._memory[k] = vec
+        self._memory.move_to_end(k)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _store(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        for k, vec in zip(keys, vectors):
+            self._remember(k, vec)
+        if self.capacity <= 0:
+            return
+
+        # Only the most recent `capacity` entries can be kept on disk.
+        keys = keys[-self.capacity:]
+        vectors = vectors[-self.capacity:]
+        slots = self._free_slots(len(keys))
+
+        # Clear keys first so concurrent readers never pair a key with a stale vector.
+        self._keys[slots] = 0
+        self._vectors[slots] = vectors
+        self._ticks[slots] = np.arange(self._tick, self._tick + len(keys))
+        self._tick += len(keys)
+        self._keys[slots] = np.frombuffer(b"".join(keys), dtype="uint8").reshape(-1, KEY_BYTES)
+        for k, slot in zip(keys, slots):
+            self._slots[k] = int(slot)
+        self.flush()
+
+    def flush(self) -> None:
+        if self.capacity <= 0:
+            return
+        self._vectors.flush()
+        self._keys.flush()
+        self._ticks.flush()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._slots),
+        }
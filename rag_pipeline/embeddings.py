@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any, List
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from rag_pipeline.embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_MODES = ("ngram", "bytes")
+_NGRAM_BATCH = 4096  # texts per bincount, bounds the (batch, dim) scratch matrix
+
+
+def byte_embeddings(texts: List[str], dim: int) -> np.ndarray:
+    """
+    Original fallback: the first `dim` UTF-8 bytes of each text, scaled to [0, 1].
+
+    All texts are packed into one buffer and scattered into a preallocated
+    zero-padded matrix with a single boolean-mask assignment.
+    """
+    out = np.zeros((len(texts), dim), dtype="float32")
+    if not texts:
+        return out
+    encoded = [t.encode("utf-8")[:dim] for t in texts]
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+    flat = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    # Row-major mask order matches the concatenation order of `flat`.
+    mask = np.arange(dim) < lengths[:, None]
+    out[mask] = flat / 255.0
+    return out
+
+
+def hashed_ngram_embeddings(texts: List[str], dim: int, n: int = 3) -> np.ndarray:
+    """
+    Hashed character n-gram term-frequency vectors (sqrt TF, L2-normalized).
+
+    Unlike the byte embedding, texts sharing words end up close in cosine /
+    L2 space, so retrieval still works without SentenceTransformer.
+    Hashing and counting are done with NumPy over the whole batch at once.
+    """
+    out = np.zeros((len(texts), dim), dtype="float32")
+    for start in range(0, len(texts), _NGRAM_BATCH):
+        batch = texts[start:start + _NGRAM_BATCH]
+        out[start:start + len(batch)] = _ngram_batch(batch, dim, n)
+    return out
+
+
+def _ngram_batch(texts: List[str], dim: int, n: int) -> np.ndarray:
+    # Lowercase, collapse whitespace and pad with spaces so word edges form n-grams.
+    encoded = [(" " + " ".join(t.lower().split()) + " ").encode("utf-8") for t in texts]
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+    flat = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    n_pos = len(flat) - n + 1
+    if n_pos <= 0:
+        return np.zeros((len(texts), dim), dtype="float32")
+
+    # Polynomial rolling hash of every n-gram window, then a final avalanche mix.
+    h = np.zeros(n_pos, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(n):
+            h = h * np.uint64(1099511628211) + flat[j:j + n_pos]
+        h ^= h >> np.uint64(29)
+        h *= np.uint64(0xBF58476D1CE4E5B9)
+        h ^= h >> np.uint64(32)
+
+    # Keep only windows that lie entirely inside one text.
+    ends = np.cumsum(lengths)
+    rows = np.repeat(np.arange(len(texts)), lengths)[:n_pos]
+    valid = np.arange(n_pos) + n <= ends[rows]
+    cols = (h[valid] % np.uint64(dim)).astype(np.int64)
+    rows = rows[valid]
+
+    counts = np.bincount(rows * dim + cols, minlength=len(texts) * dim)
+    tf = np.sqrt(counts.reshape(len(texts), dim).astype("float32"))
+    norms = np.linalg.norm(tf, axis=1, keepdims=True)
+    np.divide(tf, norms, out=tf, where=norms > 0)
+    return tf
+
+
+class Embedder:
+    """
+    Single embedding entry point shared by IngestionEngine and VectorStore.
+
+    - With a SentenceTransformer model, texts go through the shared
+      EmbeddingCache and only cache misses reach the model.
+    - Without one, a batched NumPy fallback is used ("ngram" by default,
+      "bytes" reproduces the original byte embedding).
+    """
+
+    def __init__(
+        self,
+        st_model: Any | None,
+        model_name: str,
+        dim: int,
+        cache: EmbeddingCache | None = None,
+        fallback: str = "ngram",
+    ):
+        if fallback not in FALLBACK_MODES:
+            raise ValueError(f"Unknown fallback embedding '{fallback}', expected one of {FALLBACK_MODES}")
+        self.st_model = st_model
+        self.model_name = model_name
+        self.dim = dim
+        self.cache = cache
+        self.fallback = fallback
+
+    @property
+    def name(self) -> str:
+        """Identifies the vector space; recorded in the index manifest."""
+        if self.st_model is not None:
+            return self.model_name
+        return f"fallback:{self.fallback}"
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        embs = self.st_model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+        return embs.astype("float32")
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if self.st_model is not None:
+            if self.cache is not None:
+                return self.cache.get_many(texts, self._encode)
+            return self._encode(texts)
+
+        if self.fallback == "bytes":
+            return byte_embeddings(texts, self.dim)
+        return hashed_ngram_embeddings(texts, self.dim)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DocumentEntry:
+    sha256: str
+    path: str
+    vector_ids: List[int] = field(default_factory=list)
+
+
+@dataclass
+class IndexManifest:
+    """
+    Bookkeeping for incremental ingestion, persisted as `manifest.json`
+    next to the FAISS index.
+
+    - `documents` maps a source name to the content hash of the file it was
+      built from and the FAISS ids of its chunks.
+    - `next_id` is the next unused FAISS id (ids are never reused).
+    - `embedding_model` / `embedding_dim` identify the vector space and
+      `chunking` how documents were cut ("<chunker>:<size>:<overlap>"); if
+      any of them changes, the whole index has to be rebuilt.
+    - `format_version` / `metric` describe how vectors are stored (see
+      rag_pipeline.vector_index); stores without them are the original
+      raw-L2 format and get migrated on load.
+    - `revision` changes on every write of the index; caches derived from
+      search results (e.g. the answer cache) use it to detect re-ingestion.
+    """
+
+    documents: Dict[str, DocumentEntry] = field(default_factory=dict)
+    next_id: int = 0
+    embedding_model: str | None = None
+    embedding_dim: int | None = None
+    chunking: str | None = None
+    format_version: int = 1
+    metric: str = "l2"
+    revision: str = ""
+
+    @classmethod
+    def load(cls, path: Path) -> IndexManifest:
+        if not path.exists():
+            return cls()
+        with path.open("r", encoding="utf-8") as f:
+            raw = json.load(f)
+        documents = {name: DocumentEntry(**entry) for name, entry in raw.get("documents", {}).items()}
+        return cls(
+            documents=documents,
+            next_id=int(raw.get("next_id", 0)),
+            embedding_model=raw.get("embedding_model"),
+            embedding_dim=raw.get("embedding_dim"),
+            chunking=raw.get("chunking"),
+            format_version=int(raw.get("format_version", 1)),
+            metric=raw.get("metric", "l2"),
+            revision=raw.get("revision", ""),
+        )
+
+    def save(self, path: Path) -> None:
+        # Write to a temp file first so readers never see a half-written manifest.
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(asdict(self), f)
+        os.replace(tmp_path, path)
+
+    def new_revision(self) -> str:
+        self.revision = uuid.uuid4().hex
+        return self.revision
+
+    def allocate_ids(self, n: int) -> List[int]:
+        ids = list(range(self.next_id, self.next_id + n))
+        self.next_id += n
+        return ids
+
+    def n_vectors(self) -> int:
+        return sum(len(entry.vector_ids) for entry in self.documents.values())
@@ -1,26 +1,169 @@
 from __future__ import annotations
 
+import hashlib
 import logging
-import pickle
+import os
+import time
+from collections import deque
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Tuple
 
-import faiss
 import numpy as np
 
 from app.config import RAGConfig, PathsConfig
+from rag_pipeline.chunk_store import ChunkMetadata, ChunkStore, ChunkStoreWriter, open_chunk_store
+from rag_pipeline.chunking import chunk_structured
+from rag_pipeline.index_manifest import DocumentEntry, IndexManifest
+from rag_pipeline.lazy_imports import lazy_import
+from rag_pipeline.lexical_index import LexicalIndex, LexicalIndexWriter
+from rag_pipeline.registry import ResourceRegistry, get_registry
+from rag_pipeline.vector_index import (
+    INDEX_FORMAT_VERSION,
+    build_index,
+    choose_index_type,
+    index_type_of,
+    migrate_index,
+    new_index,
+    prepare_vectors,
+    reconstruct_all,
+    supports_remove,
+    write_index_atomic,
+)
+from services.tracing import get_tracer
+
+# Imported on first use: FAISS is heavy and not needed to render the UI.
+faiss = lazy_import("faiss")
 
 logger = logging.getLogger(__name__)
+tracer = get_tracer()
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ----- parsing (module level so worker processes can run it) -----
+
+
+def read_pdf(path: Path) -> List[Dict[str, Any]]:
+    from pypdf import PdfReader  # local import to keep dependencies modular
+
+    reader = PdfReader(str(path))
+    results = []
+    for i, page in enumerate(reader.pages):
+        text = page.extract_text() or ""
+        results.append({"page": i + 1, "text": text})
+    return results
+
+
+def read_text_like(path: Path) -> str:
+    with path.open("r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
+def chunk_text(
+    text: str,
+    source: str,
+    page: int | None,
+    size: int,
+    overlap: int,
+) -> List[ChunkMetadata]:
+    """Fixed character window (the "fixed" chunker); see chunking.chunk_structured for the default."""
+    text = text.replace("\r", "\n")
+    text = "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+    chunks: List[ChunkMetadata] = []
+    start = 0
+    idx = 0
+    while start < len(text):
+        end = start + size
+        chunk = text[start:end].strip()
+        if chunk:
+            chunk_id = f"{source}::p{page or 0}::c{idx}"
+            chunks.append(
+                ChunkMetadata(
+                    id=chunk_id,
+                    content=chunk,
+                    source=source,
+                    page=page,
+                    section=None,
+                )
+            )
+            idx += 1
+        start = end - overlap
+    return chunks
+
+
+def parse_file(
+    path: Path,
+    size: int,
+    overlap: int,
+    chunker: str = "structure",
+) -> Tuple[List[ChunkMetadata], int]:
+    """Read and chunk one file with the "structure" or "fixed" chunker. Returns (chunks, pages read)."""
+    ext = path.suffix.lower()
+    source_name = path.name
+
+    if ext == ".pdf":
+        pages = read_pdf(path)
+        chunks: List[ChunkMetadata] = []
+        section = None  # a heading applies until the next one, across pages
+        for page_info in pages:
+            if chunker == "fixed":
+                chunks.extend(chunk_text(page_info["text"], source_name, page_info["page"], size, overlap))
+            else:
+                page_chunks, section = chunk_structured(
+                    page_info["text"], source_name, page_info["page"], size, overlap, section
+                )
+                chunks.extend(page_chunks)
+        return chunks, len(pages)
+    if ext in {".txt", ".md"}:
+        text = read_text_like(path)
+        if chunker == "fixed":
+            return chunk_text(text, source_name, None, size, overlap), 1
+        return chunk_structured(text, source_name, None, size, overlap)[0], 1
+
+    logger.warning("Unsupported file type for ingestion: %s", path.suffix)
+    return [], 0
 
 
 @dataclass
-class ChunkMetadata:
-    id: str
-    content: str
-    source: str
-    page: int | None
-    section: str | None
+class IngestionProgress:
+    """Snapshot passed to the `progress` callback of `ingest_files`."""
+
+    files_total: int
+    files_done: int = 0
+    pages: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    elapsed_s: float = 0.0
+
+    def _rate(self, count: int) -> float:
+        return count / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    @property
+    def files_per_sec(self) -> float:
+        return self._rate(self.files_done)
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self._rate(self.pages)
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self._rate(self.chunks)
+
+    @property
+    def embeddings_per_sec(self) -> float:
+        return self._rate(self.embedded)
+
+
+ProgressCallback = Callable[[IngestionProgress], None]
 
 
 class IngestionEngine:
@@ -29,160 +172,460 @@ class IngestionEngine:
 
     - Tries to use SentenceTransformer for embeddings.
     - If that fails (e.g. Torch NotImplementedError on Streamlit Cloud),
-      it falls back to a lightweight local embedding (byte-based) so the
-      app keeps working without GPU or fancy Torch build.
+      it falls back to a lightweight local embedding (hashed character
+      n-grams) so the app keeps working without GPU or fancy Torch build.
+    - Ingestion is incremental by default: a manifest of file content hashes
+      is kept next to the index, and only new or changed documents are
+      re-embedded. Vectors of changed / removed documents are dropped from
+      the `IndexIDMap2` by id.
+    - Ingestion streams: files are parsed in a process pool (PDF extraction
+      is CPU-bound), at most `ingestion_queue_size` parsed files wait for the
+      embedder, chunks are embedded `embed_batch_size` at a time and added to
+      the index and the chunk store as they arrive. Memory stays bounded by
+      the queue and batch sizes, not by the size of the upload.
+    - A BM25 index (rag_pipeline.lexical_index) is maintained next to the
+      FAISS index for hybrid search: only added chunks are tokenized, and
+      postings of removed ones are dropped from the arrays.
     """
 
-    def __init__(self, paths: PathsConfig, rag_cfg: RAGConfig):
+    def __init__(
+        self,
+        paths: PathsConfig,
+        rag_cfg: RAGConfig,
+        registry: ResourceRegistry | None = None,
+    ):
         self.paths = paths
         self.cfg = rag_cfg
+        self.registry = registry or get_registry()
 
-        self.st_model = None
-        self.embedding_dim = 768  # fallback dimension
-
-        # Try to load SentenceTransformer, but don't crash if it fails
-        try:
-            from sentence_transformers import SentenceTransformer  # type: ignore
-
-            logger.info(
-                "Trying to load SentenceTransformer model '%s'",
-                self.cfg.embedding_model_name,
-            )
-            self.st_model = SentenceTransformer(self.cfg.embedding_model_name)
-            # If we reached here, use its real dimension
-            test_emb = self.st_model.encode(["test"], convert_to_numpy=True)
-            self.embedding_dim = int(test_emb.shape[1])
-            logger.info("SentenceTransformer loaded; embedding dim = %d", self.embedding_dim)
-        except Exception as e:
-            logger.error(
-                "Failed to load SentenceTransformer embedding model; "
-                "falling back to simple local embeddings. Error: %s",
-                e,
-            )
-            self.st_model = None
+        # Shared with VectorStore through the registry: loaded once per process.
+        self.embedder = self.registry.embedder(self.paths, self.cfg)
+        self.st_model = self.embedder.st_model  # None -> NumPy fallback embeddings
+        self.embedding_dim = self.embedder.dim
+        self.embedding_name = self.embedder.name
 
         self.index_path = self.paths.vector_store_dir / "index.faiss"
-        self.meta_path = self.paths.vector_store_dir / "chunks.pkl"
+        self.manifest_path = self.paths.vector_store_dir / "manifest.json"
 
     # ----- file reading -----
 
     def _read_pdf(self, path: Path) -> List[Dict[str, Any]]:
-        from pypdf import PdfReader  # local import to keep dependencies modular
-
-        reader = PdfReader(str(path))
-        results = []
-        for i, page in enumerate(reader.pages):
-            text = page.extract_text() or ""
-            results.append({"page": i + 1, "text": text})
-        return results
+        return read_pdf(path)
 
     def _read_text_like(self, path: Path) -> str:
-        with path.open("r", encoding="utf-8", errors="ignore") as f:
-            return f.read()
+        return read_text_like(path)
 
     # ----- chunking -----
 
     def _chunk_text(self, text: str, source: str, page: int | None = None) -> List[ChunkMetadata]:
-        text = text.replace("\r", "\n")
-        text = "\n".join(line.strip() for line in text.splitlines() if line.strip())
-
-        size = self.cfg.chunk_size_chars
-        overlap = self.cfg.chunk_overlap_chars
+        if self.cfg.chunker == "fixed":
+            return chunk_text(text, source, page, self.cfg.chunk_size_chars, self.cfg.chunk_overlap_chars)
+        return chunk_structured(text, source, page, self.cfg.chunk_size_chars, self.cfg.chunk_overlap_chars)[0]
 
-        chunks: List[ChunkMetadata] = []
-        start = 0
-        idx = 0
-        while start < len(text):
-            end = start + size
-            chunk = text[start:end].strip()
-            if chunk:
-                chunk_id = f"{source}::p{page or 0}::c{idx}"
-                chunks.append(
-                    ChunkMetadata(
-                        id=chunk_id,
-                        content=chunk,
-                        source=source,
-                        page=page,
-                        section=None,
-                    )
-                )
-                idx += 1
-            start = end - overlap
+    def _chunk_file(self, path: Path) -> List[ChunkMetadata]:
+        chunks, _ = parse_file(path, self.cfg.chunk_size_chars, self.cfg.chunk_overlap_chars, self.cfg.chunker)
         return chunks
 
+    @property
+    def chunking(self) -> str:
+        """Chunker and its parameters, as recorded in the manifest."""
+        return f"{self.cfg.chunker}:{self.cfg.chunk_size_chars}:{self.cfg.chunk_overlap_chars}"
+
     # ----- embeddings -----
 
     def _embed_texts(self, texts: List[str]) -> np.ndarray:
         """
         Embed a list of texts using either SentenceTransformer (if available)
-        or a simple byte-based fallback.
+        or the shared NumPy fallback embedding.
+        """
+        return self.embedder.embed(texts)
+
+    # ----- parsing pipeline -----
+
+    def _worker_count(self) -> int:
+        workers = self.cfg.ingestion_workers
+        if workers <= 0:
+            workers = min(4, os.cpu_count() or 1)
+        return workers
+
+    def _use_process_pool(self, paths: List[Path]) -> bool:
+        # Worker start-up costs more than reading a few text files; only PDFs
+        # are worth shipping to another process.
+        n_pdfs = sum(1 for p in paths if p.suffix.lower() == ".pdf")
+        return self._worker_count() > 1 and n_pdfs >= 2
+
+    def _parse_stream(self, paths: List[Path]) -> Iterator[Tuple[Path, List[ChunkMetadata], int]]:
         """
-        if self.st_model is not None:
-            embs = self.st_model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
-            return embs.astype("float32")
-
-        # Fallback: simple deterministic embedding
-        logger.warning("Using fallback byte-based embeddings (SentenceTransformer unavailable).")
-        vectors = []
-        for t in texts:
-            arr = np.zeros(self.embedding_dim, dtype="float32")
-            for i, ch in enumerate(t.encode("utf-8")[: self.embedding_dim]):
-                arr[i] = ch / 255.0
-            vectors.append(arr)
-        return np.vstack(vectors)
+        Yield (path, chunks, pages) per file, in input order.
+
+        With a process pool, at most `ingestion_queue_size` files are parsed
+        ahead of the consumer, so a slow embedder applies back-pressure
+        instead of letting parsed text pile up in memory.
+        """
+        size, overlap, chunker = self.cfg.chunk_size_chars, self.cfg.chunk_overlap_chars, self.cfg.chunker
+        if not self._use_process_pool(paths):
+            for path in paths:
+                chunks, pages = parse_file(path, size, overlap, chunker)
+                yield path, chunks, pages
+            return
+
+        # Only multi-file PDF runs need a pool; keep it off the import path.
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = min(self._worker_count(), len(paths))
+        ahead = max(1, self.cfg.ingestion_queue_size)
+        # "spawn": forking a process that holds FAISS / Torch threads is unsafe.
+        ctx = multiprocessing.get_context("spawn")
+        logger.info("Parsing %d files with %d worker processes", len(paths), workers)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            pending = deque()
+            todo = iter(paths)
+            for path in todo:
+                pending.append((path, pool.submit(parse_file, path, size, overlap, chunker)))
+                if len(pending) >= ahead:
+                    break
+            while pending:
+                path, future = pending.popleft()
+                chunks, pages = future.result()
+                next_path = next(todo, None)
+                if next_path is not None:
+                    pending.append((next_path, pool.submit(parse_file, next_path, size, overlap, chunker)))
+                yield path, chunks, pages
+
+    # ----- index persistence -----
+
+    def _load_existing(self) -> Tuple[faiss.Index | None, ChunkStore | None, IndexManifest]:
+        """
+        Load the current index, chunk store and manifest for incremental updates.
+
+        Stores written before incremental ingestion existed (plain IndexFlatL2,
+        no manifest) are migrated: vectors keep their positional ids and are
+        grouped into manifest entries by source, with an unknown hash so the
+        next upload of the same file replaces them. Older formats / another
+        metric are converted by `migrate_index`.
+        """
+        store = open_chunk_store(self.paths.vector_store_dir)
+        if not self.index_path.exists() or store is None:
+            return None, None, IndexManifest()
+
+        index = faiss.read_index(str(self.index_path))
+        manifest = IndexManifest.load(self.manifest_path)
+        index, _ = migrate_index(index, manifest, self.cfg)
+
+        if not manifest.documents and len(store):
+            for source, ids in store.ids_by_source().items():
+                manifest.documents[source] = DocumentEntry(
+                    sha256="", path=str(self.paths.uploads_dir / source), vector_ids=ids
+                )
+            manifest.next_id = int(store.ids.max()) + 1
+            manifest.embedding_model = self.embedding_name
+            manifest.embedding_dim = index.d
+
+        return index, store, manifest
+
+    def _open_lexical_writer(
+        self, store: ChunkStore | None, manifest: IndexManifest, stale_ids: List[int]
+    ) -> LexicalIndexWriter:
+        """
+        Writer for the next BM25 index, starting from the current one. A
+        missing index (stores from before hybrid search) or one out of sync
+        with the manifest is rebuilt from the chunk store's text.
+        """
+        k1, b = self.cfg.bm25_k1, self.cfg.bm25_b
+        if store is None:
+            return LexicalIndexWriter(None, k1=k1, b=b)
+        base = LexicalIndex.load(self.paths.vector_store_dir, k1, b)
+        if base is not None and base.revision == manifest.revision and len(base) == len(store):
+            return LexicalIndexWriter(base, stale_ids, k1, b)
+        logger.info("Building the BM25 index from %d stored chunks", len(store))
+        keep = ~np.isin(store.ids, np.asarray(stale_ids, dtype="int64"))
+        writer = LexicalIndexWriter(None, k1=k1, b=b)
+        positions = np.flatnonzero(keep)
+        for start in range(0, len(positions), 4096):
+            batch = positions[start:start + 4096].tolist()
+            writer.add(store.ids[batch].tolist(), [store.row(pos).content for pos in batch])
+        return writer
+
+    def _open_writer(self, store: ChunkStore | None, stale_ids: List[int]) -> ChunkStoreWriter:
+        # Surviving rows are copied blob-to-blob; new ids are always larger,
+        # so appending them keeps the store sorted by FAISS id.
+        writer = ChunkStoreWriter(self.paths.vector_store_dir)
+        if store is not None:
+            writer.copy_from(store, ~np.isin(store.ids, np.asarray(stale_ids, dtype="int64")))
+        return writer
+
+    def _persist(
+        self,
+        index: faiss.Index,
+        writer: ChunkStoreWriter,
+        lexical: LexicalIndexWriter,
+        manifest: IndexManifest,
+    ) -> None:
+        manifest.format_version = INDEX_FORMAT_VERSION
+        manifest.metric = self.cfg.index_metric
+        manifest.new_revision()
+        with tracer.span("ingest_persist"):
+            write_index_atomic(index, self.index_path)
+            writer.commit()
+            lexical.build().save(self.paths.vector_store_dir, manifest.revision)
+            manifest.save(self.manifest_path)
+
+        # Readers holding the previous index must pick up the new one.
+        self.registry.invalidate_vector_store(self.paths.vector_store_dir)
+
+    def _prepare_index(self, index: faiss.Index | None, stale_ids: List[int]) -> Tuple[faiss.Index, bool]:
+        """
+        Drop stale vectors and return an index new vectors can be streamed into.
+
+        Returns (index, removal_pending): HNSW cannot remove vectors, so the
+        stale ones are filtered out by the rebuild in `_finalize_index`.
+        """
+        if index is None:
+            return new_index(self.embedding_dim, self.cfg.index_metric), False
+        stale = np.asarray(stale_ids, dtype="int64")
+        if not len(stale):
+            return index, False
+        if supports_remove(index):
+            logger.info("Removed %d stale vectors", index.remove_ids(stale))
+            return index, False
+        return index, True
+
+    def _finalize_index(self, index: faiss.Index, stale_ids: List[int], removal_pending: bool) -> faiss.Index:
+        """Rebuild when the corpus size calls for another tier or removals are pending."""
+        ids, vectors = None, None
+        if removal_pending:
+            ids, vectors = reconstruct_all(index)
+            keep = ~np.isin(ids, np.asarray(stale_ids, dtype="int64"))
+            ids, vectors = ids[keep], vectors[keep]
+            n_vectors = len(ids)
+        else:
+            n_vectors = index.ntotal
+
+        if not removal_pending and index_type_of(index) == choose_index_type(n_vectors, self.cfg):
+            return index
+        if ids is None:
+            ids, vectors = reconstruct_all(index)
+        if not len(ids):
+            return new_index(index.d, self.cfg.index_metric)
+        return build_index(vectors, ids, self.cfg.index_metric, self.cfg)
 
     # ----- public API -----
 
-    def ingest_files(self, file_paths: List[Path]) -> int:
+    def ingest_files(
+        self,
+        file_paths: Iterable[Path],
+        incremental: bool | None = None,
+        prune_missing: bool = False,
+        progress: ProgressCallback | None = None,
+    ) -> int:
         """
-        Ingests files, builds FAISS index, and persists both index and metadata.
-        Returns number of chunks.
+        Ingests files into the FAISS index and persists index, metadata and manifest.
+
+        - incremental (default: RAGConfig.incremental_ingestion): keep the
+          existing index and only (re-)embed files whose content hash changed.
+          When False, the index is rebuilt from `file_paths` alone.
+        - prune_missing: also drop indexed documents that are not in `file_paths`.
+        - progress: called with an `IngestionProgress` after every parsed file
+          and every embedding batch.
+
+        Returns number of chunks indexed for the given files.
         """
-        all_chunks: List[ChunkMetadata] = []
+        if incremental is None:
+            incremental = self.cfg.incremental_ingestion
+
+        index, store, manifest = (None, None, IndexManifest())
+        if incremental:
+            index, store, manifest = self._load_existing()
 
+        to_embed: Dict[str, Tuple[Path, str]] = {}
+        requested: Dict[str, Path] = {}
         for path in file_paths:
             if not path.exists():
                 logger.warning("File not found during ingestion: %s", path)
                 continue
+            requested[path.name] = path
+
+        if manifest.documents and (
+            manifest.embedding_model != self.embedding_name
+            or manifest.embedding_dim != self.embedding_dim
+            or manifest.chunking != self.chunking
+        ):
+            # Vectors from a different model live in a different space, and
+            # chunks cut differently would mix with the old ones: rebuild.
+            logger.info(
+                "Embedding model or chunking changed (%s/%s/%s -> %s/%s/%s); rebuilding the whole index",
+                manifest.embedding_model,
+                manifest.embedding_dim,
+                manifest.chunking,
+                self.embedding_name,
+                self.embedding_dim,
+                self.chunking,
+            )
+            for name, entry in manifest.documents.items():
+                old_path = Path(entry.path)
+                if name not in requested and old_path.exists():
+                    requested[name] = old_path
+            index, store, manifest = None, None, IndexManifest()
+
+        stale_ids: List[int] = []
+        for name, path in requested.items():
+            sha = _file_sha256(path)
+            entry = manifest.documents.get(name)
+            if entry is not None and entry.sha256 == sha:
+                logger.info("Unchanged, skipping: %s", path)
+                continue
+            if entry is not None:
+                stale_ids.extend(entry.vector_ids)
+            to_embed[name] = (path, sha)
+
+        if prune_missing:
+            for name in list(manifest.documents):
+                if name not in requested:
+                    logger.info("Removing document no longer present: %s", name)
+                    stale_ids.extend(manifest.documents.pop(name).vector_ids)
+
+        if not to_embed and not stale_ids:
+            if not requested:
+                logger.warning("No chunks produced during ingestion.")
+                return 0
+            logger.info("Index already up to date; nothing to re-embed.")
+            return self._count_chunks(manifest, requested)
+
+        if self.st_model is None and to_embed:
+            logger.warning(
+                "Using fallback '%s' embeddings (SentenceTransformer unavailable).",
+                self.embedder.fallback,
+            )
 
-            ext = path.suffix.lower()
-            source_name = path.name
+        had_index = index is not None
+        self.paths.vector_store_dir.mkdir(parents=True, exist_ok=True)
+        writer = self._open_writer(store, stale_ids)
+        try:
+            lexical = self._open_lexical_writer(store, manifest, stale_ids)
+            index, removal_pending = self._prepare_index(index, stale_ids)
+            n_new = self._stream_into(index, writer, lexical, manifest, to_embed, progress)
+            if not had_index and not n_new:
+                writer.abort()
+                logger.warning("No chunks produced during ingestion.")
+                return 0
+            with tracer.span("ingest_finalize_index"):
+                index = self._finalize_index(index, stale_ids, removal_pending)
+
+            manifest.embedding_model = self.embedding_name
+            manifest.embedding_dim = int(index.d)
+            manifest.chunking = self.chunking
+            self._persist(index, writer, lexical, manifest)
+        except BaseException:
+            writer.abort()
+            raise
+
+        logger.info(
+            "Ingestion completed: %d new chunks, %d removed, %d total",
+            n_new,
+            len(stale_ids),
+            index.ntotal,
+        )
+        return self._count_chunks(manifest, requested)
+
+    def _stream_into(
+        self,
+        index: faiss.Index,
+        writer: ChunkStoreWriter,
+        lexical: LexicalIndexWriter,
+        manifest: IndexManifest,
+        to_embed: Dict[str, Tuple[Path, str]],
+        progress: ProgressCallback | None,
+    ) -> int:
+        """
+        Parse, embed and add `to_embed` batch by batch. Returns chunks added.
 
+        Ids are allocated per file in input order, so vectors, chunk store
+        rows and manifest entries stay aligned without holding the corpus.
+        """
+        batch_size = max(1, self.cfg.embed_batch_size)
+        stats = IngestionProgress(files_total=len(to_embed))
+        started = time.perf_counter()
+        buffer_ids: List[int] = []
+        buffer_chunks: List[ChunkMetadata] = []
+
+        def report() -> None:
+            if progress is not None:
+                stats.elapsed_s = time.perf_counter() - started
+                progress(stats)
+
+        def flush() -> None:
+            with tracer.span("ingest_embed"):
+                vectors = prepare_vectors(
+                    self._embed_texts([c.content for c in buffer_chunks]), self.cfg.index_metric
+                )
+            with tracer.span("ingest_index_add"):
+                index.add_with_ids(vectors, np.asarray(buffer_ids, dtype="int64"))
+            with tracer.span("ingest_lexical"):
+                lexical.add(buffer_ids, [c.content for c in buffer_chunks])
+            tracer.incr("ingested_chunks_total", len(buffer_chunks))
+            for vid, chunk in zip(buffer_ids, buffer_chunks):
+                writer.add(vid, chunk)
+            stats.embedded += len(buffer_chunks)
+            buffer_ids.clear()
+            buffer_chunks.clear()
+            report()
+
+        paths = [path for path, _ in to_embed.values()]
+        parsed = self._parse_stream(paths)
+        while True:
+            # Time spent waiting for the next parsed file (parsing itself when in-process).
+            with tracer.span("ingest_parse"):
+                item = next(parsed, None)
+            if item is None:
+                break
+            path, file_chunks, pages = item
             logger.info("Ingesting file: %s", path)
-
-            if ext == ".pdf":
-                pages = self._read_pdf(path)
-                for page_info in pages:
-                    page_chunks = self._chunk_text(
-                        page_info["text"],
-                        source=source_name,
-                        page=page_info["page"],
-                    )
-                    all_chunks.extend(page_chunks)
-            elif ext in {".txt", ".md"}:
-                text = self._read_text_like(path)
-                all_chunks.extend(self._chunk_text(text, source=source_name))
-            else:
-                logger.warning("Unsupported file type for ingestion: %s", path.suffix)
-
-        if not all_chunks:
-            logger.warning("No chunks produced during ingestion.")
+            _, sha = to_embed[path.name]
+            ids = manifest.allocate_ids(len(file_chunks))
+            manifest.documents[path.name] = DocumentEntry(sha256=sha, path=str(path), vector_ids=ids)
+            stats.files_done += 1
+            stats.pages += pages
+            stats.chunks += len(file_chunks)
+            report()
+
+            for vid, chunk in zip(ids, file_chunks):
+                buffer_ids.append(vid)
+                buffer_chunks.append(chunk)
+                if len(buffer_chunks) >= batch_size:
+                    flush()
+        if buffer_chunks:
+            flush()
+        return stats.chunks
+
+    def remove_documents(self, source_names: Iterable[str]) -> int:
+        """Remove documents (by source file name) from the index. Returns vectors removed."""
+        index, store, manifest = self._load_existing()
+        if index is None:
             return 0
 
-        # embeddings
-        texts = [c.content for c in all_chunks]
-        logger.info("Encoding %d chunks into embeddings", len(texts))
-        embs = self._embed_texts(texts)
-
-        dim = int(embs.shape[1])
-        index = faiss.IndexFlatL2(dim)
-        index.add(embs)
-
-        # persist
-        self.paths.vector_store_dir.mkdir(parents=True, exist_ok=True)
-        faiss.write_index(index, str(self.index_path))
-        with self.meta_path.open("wb") as f:
-            pickle.dump(all_chunks, f)
+        stale_ids: List[int] = []
+        for name in source_names:
+            entry = manifest.documents.pop(name, None)
+            if entry is not None:
+                stale_ids.extend(entry.vector_ids)
+        if not stale_ids:
+            return 0
 
-        logger.info("Ingestion completed: %d chunks indexed", len(all_chunks))
-        return len(all_chunks)
+        before = index.ntotal
+        writer = self._open_writer(store, stale_ids)
+        try:
+            lexical = self._open_lexical_writer(store, manifest, stale_ids)
+            index, removal_pending = self._prepare_index(index, stale_ids)
+            index = self._finalize_index(index, stale_ids, removal_pending)
+            self._persist(index, writer, lexical, manifest)
+        except BaseException:
+            writer.abort()
+            raise
+        return before - index.ntotal
+
+    @staticmethod
+    def _count_chunks(manifest: IndexManifest, names: Iterable[str]) -> int:
+        return sum(
+            len(manifest.documents[name].vector_ids) for name in names if name in manifest.documents
+        )
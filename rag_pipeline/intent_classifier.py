@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from services.tracing import get_tracer
+
+if TYPE_CHECKING:
+    from rag_pipeline.embeddings import Embedder
+    from rag_pipeline.query_context import QueryContext
+
+logger = logging.getLogger(__name__)
+tracer = get_tracer()
+
+
+class Intent(str, Enum):
+    SALES = "sales"
+    SUPPORT = "support"
+    GENERAL = "general"
+    CHITCHAT = "chit-chat"
+
+
+# Built-in pack, used for every niche. Niche packs (IntentConfig.keyword_packs)
+# add terms or override weights.
+SALES_KEYWORDS = [
+    "price",
+    "pricing",
+    "cost",
+    "membership",
+    "package",
+    "plan",
+    "offer",
+    "discount",
+    "book",
+    "booking",
+    "reserve",
+    "signup",
+    "sign up",
+]
+SUPPORT_KEYWORDS = [
+    "problem",
+    "issue",
+    "error",
+    "cancel",
+    # Derived forms the inflection suffixes don't reach.
+    "cancellation",
+    "cancelation",
+    "refund",
+    "help",
+    "support",
+]
+CHITCHAT_KEYWORDS = ["hi", "hello", "how are you", "thanks"]
+
+# Greetings count for little next to a business term ("hi, what does it cost?").
+DEFAULT_PACK: Dict[Intent, Dict[str, float]] = {
+    Intent.SALES: {term: 1.0 for term in SALES_KEYWORDS},
+    Intent.SUPPORT: {term: 1.0 for term in SUPPORT_KEYWORDS},
+    Intent.CHITCHAT: {term: 0.3 for term in CHITCHAT_KEYWORDS},
+}
+# Tie-break between equal scores (sales first, as the lead flow depends on it).
+INTENT_PRIORITY = [Intent.SALES, Intent.SUPPORT, Intent.CHITCHAT]
+
+# Terms of at least this length also match regular inflections ("prices",
+# "booked"), with the final consonant doubled after a vowel ("planned",
+# "cancelling"); other derived forms ("cancellation") are terms of their own.
+MIN_INFLECTED_LEN = 4
+_DOUBLED = "|".join(f"(?<=[aeiou]{c}){c}" for c in "bdglmnprt")
+_INFLECTIONS = rf"(?:s|es|d|ed|ing|(?:{_DOUBLED})(?:ed|ing))?"
+# Joins a batch: not a word character (so terms cannot run across messages)
+# and not whitespace (so phrase gaps cannot either).
+_BATCH_SEPARATOR = "\x00"
+
+KeywordPack = Mapping[Intent, Mapping[str, float]]
+
+
+def normalize_term(term: str) -> str:
+    return " ".join(term.lower().split())
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """
+    One regex alternation for many literals, factored by common prefixes
+    (a trie), so the engine follows a single path per input character
+    instead of trying every term in turn.
+    """
+    trie: Dict[str, dict] = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        ends_here = "" in node
+        branches = [
+            (r"\s+" if ch == " " else re.escape(ch)) + build(child)
+            for ch, child in sorted(node.items())
+            if ch
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            return f"(?:{body})?" if len(branches) == 1 else body + "?"
+        return body
+
+    return build(trie)
+
+
+class IntentClassifier:
+    """
+    Keyword intent classifier compiled into one regex:
+
+      - all terms of all intents are matched in a single scan, on word
+        boundaries ("hi" does not match "this"); phrases match across any
+        whitespace, and longer terms also match regular inflections
+      - every match adds the term's weight to its intent(s); the highest
+        score wins (ties: INTENT_PRIORITY), no match means GENERAL
+      - `classify_many` scans a whole batch of messages in one pass
+
+    The compiled pattern is immutable, so one instance can be shared by
+    threads.
+    """
+
+    def __init__(self, packs: Iterable[KeywordPack] = (DEFAULT_PACK,)):
+        self.weights: Dict[str, Dict[Intent, float]] = {}
+        for pack in packs:
+            for intent, terms in pack.items():
+                for term, weight in terms.items():
+                    self.weights.setdefault(normalize_term(term), {})[Intent(intent)] = float(weight)
+        self._rank = {intent: i for i, intent in enumerate(INTENT_PRIORITY)}
+
+        inflected = [t for t in self.weights if len(t) >= MIN_INFLECTED_LEN and t[-1].isalpha()]
+        exact = [t for t in self.weights if len(t) < MIN_INFLECTED_LEN or not t[-1].isalpha()]
+        alternatives = []
+        if inflected:
+            alternatives.append(f"(?P<inflected>{_trie_pattern(inflected)}){_INFLECTIONS}")
+        if exact:
+            alternatives.append(f"(?P<exact>{_trie_pattern(exact)})")
+        pattern = rf"(?<!\w)(?:{'|'.join(alternatives)})(?!\w)" if alternatives else r"(?!x)x"
+        self._finditer = re.compile(pattern).finditer
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def _weights(self, m: re.Match) -> Dict[Intent, float]:
+        # Group 1 or 2 (inflected / exact); a phrase may have matched other whitespace.
+        term = m[m.lastindex]
+        weights = self.weights.get(term)
+        return weights if weights is not None else self.weights[normalize_term(term)]
+
+    def _decide(self, scores: Dict[Intent, float]) -> Intent:
+        if len(scores) < 2:
+            return next(iter(scores), Intent.GENERAL)
+        return min(scores, key=lambda intent: (-scores[intent], self._rank.get(intent, len(self._rank))))
+
+    def scores(self, message: str) -> Dict[Intent, float]:
+        scores: Dict[Intent, float] = {}
+        for m in self._finditer(message.lower()):
+            for intent, weight in self._weights(m).items():
+                scores[intent] = scores.get(intent, 0.0) + weight
+        return scores
+
+    def classify(self, message: str, embedding: np.ndarray | None = None) -> Intent:
+        # `embedding` is unused; the signature matches EmbeddingIntentClassifier.
+        return self._decide(self.scores(message))
+
+    def classify_query(self, query: QueryContext) -> Intent:
+        return self.classify(query.text)
+
+    def classify_many(self, messages: List[str]) -> List[Intent]:
+        """Classify a batch with one regex scan over all messages."""
+        if not messages:
+            return []
+        # Lowercased one by one: lower() can change a message's length.
+        lowered = [message.lower() for message in messages]
+        scores: List[Dict[Intent, float]] = [{} for _ in messages]
+        i = 0
+        boundary = len(lowered[0])  # end of message i in the joined text
+        for m in self._finditer(_BATCH_SEPARATOR.join(lowered)):
+            while m.start() > boundary:
+                i += 1
+                boundary += 1 + len(lowered[i])
+            row = scores[i]
+            for intent, weight in self._weights(m).items():
+                row[intent] = row.get(intent, 0.0) + weight
+        return [self._decide(row) for row in scores]
+
+
+# ----- keyword packs -----
+
+
+def load_keyword_packs(path: Path) -> Dict[str, Dict[Intent, Dict[str, float]]]:
+    """
+    Niche name -> pack from a JSON file shaped like
+
+        {"Gyms & Fitness Studios": {"sales": {"day pass": 1.0}, "support": ["locker"]}}
+
+    Terms are given with weights or as a list (weight 1.0). A missing file
+    means no niche packs.
+    """
+    path = Path(path)
+    if not path.exists():
+        return {}
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    packs: Dict[str, Dict[Intent, Dict[str, float]]] = {}
+    for niche, pack in raw.items():
+        packs[niche] = {}
+        for intent, terms in pack.items():
+            try:
+                key = Intent(intent)
+            except ValueError:
+                raise ValueError(
+                    f"Unknown intent '{intent}' in {path} ({niche}); expected one of {[i.value for i in Intent]}"
+                ) from None
+            if isinstance(terms, list):
+                terms = {term: 1.0 for term in terms}
+            packs[niche][key] = {str(term): float(weight) for term, weight in terms.items()}
+    return packs
+
+
+_CLASSIFIERS: Dict[Tuple[str, str | None], IntentClassifier] = {}
+_CLASSIFIERS_LOCK = threading.Lock()
+
+
+def get_intent_classifier(niche: str | None = None, packs_path: Path | None = None) -> IntentClassifier:
+    """
+    The classifier for a niche (built-in pack plus the niche's pack from
+    `packs_path`, by default IntentConfig.keyword_packs), compiled once per
+    process.
+    """
+    if packs_path is None:
+        from app.config import IntentConfig
+
+        packs_path = IntentConfig().keyword_packs
+    key = (str(packs_path), niche)
+    with _CLASSIFIERS_LOCK:
+        if key not in _CLASSIFIERS:
+            packs: List[KeywordPack] = [DEFAULT_PACK]
+            if niche is not None:
+                niche_pack = load_keyword_packs(packs_path).get(niche)
+                if niche_pack is None:
+                    logger.info("No keyword pack for niche '%s' in %s; using the built-in one", niche, packs_path)
+                else:
+                    packs.append(niche_pack)
+            _CLASSIFIERS[key] = IntentClassifier(packs)
+        return _CLASSIFIERS[key]
+
+
+# ----- embedding mode -----
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype="float32"))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class EmbeddingIntentClassifier:
+    """
+    Nearest-centroid intent classifier in the retrieval embedding space:
+
+      - one centroid per intent, the mean of its example messages, embedded
+        once with the retrieval Embedder when the classifier is built
+      - messages are scored against all centroids with one matrix product;
+        pass the vector retrieval already computed (VectorStore.embed_queries)
+        and the message is not encoded a second time
+      - confidence is the cosine margin between the best and the runner-up
+        centroid; below `min_confidence` a keyword match, if any, decides
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        examples: Mapping[Intent, Sequence[str]],
+        keywords: IntentClassifier | None = None,
+        min_confidence: float = 0.05,
+    ):
+        self.embedder = embedder
+        self.keywords = keywords or IntentClassifier()
+        self.min_confidence = min_confidence
+        self.intents: List[Intent] = [Intent(intent) for intent, texts in examples.items() if texts]
+        if len(self.intents) < 2:
+            raise ValueError("EmbeddingIntentClassifier needs examples for at least two intents")
+        texts = [text for intent in self.intents for text in examples[intent]]
+        labels = np.repeat(np.arange(len(self.intents)), [len(examples[intent]) for intent in self.intents])
+        vectors = _unit_rows(embedder.embed(texts))
+        centroids = np.zeros((len(self.intents), vectors.shape[1]), dtype="float32")
+        np.add.at(centroids, labels, vectors)
+        self.centroids = _unit_rows(centroids)  # (n_intents, dim)
+
+    def _embeddings(self, messages: List[str], embeddings: np.ndarray | None) -> np.ndarray:
+        if embeddings is not None:
+            embeddings = np.atleast_2d(embeddings)
+            if embeddings.shape == (len(messages), self.centroids.shape[1]):
+                return embeddings
+            logger.warning("Query embedding of shape %s does not match the intent centroids; re-encoding", embeddings.shape)
+        return self.embedder.embed(messages)
+
+    def predict(self, embeddings: np.ndarray) -> Tuple[List[Intent], np.ndarray]:
+        """Best intent and its confidence (margin over the runner-up) per row."""
+        sims = _unit_rows(embeddings) @ self.centroids.T  # (n, n_intents)
+        top2 = np.partition(sims, -2, axis=1)[:, -2:]
+        best = sims.argmax(axis=1)
+        return [self.intents[i] for i in best], top2[:, 1] - top2[:, 0]
+
+    def classify(self, message: str, embedding: np.ndarray | None = None) -> Intent:
+        return self.classify_many([message], embedding)[0]
+
+    def classify_query(self, query: QueryContext) -> Intent:
+        """Classify with the turn's query vector, computing it (once, for the turn) if needed."""
+        return self.classify(query.text, query.embedding if query.can_embed else None)
+
+    def classify_many(self, messages: List[str], embeddings: np.ndarray | None = None) -> List[Intent]:
+        """
+        Classify a batch; `embeddings` (one row per message, from
+        VectorStore.embed_queries) avoids encoding the messages again.
+        """
+        if not messages:
+            return []
+        intents, confidence = self.predict(self._embeddings(messages, embeddings))
+        unsure = [i for i, c in enumerate(confidence) if c < self.min_confidence]
+        if unsure:
+            tracer.incr("intent_keyword_fallbacks_total", len(unsure))
+            for i, intent in zip(unsure, self.keywords.classify_many([messages[i] for i in unsure])):
+                if intent != Intent.GENERAL:  # no keyword either: keep the nearest centroid
+                    intents[i] = intent
+        return intents
+
+
+def load_intent_examples(path: Path) -> Dict[Intent, List[str]]:
+    """Labelled example messages from a JSON file shaped like {"sales": ["how much is it to join?", ...]}."""
+    path = Path(path)
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    examples: Dict[Intent, List[str]] = {}
+    for intent, texts in raw.items():
+        try:
+            examples[Intent(intent)] = [str(text) for text in texts]
+        except ValueError:
+            raise ValueError(f"Unknown intent '{intent}' in {path}; expected one of {[i.value for i in Intent]}") from None
+    return examples
+
+
+_EMBEDDING_CLASSIFIERS: Dict[Tuple[int, str, str, str | None, float], EmbeddingIntentClassifier] = {}
+
+
+def get_embedding_intent_classifier(
+    embedder: Embedder,
+    niche: str | None = None,
+    examples_path: Path | None = None,
+    packs_path: Path | None = None,
+    min_confidence: float | None = None,
+) -> EmbeddingIntentClassifier:
+    """
+    The embedding classifier for an Embedder and niche (falling back to the
+    niche's keyword classifier), built once per process. Defaults come from
+    IntentConfig.
+    """
+    if examples_path is None or packs_path is None or min_confidence is None:
+        from app.config import IntentConfig
+
+        cfg = IntentConfig()
+        examples_path = examples_path or cfg.examples
+        packs_path = packs_path or cfg.keyword_packs
+        min_confidence = cfg.min_confidence if min_confidence is None else min_confidence
+    keywords = get_intent_classifier(niche, packs_path)
+    # The classifier holds the embedder, so its id is not reused while cached.
+    key = (id(embedder), str(examples_path), str(packs_path), niche, min_confidence)
+    with _CLASSIFIERS_LOCK:
+        if key not in _EMBEDDING_CLASSIFIERS:
+            _EMBEDDING_CLASSIFIERS[key] = EmbeddingIntentClassifier(
+                embedder, load_intent_examples(examples_path), keywords, min_confidence
+            )
+        return _EMBEDDING_CLASSIFIERS[key]
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LEXICAL_FILE = "bm25.npz"
+
+# Words and numbers, keeping codes and prices whole ("gx-200", "12-month",
+# "$49", "9.99"); a compound is indexed both whole and by its parts.
+_TOKEN_RE = re.compile(r"\$?\w+(?:[-./,]\w+)*%?")
+_PART_RE = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its me my of on or our "
+    "so that the their there this to was we what when where which who will with you your".split()
+)
+_MAX_TF = np.iinfo(np.uint16).max
+
+
+def tokenize(text: str) -> List[str]:
+    """BM25 terms of `text` (lowercased, stopwords dropped)."""
+    terms: List[str] = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token.isalnum():
+            if token not in STOPWORDS:
+                terms.append(token)
+            continue
+        terms.append(token)
+        terms.extend(part for part in _PART_RE.findall(token) if part not in STOPWORDS)
+    return terms
+
+
+class LexicalIndex:
+    """
+    Read-only BM25 inverted index over the chunks of a vector store, kept
+    next to the FAISS index as one `bm25.npz`:
+
+      terms                  the vocabulary, "\\n"-joined (term id = position)
+      offsets                (n_terms + 1) int64, postings of term t are
+                             [offsets[t], offsets[t + 1])
+      rows / tfs             int32 document row / uint16 term frequency per
+                             posting, rows ascending within a term
+      doc_ids / doc_lens     int64 FAISS id (ascending) / int32 length in
+                             terms per document row
+      revision               IndexManifest.revision it was written with
+
+    Scoring touches only the postings of the query's terms, all in NumPy.
+    Updates go through LexicalIndexWriter.
+    """
+
+    def __init__(
+        self,
+        terms: List[str],
+        offsets: np.ndarray,
+        rows: np.ndarray,
+        tfs: np.ndarray,
+        doc_ids: np.ndarray,
+        doc_lens: np.ndarray,
+        revision: str = "",
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.terms = terms
+        self.term_ids: Dict[str, int] = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.rows = rows
+        self.tfs = tfs
+        self.doc_ids = doc_ids
+        self.doc_lens = doc_lens
+        self.revision = revision
+        self.k1 = k1
+        avgdl = float(doc_lens.mean()) if len(doc_lens) else 1.0
+        # Per-document part of the BM25 denominator, computed once.
+        self._norm = (k1 * (1.0 - b + b * doc_lens / max(avgdl, 1e-9))).astype("float32")
+
+    @classmethod
+    def empty(cls, k1: float = 1.2, b: float = 0.75) -> LexicalIndex:
+        return cls(
+            [],
+            np.zeros(1, dtype="int64"),
+            np.zeros(0, dtype="int32"),
+            np.zeros(0, dtype="uint16"),
+            np.zeros(0, dtype="int64"),
+            np.zeros(0, dtype="int32"),
+            k1=k1,
+            b=b,
+        )
+
+    @classmethod
+    def load(cls, vector_store_dir: Path, k1: float = 1.2, b: float = 0.75) -> LexicalIndex | None:
+        path = Path(vector_store_dir) / LEXICAL_FILE
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            terms_text = data["terms"].tobytes().decode("utf-8")
+            return cls(
+                terms_text.split("\n") if terms_text else [],
+                data["offsets"],
+                data["rows"],
+                data["tfs"],
+                data["doc_ids"],
+                data["doc_lens"],
+                revision=str(data["revision"]),
+                k1=k1,
+                b=b,
+            )
+
+    def save(self, vector_store_dir: Path, revision: str) -> None:
+        """Write atomically (temp file + rename), tagged with the manifest revision."""
+        path = Path(vector_store_dir) / LEXICAL_FILE
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("wb") as f:
+            np.savez(
+                f,
+                terms=np.frombuffer("\n".join(self.terms).encode("utf-8"), dtype=np.uint8),
+                offsets=self.offsets,
+                rows=self.rows,
+                tfs=self.tfs,
+                doc_ids=self.doc_ids,
+                doc_lens=self.doc_lens,
+                revision=np.array(revision),
+            )
+        os.replace(tmp_path, path)
+        self.revision = revision
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def search(self, terms: Iterable[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """FAISS ids and BM25 scores of the best `k` documents, best first."""
+        term_ids = sorted({self.term_ids[t] for t in terms if t in self.term_ids})
+        if not term_ids or k <= 0:
+            return np.zeros(0, dtype="int64"), np.zeros(0, dtype="float32")
+        n_docs = len(self.doc_ids)
+        rows: List[np.ndarray] = []
+        weights: List[np.ndarray] = []
+        for t in term_ids:
+            lo, hi = int(self.offsets[t]), int(self.offsets[t + 1])
+            idf = math.log(1.0 + (n_docs - (hi - lo) + 0.5) / ((hi - lo) + 0.5))
+            r = self.rows[lo:hi]
+            tf = self.tfs[lo:hi].astype("float32")
+            rows.append(r)
+            weights.append(idf * (self.k1 + 1.0) * tf / (tf + self._norm[r]))
+        all_rows = np.concatenate(rows)
+        if len(term_ids) == 1:
+            docs, scores = all_rows, weights[0]
+        else:
+            docs, inverse = np.unique(all_rows, return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(weights)).astype("float32")
+        if len(docs) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            docs, scores = docs[top], scores[top]
+        order = np.lexsort((docs, -scores))  # ties: lower row (older chunk) first
+        return self.doc_ids[docs[order]], scores[order]
+
+
+class LexicalIndexWriter:
+    """
+    Builds the next LexicalIndex from the current one: documents whose FAISS
+    ids are stale are dropped, surviving postings are carried over as arrays
+    (no re-tokenizing), and only added chunks are tokenized. Like
+    ChunkStoreWriter, chunks can be added batch by batch as they are embedded.
+    """
+
+    def __init__(self, base: LexicalIndex | None, stale_ids: Iterable[int] = (), k1: float = 1.2, b: float = 0.75):
+        self.k1, self.b = k1, b
+        base = base or LexicalIndex.empty(k1, b)
+        stale = np.asarray(list(stale_ids), dtype="int64")
+        keep_doc = ~np.isin(base.doc_ids, stale)
+        new_row = np.cumsum(keep_doc) - 1
+
+        old_terms = np.repeat(np.arange(len(base.terms), dtype="int64"), np.diff(base.offsets))
+        keep = keep_doc[base.rows] if len(base.rows) else np.zeros(0, dtype=bool)
+        self._vocab: Dict[str, int] = dict(base.term_ids)
+        self._terms: List[np.ndarray] = [old_terms[keep]]
+        self._rows: List[np.ndarray] = [new_row[base.rows[keep]].astype("int64")]
+        self._tfs: List[np.ndarray] = [base.tfs[keep].astype("int64")]
+        self._doc_ids: List[np.ndarray] = [base.doc_ids[keep_doc]]
+        self._doc_lens: List[np.ndarray] = [base.doc_lens[keep_doc].astype("int64")]
+        self._n_docs = int(keep_doc.sum())
+
+    def add(self, ids: List[int], texts: List[str]) -> None:
+        terms: List[int] = []
+        rows: List[int] = []
+        tfs: List[int] = []
+        lens: List[int] = []
+        vocab = self._vocab
+        for row, text in enumerate(texts, start=self._n_docs):
+            tokens = tokenize(text)
+            lens.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                terms.append(vocab.setdefault(term, len(vocab)))
+                rows.append(row)
+                tfs.append(tf)
+        self._terms.append(np.asarray(terms, dtype="int64"))
+        self._rows.append(np.asarray(rows, dtype="int64"))
+        self._tfs.append(np.asarray(tfs, dtype="int64"))
+        self._doc_ids.append(np.asarray(ids, dtype="int64"))
+        self._doc_lens.append(np.asarray(lens, dtype="int64"))
+        self._n_docs += len(texts)
+
+    def build(self) -> LexicalIndex:
+        terms = np.concatenate(self._terms)
+        rows = np.concatenate(self._rows)
+        tfs = np.minimum(np.concatenate(self._tfs), _MAX_TF)
+        doc_ids = np.concatenate(self._doc_ids)
+        doc_lens = np.concatenate(self._doc_lens)
+
+        # Rows follow FAISS id order (new ids are larger, so this is usually a no-op).
+        if len(doc_ids) > 1 and np.any(np.diff(doc_ids) <= 0):
+            order = np.argsort(doc_ids, kind="stable")
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            doc_ids, doc_lens, rows = doc_ids[order], doc_lens[order], rank[rows]
+
+        # Drop terms no document uses any more, keeping the others' order.
+        vocab = list(self._vocab)
+        counts = np.bincount(terms, minlength=len(vocab))
+        used = counts > 0
+        remap = np.cumsum(used) - 1
+        terms = remap[terms]
+        order = np.lexsort((rows, terms))
+        offsets = np.zeros(int(used.sum()) + 1, dtype="int64")
+        np.cumsum(counts[used], out=offsets[1:])
+        return LexicalIndex(
+            [term for term, keep in zip(vocab, used.tolist()) if keep],
+            offsets,
+            rows[order].astype("int32"),
+            tfs[order].astype("uint16"),
+            doc_ids.astype("int64"),
+            doc_lens.astype("int32"),
+            k1=self.k1,
+            b=self.b,
+        )
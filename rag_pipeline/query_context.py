@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from rag_pipeline.embedding_cache import normalize_text
+from rag_pipeline.lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryContext:
+    """
+    One user question and what a chat turn derives from it, each computed at
+    most once and only when a stage first asks for it:
+
+      - `normalized`: the whitespace-collapsed text that is embedded
+      - `embedding`: the query vector as VectorStore searches it (`embed` is
+        VectorStore.embed_queries)
+      - `token_count`: tokens in the question (`count_tokens` is
+        TokenCounter.count)
+      - `terms`: its BM25 terms (lexical_index.tokenize)
+      - `timings`: ms spent computing each of them
+
+    main_app creates one per turn and passes it to RAGChain.answer,
+    VectorStore.search and Agent.process_turn, so the retrieval search, the
+    answer cache and the embedding intent classifier share one forward pass
+    of the model. Those also accept a plain string (see `as_query_context`).
+    A context belongs to one turn and is not meant to be shared by threads.
+    """
+
+    text: str
+    embed: Callable[[List[str]], np.ndarray] | None = None
+    count_tokens: Callable[[str], int] | None = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @cached_property
+    def normalized(self) -> str:
+        return normalize_text(self.text)
+
+    @cached_property
+    def embedding(self) -> np.ndarray:
+        if self.embed is None:
+            raise RuntimeError("QueryContext has no embed function; pass embed=VectorStore.embed_queries")
+        start = time.perf_counter()
+        vector = self.embed([self.normalized])[0]
+        self.timings["embed_ms"] = (time.perf_counter() - start) * 1000
+        return vector
+
+    @cached_property
+    def token_count(self) -> int:
+        if self.count_tokens is None:
+            raise RuntimeError("QueryContext has no count_tokens function; pass count_tokens=TokenCounter.count")
+        start = time.perf_counter()
+        count = self.count_tokens(self.normalized)
+        self.timings["tokenize_ms"] = (time.perf_counter() - start) * 1000
+        return count
+
+    @cached_property
+    def terms(self) -> List[str]:
+        return tokenize(self.normalized)
+
+    @property
+    def can_embed(self) -> bool:
+        """Whether `embedding` is computed already or can be on first access."""
+        return "embedding" in self.__dict__ or self.embed is not None
+
+
+def as_query_context(
+    query: str | QueryContext,
+    embed: Callable[[List[str]], np.ndarray] | None = None,
+    count_tokens: Callable[[str], int] | None = None,
+) -> QueryContext:
+    """
+    `query` as a QueryContext (a string is wrapped), with `embed` /
+    `count_tokens` filled in where the context has none.
+    """
+    if not isinstance(query, QueryContext):
+        return QueryContext(query, embed, count_tokens)
+    if query.embed is None:
+        query.embed = embed
+    if query.count_tokens is None:
+        query.count_tokens = count_tokens
+    return query
@@ -1,25 +1,57 @@
 from __future__ import annotations
 
 import logging
-from typing import List, Dict, Tuple
+from typing import TYPE_CHECKING, List, Dict, Iterator, Tuple
 
-from services.llm_client import BaseLLMClient
+import numpy as np
+
+from services.llm_client import LLM_ERROR_MESSAGE, BaseLLMClient
+from services.tracing import get_tracer
+from rag_pipeline.context_packer import ContextPacker
+from rag_pipeline.query_context import QueryContext, as_query_context
 from rag_pipeline.retrieval import VectorStore, RetrievedChunk
 
+if TYPE_CHECKING:
+    from rag_pipeline.answer_cache import AnswerCache
+    from rag_pipeline.reranker import Reranker
+
 logger = logging.getLogger(__name__)
+tracer = get_tracer()
+
+NO_INDEX_MESSAGE = "No knowledge base is indexed yet. Please upload and index business documents first."
 
 
 class RAGChain:
     """
     RAG pipeline:
       - reformulate question (lightweight)
-      - retrieve relevant chunks
+      - retrieve relevant chunks (with a Reranker: over-fetch candidates and
+        keep the best top_k)
+      - pack them into a token-budgeted context (ContextPacker)
       - generate grounded answer with attributions
+
+    With an AnswerCache, a question close to an earlier one that retrieved
+    the same chunks from the same index revision is answered from the cache
+    without calling the LLM.
     """
 
-    def __init__(self, llm: BaseLLMClient, vector_store: VectorStore):
+    def __init__(
+        self,
+        llm: BaseLLMClient,
+        vector_store: VectorStore,
+        answer_cache: AnswerCache | None = None,
+        packer: ContextPacker | None = None,
+        reranker: Reranker | None = None,
+    ):
         self.llm = llm
         self.vs = vector_store
+        self.answer_cache = answer_cache
+        self.packer = packer or ContextPacker()
+        self.reranker = reranker
+        # Answers from another model / client / endpoint must not be served from the cache.
+        self.cache_namespace = (
+            f"{type(llm).__name__}:{getattr(llm, 'model_name', '')}:{getattr(llm, 'base_url', '')}"
+        )
 
     # ----- helpers -----
 
@@ -28,18 +60,11 @@ class RAGChain:
         return question.strip()
 
     def _build_system_prompt(self, rewritten_question: str, retrieved: List[RetrievedChunk]) -> str:
-        context_lines = []
-        for rc in retrieved:
-            meta = rc.metadata
-            label = f"{meta.source}"
-            if meta.page:
-                label += f", page {meta.page}"
-            context_lines.append(f"[{meta.id}] ({label})\n{meta.content}")
+        packed = self.packer.pack(retrieved)
+        context_text = packed.text()
+        sources_list = ", ".join(packed.sources())
 
-        context_text = "\n\n".join(context_lines)
-        sources_list = ", ".join({rc.metadata.source for rc in retrieved})
-
-        return (
+        prompt = (
             "You are an AI sales & support assistant for a small business.\n"
             "Answer the user's question using ONLY the information from the provided context.\n"
             "If an answer is not covered in the context, say you are not sure and suggest contacting the business.\n"
@@ -52,42 +77,143 @@ class RAGChain:
             "- If the question is about prices, booking, or packages, gently guide the user towards sharing their contact details "
             "so the business can follow up.\n"
         )
+        prompt_tokens = self.packer.counter.count(prompt)
+        tracer.annotate("prompt_tokens", prompt_tokens)
+        tracer.annotate("context_tokens", packed.tokens)
+        tracer.annotate("context_chunks_dropped", len(packed.dropped_ids))
+        tracer.incr("rag_prompt_tokens_total", prompt_tokens)
+        tracer.incr("rag_context_chunks_dropped_total", len(packed.dropped_ids))
+        return prompt
+
+    def _fallback_answer(self, retrieved: List[RetrievedChunk]) -> str:
+        answer = (
+            "There was an error contacting the language model. "
+            "Here are the most relevant passages from your docs instead:\n\n"
+        )
+        for rc in retrieved:
+            meta = rc.metadata
+            answer += f"- {meta.source}"
+            if meta.page:
+                answer += f", page {meta.page}"
+            answer += f": {meta.content[:250]}...\n"
+        return answer
+
+    def _prepare(
+        self,
+        question: str | QueryContext,
+        chat_history: List[Dict[str, str]],
+    ) -> Tuple[str, str, List[RetrievedChunk], List[str], np.ndarray]:
+        """Retrieval for a turn: (question, rewritten question, chunks, chunk ids, query vector)."""
+        query = as_query_context(question, self.vs.embed_queries, self.packer.counter.count)
+        user_text = query.text
+        with tracer.span("rewrite"):
+            rewritten = self._rewrite_question(query.normalized, chat_history)
+        if rewritten != query.normalized:
+            # A different text needs its own vector; the caller's context keeps the original.
+            query = QueryContext(rewritten, query.embed, query.count_tokens)
+        if self.reranker is None:
+            retrieved = self.vs.search(query)  # "embed" (first use of query.embedding) + "search" spans
+        else:
+            candidates = self.vs.search(query, top_k=self.reranker.candidates)
+            with tracer.span("rerank"):
+                retrieved = self.reranker.rerank(query, candidates, self.vs.revision)
+        tracer.annotate("question_tokens", query.token_count)
+
+        retrieved_ids = [rc.metadata.id for rc in retrieved]
+        return user_text, rewritten, retrieved, retrieved_ids, query.embedding
+
+    def _messages(self, user_text: str, rewritten: str, retrieved: List[RetrievedChunk]) -> List[Dict[str, str]]:
+        # Built only on a cache miss: packing and counting the context is wasted on a hit.
+        with tracer.span("prompt"):
+            system_prompt = self._build_system_prompt(rewritten, retrieved)
+        return [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_text}]
+
+    def _cached(self, q_emb: np.ndarray, retrieved_ids: List[str]) -> str | None:
+        if self.answer_cache is None or not retrieved_ids:
+            return None
+        with tracer.span("cache_lookup"):
+            answer = self.answer_cache.get(q_emb, retrieved_ids, self.vs.revision, self.cache_namespace)
+        tracer.incr("rag_answer_cache_hits_total" if answer is not None else "rag_answer_cache_misses_total")
+        return answer
+
+    def _remember(self, q_emb: np.ndarray, retrieved_ids: List[str], answer: str) -> None:
+        # Ungrounded answers are cheap and vary with the question; don't cache them.
+        if self.answer_cache is None or not retrieved_ids or not answer:
+            return
+        if LLM_ERROR_MESSAGE in answer:  # clients that report errors in-band
+            return
+        self.answer_cache.put(q_emb, retrieved_ids, self.vs.revision, answer, self.cache_namespace)
 
     # ----- public API -----
 
     def answer(
         self,
-        question: str,
+        question: str | QueryContext,
         chat_history: List[Dict[str, str]],
     ) -> Tuple[str, List[RetrievedChunk], List[str]]:
         if not self.vs.is_ready():
-            return (
-                "No knowledge base is indexed yet. Please upload and index business documents first.",
-                [],
-                [],
-            )
-
-        rewritten = self._rewrite_question(question, chat_history)
-        retrieved = self.vs.search(rewritten)
+            return NO_INDEX_MESSAGE, [], []
 
-        retrieved_ids = [rc.metadata.id for rc in retrieved]
-
-        system_prompt = self._build_system_prompt(rewritten, retrieved)
-        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": question}]
+        tracer.incr("rag_answers_total")
+        user_text, rewritten, retrieved, retrieved_ids, q_emb = self._prepare(question, chat_history)
+        cached = self._cached(q_emb, retrieved_ids)
+        if cached is not None:
+            return cached, retrieved, retrieved_ids
+        messages = self._messages(user_text, rewritten, retrieved)
 
         try:
-            answer = self.llm.generate(messages, max_tokens=512)
+            with tracer.span("generate"):
+                answer = self.llm.generate(messages, max_tokens=512)
         except Exception as e:
+            tracer.incr("rag_llm_errors_total")
             logger.error("Error calling LLM in RAGChain: %s", e, exc_info=True)
-            answer = (
-                "There was an error contacting the language model. "
-                "Here are the most relevant passages from your docs instead:\n\n"
-            )
-            for rc in retrieved:
-                meta = rc.metadata
-                answer += f"- {meta.source}"
-                if meta.page:
-                    answer += f", page {meta.page}"
-                answer += f": {meta.content[:250]}...\n"
+            answer = self._fallback_answer(retrieved)
+        else:
+            self._remember(q_emb, retrieved_ids, answer)
 
         return answer, retrieved, retrieved_ids
+
+    def answer_stream(
+        self,
+        question: str | QueryContext,
+        chat_history: List[Dict[str, str]],
+    ) -> Tuple[Iterator[str], List[RetrievedChunk], List[str]]:
+        """
+        Like `answer`, but returns an iterator of text deltas.
+
+        Retrieval happens before this returns, so sources can be shown while
+        the answer is still being generated.
+        """
+        if not self.vs.is_ready():
+            return iter([NO_INDEX_MESSAGE]), [], []
+
+        tracer.incr("rag_answers_total")
+        user_text, rewritten, retrieved, retrieved_ids, q_emb = self._prepare(question, chat_history)
+        cached = self._cached(q_emb, retrieved_ids)
+        if cached is not None:
+            return iter([cached]), retrieved, retrieved_ids
+        messages = self._messages(user_text, rewritten, retrieved)
+
+        def stream() -> Iterator[str]:
+            # "generate" covers the whole stream, "first_token" the wait for
+            # its first delta (time to first token).
+            parts: List[str] = []
+            try:
+                with tracer.span("generate"):
+                    deltas = iter(self.llm.generate_stream(messages, max_tokens=512))
+                    with tracer.span("first_token"):
+                        first = next(deltas, None)
+                    if first is not None:
+                        parts.append(first)
+                        yield first
+                    for delta in deltas:
+                        parts.append(delta)
+                        yield delta
+            except Exception as e:
+                tracer.incr("rag_llm_errors_total")
+                logger.error("Error streaming from LLM in RAGChain: %s", e, exc_info=True)
+                yield ("\n\n" if parts else "") + self._fallback_answer(retrieved)
+            else:
+                self._remember(q_emb, retrieved_ids, "".join(parts))
+
+        return stream(), retrieved, retrieved_ids
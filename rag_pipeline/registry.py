@@ -0,0 +1,380 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+
+from app.config import LLMConfig, PathsConfig, RAGConfig, SessionConfig
+
+if TYPE_CHECKING:
+    from rag_pipeline.answer_cache import AnswerCache
+    from rag_pipeline.embedding_cache import EmbeddingCache
+    from rag_pipeline.embeddings import Embedder
+    from rag_pipeline.reranker import Reranker
+    from rag_pipeline.retrieval import VectorStore
+    from services.analytics import AnalyticsStore
+    from services.lead_store import LeadStore
+    from services.llm_client import BaseLLMClient
+    from services.session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+
+def _load_sentence_transformer(model_name: str) -> Any | None:
+    """
+    Load a SentenceTransformer model, returning None if that is not possible
+    (missing package, Torch NotImplementedError on Streamlit Cloud, ...).
+    """
+    try:
+        from sentence_transformers import SentenceTransformer  # type: ignore
+
+        logger.info("Loading SentenceTransformer model '%s'", model_name)
+        model = SentenceTransformer(model_name)
+        logger.info(
+            "SentenceTransformer loaded; embedding dim = %s",
+            model.get_sentence_embedding_dimension(),
+        )
+        return model
+    except Exception as e:
+        logger.error(
+            "Failed to load SentenceTransformer embedding model; "
+            "fallback embeddings will be used. Error: %s",
+            e,
+        )
+        return None
+
+
+def _load_cross_encoder(model_name: str) -> Any | None:
+    """Load a sentence-transformers CrossEncoder, returning None if that is not possible."""
+    try:
+        from sentence_transformers import CrossEncoder  # type: ignore
+
+        logger.info("Loading CrossEncoder model '%s'", model_name)
+        return CrossEncoder(model_name)
+    except Exception as e:
+        logger.error(
+            "Failed to load CrossEncoder re-ranking model; MMR re-ranking will be used. Error: %s",
+            e,
+        )
+        return None
+
+
+class ResourceRegistry:
+    """
+    Process-wide cache of expensive resources.
+
+    Streamlit re-executes the app script on every interaction, but imported
+    modules survive between reruns, so anything held here is built once per
+    worker process and shared by all sessions:
+      - one embedding model per model name (used by ingestion AND retrieval)
+      - one re-ranker (and cross-encoder model) per configuration
+      - one on-disk embedding cache per model, wrapped in a shared Embedder
+      - one loaded VectorStore per knowledge-base directory
+      - one semantic answer cache per embedding space
+      - one LLM client per provider / model
+      - one session store per backend
+      - one lead store and one analytics store per database file (their
+        SQLite connections, one-time CSV import and prune timer live as
+        long as the worker)
+
+    Call `invalidate_vector_store` after re-indexing so that the next lookup
+    reloads the index from disk. `warm_up` builds the embedder, vector store,
+    re-ranker and answer cache in a background thread so the UI can render meanwhile.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        # A cached None means "loading failed" so we don't retry on every rerun.
+        self._models: Dict[str, Any | None] = {}
+        self._caches: Dict[Tuple[Path, str, int], EmbeddingCache] = {}
+        self._embedders: Dict[Tuple[Path, str, str, int], Embedder] = {}
+        self._cross_encoders: Dict[str, Any | None] = {}
+        self._rerankers: Dict[Tuple[Any, ...], Reranker] = {}
+        self._stores: Dict[Path, VectorStore] = {}
+        self._answer_caches: Dict[Tuple[Path, str, int], AnswerCache] = {}
+        self._llm_clients: Dict[Tuple[str, str, str], Tuple[BaseLLMClient, str]] = {}
+        self._session_stores: Dict[Tuple[str, str], SessionStore] = {}
+        self._lead_stores: Dict[Path, LeadStore] = {}
+        self._analytics_stores: Dict[Path, AnalyticsStore] = {}
+        # Model loading gets its own lock: the LLM client and other lookups
+        # must not wait behind a SentenceTransformer / Torch import.
+        self._model_lock = threading.Lock()
+        self._warmup: threading.Thread | None = None
+        self._warmup_state = "idle"
+        self.warmup_seconds: float | None = None
+
+    # ----- embedding model -----
+
+    def embedding_model(self, model_name: str) -> Any | None:
+        with self._model_lock:
+            if model_name not in self._models:
+                self._models[model_name] = _load_sentence_transformer(model_name)
+            return self._models[model_name]
+
+    def embedding_dim(self, model_name: str) -> int | None:
+        model = self.embedding_model(model_name)
+        if model is None:
+            return None
+        dim = model.get_sentence_embedding_dimension()
+        if dim is None:
+            dim = model.encode(["test"], convert_to_numpy=True).shape[1]
+        return int(dim)
+
+    def embedding_cache(
+        self,
+        paths: PathsConfig,
+        rag_cfg: RAGConfig,
+        model_name: str,
+        dim: int,
+    ) -> EmbeddingCache:
+        from rag_pipeline.embedding_cache import EmbeddingCache
+
+        key = (Path(paths.embedding_cache_dir).resolve(), model_name, dim)
+        with self._lock:
+            if key not in self._caches:
+                self._caches[key] = EmbeddingCache(
+                    paths.embedding_cache_dir,
+                    model_name,
+                    dim,
+                    max_entries=rag_cfg.embedding_cache_entries,
+                    memory_entries=rag_cfg.embedding_cache_memory_entries,
+                )
+            return self._caches[key]
+
+    def embedder(self, paths: PathsConfig, rag_cfg: RAGConfig) -> Embedder:
+        """Shared Embedder (model + cache, or NumPy fallback) for ingestion and retrieval."""
+        from rag_pipeline.embeddings import Embedder
+
+        model_name = rag_cfg.embedding_model_name
+        key = (
+            Path(paths.embedding_cache_dir).resolve(),
+            model_name,
+            rag_cfg.fallback_embedding,
+            rag_cfg.fallback_embedding_dim,
+        )
+        # Load outside the registry lock; embedding_model() serialises itself.
+        model = self.embedding_model(model_name)
+        with self._lock:
+            if key not in self._embedders:
+                if model is not None:
+                    dim = self.embedding_dim(model_name)
+                    cache = self.embedding_cache(paths, rag_cfg, model_name, dim)
+                else:
+                    dim = rag_cfg.fallback_embedding_dim
+                    cache = None
+                self._embedders[key] = Embedder(
+                    model, model_name, dim, cache=cache, fallback=rag_cfg.fallback_embedding
+                )
+            return self._embedders[key]
+
+    # ----- re-ranking -----
+
+    def cross_encoder(self, model_name: str) -> Any | None:
+        with self._model_lock:
+            if model_name not in self._cross_encoders:
+                self._cross_encoders[model_name] = _load_cross_encoder(model_name)
+            return self._cross_encoders[model_name]
+
+    def reranker(self, paths: PathsConfig, rag_cfg: RAGConfig) -> Reranker:
+        """Shared Reranker, so cached cross-encoder scores survive reruns."""
+        from rag_pipeline.reranker import Reranker
+
+        mode = rag_cfg.reranker
+        model = self.cross_encoder(rag_cfg.reranker_model) if mode == "cross_encoder" else None
+        if mode == "cross_encoder" and model is None:
+            mode = "mmr"
+        embedder = self.embedder(paths, rag_cfg)
+        key = (
+            mode,
+            rag_cfg.reranker_model if mode == "cross_encoder" else "",
+            Path(paths.embedding_cache_dir).resolve(),
+            rag_cfg.embedding_model_name,
+            rag_cfg.fallback_embedding,
+            rag_cfg.top_k,
+            rag_cfg.rerank_candidates,
+            rag_cfg.rerank_batch_size,
+            rag_cfg.rerank_budget_ms,
+            rag_cfg.rerank_mmr_lambda,
+            rag_cfg.rerank_cache_entries,
+        )
+        with self._lock:
+            if key not in self._rerankers:
+                self._rerankers[key] = Reranker(
+                    mode,
+                    model=model,
+                    embed=embedder.embed,
+                    top_k=rag_cfg.top_k,
+                    candidates=rag_cfg.rerank_candidates,
+                    batch_size=rag_cfg.rerank_batch_size,
+                    budget_ms=rag_cfg.rerank_budget_ms,
+                    mmr_lambda=rag_cfg.rerank_mmr_lambda,
+                    cache_entries=rag_cfg.rerank_cache_entries,
+                )
+            return self._rerankers[key]
+
+    # ----- vector stores -----
+
+    def vector_store(self, paths: PathsConfig, rag_cfg: RAGConfig) -> VectorStore:
+        """Return the loaded VectorStore for `paths.vector_store_dir`, loading it once."""
+        from rag_pipeline.retrieval import VectorStore
+
+        key = Path(paths.vector_store_dir).resolve()
+        with self._lock:
+            store = self._stores.get(key)
+            if store is None:
+                store = VectorStore(paths, rag_cfg, registry=self)
+                store.load()  # safe even if index not built yet
+                self._stores[key] = store
+            return store
+
+    def invalidate_vector_store(self, vector_store_dir: Path) -> None:
+        """Drop the cached store so the next `vector_store()` call reloads from disk."""
+        key = Path(vector_store_dir).resolve()
+        with self._lock:
+            if self._stores.pop(key, None) is not None:
+                logger.info("Invalidated cached vector store at %s", key)
+
+    # ----- answer cache -----
+
+    def answer_cache(self, paths: PathsConfig, rag_cfg: RAGConfig) -> AnswerCache | None:
+        """Shared semantic answer cache for the current embedder, or None if disabled."""
+        if not rag_cfg.answer_cache_enabled:
+            return None
+        from rag_pipeline.answer_cache import AnswerCache
+
+        embedder = self.embedder(paths, rag_cfg)
+        key = (Path(paths.answer_cache_db).resolve(), embedder.name, embedder.dim)
+        with self._lock:
+            if key not in self._answer_caches:
+                self._answer_caches[key] = AnswerCache(
+                    paths.answer_cache_db,
+                    space=f"{embedder.name}:{embedder.dim}",
+                    dim=embedder.dim,
+                    threshold=rag_cfg.answer_cache_threshold,
+                    ttl_s=rag_cfg.answer_cache_ttl_s,
+                    max_entries=rag_cfg.answer_cache_entries,
+                )
+            return self._answer_caches[key]
+
+    # ----- LLM client -----
+
+    def llm_client(self, cfg: LLMConfig) -> Tuple[BaseLLMClient, str]:
+        from services.llm_client import get_llm_client
+
+        key = (cfg.provider or "", cfg.model_name or "", cfg.api_key or "")
+        with self._lock:
+            if key not in self._llm_clients:
+                self._llm_clients[key] = get_llm_client(cfg)
+            return self._llm_clients[key]
+
+    # ----- session store -----
+
+    def session_store(self, paths: PathsConfig, cfg: SessionConfig) -> SessionStore:
+        """Shared conversation-state store for the configured backend."""
+        from services.session_store import create_session_store
+
+        location = {"sqlite": str(Path(paths.sessions_db).resolve()), "redis": cfg.redis_url}.get(cfg.backend, "")
+        key = (cfg.backend, location)
+        with self._lock:
+            if key not in self._session_stores:
+                self._session_stores[key] = create_session_store(paths, cfg)
+            return self._session_stores[key]
+
+    # ----- leads & analytics -----
+
+    def lead_store(self, paths: PathsConfig) -> LeadStore:
+        """Shared lead store for `paths.leads_db` (imports `paths.leads_csv` once)."""
+        from services.lead_store import LeadStore
+
+        key = Path(paths.leads_db).resolve()
+        with self._lock:
+            if key not in self._lead_stores:
+                self._lead_stores[key] = LeadStore(paths.leads_db, legacy_csv=paths.leads_csv)
+            return self._lead_stores[key]
+
+    def analytics_store(self, paths: PathsConfig) -> AnalyticsStore:
+        """Shared analytics store for `paths.analytics_db`."""
+        from services.analytics import AnalyticsStore
+
+        key = Path(paths.analytics_db).resolve()
+        with self._lock:
+            if key not in self._analytics_stores:
+                self._analytics_stores[key] = AnalyticsStore(paths.analytics_db)
+            return self._analytics_stores[key]
+
+    # ----- background warm-up -----
+
+    def warm_up(self, paths: PathsConfig, rag_cfg: RAGConfig) -> None:
+        """
+        Start building the embedder (SentenceTransformer + Torch), the vector
+        store (FAISS), the re-ranker, the answer cache and the prompt tokenizer
+        in a daemon thread. Only the first call per registry starts a thread;
+        check progress with `warmup_state`.
+        """
+        with self._lock:
+            if self._warmup is not None:
+                return
+            self._warmup_state = "warming"
+            self._warmup = threading.Thread(
+                target=self._warm, args=(paths, rag_cfg), name="registry-warmup", daemon=True
+            )
+            self._warmup.start()
+
+    def _warm(self, paths: PathsConfig, rag_cfg: RAGConfig) -> None:
+        start = time.perf_counter()
+        try:
+            self.embedder(paths, rag_cfg)
+            self.vector_store(paths, rag_cfg)
+            self.reranker(paths, rag_cfg)
+            self.answer_cache(paths, rag_cfg)
+            from rag_pipeline.context_packer import get_token_counter
+
+            get_token_counter().exact  # load the tokenizer now, or warn that counts are approximate
+        except Exception as e:
+            logger.error("Background warm-up failed; resources will load on first use. Error: %s", e)
+            self._warmup_state = "failed"
+        else:
+            self._warmup_state = "ready"
+        self.warmup_seconds = time.perf_counter() - start
+        logger.info("Warm-up %s after %.2fs", self._warmup_state, self.warmup_seconds)
+
+    def warmup_state(self) -> str:
+        """One of "idle", "warming", "ready" or "failed"."""
+        return self._warmup_state
+
+    def is_warm(self) -> bool:
+        """True once no warm-up is in flight (finished, failed or never started)."""
+        return self._warmup_state != "warming"
+
+    def wait_warm(self, timeout: float | None = None) -> bool:
+        thread = self._warmup
+        if thread is not None:
+            thread.join(timeout)
+        return self.is_warm()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._warmup = None
+            self._warmup_state = "idle"
+            self.warmup_seconds = None
+            self._models.clear()
+            self._caches.clear()
+            self._embedders.clear()
+            self._cross_encoders.clear()
+            self._rerankers.clear()
+            self._stores.clear()
+            self._answer_caches.clear()
+            self._llm_clients.clear()
+            self._session_stores.clear()
+            self._lead_stores.clear()
+            self._analytics_stores.clear()
+
+
+_REGISTRY = ResourceRegistry()
+
+
+def get_registry() -> ResourceRegistry:
+    """Return the process-wide registry."""
+    return _REGISTRY
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from rag_pipeline.query_context import QueryContext
+from rag_pipeline.retrieval import RetrievedChunk
+from services.tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+tracer = get_tracer()
+
+RERANKERS = ("none", "mmr", "cross_encoder")
+
+
+class Reranker:
+    """
+    Second retrieval stage: RAGChain over-fetches `candidates` hits from
+    VectorStore.search and the reranker keeps the best `top_k` for the prompt.
+
+      - "cross_encoder": a local CrossEncoder reads each (question, chunk)
+        pair and scores it, `batch_size` pairs per call. Scores are cached per
+        (question, chunk) for the current index revision, so a repeated
+        question costs no model call. Results carry the cross-encoder score.
+      - "mmr": maximal marginal relevance. Chunks are picked by retrieval
+        score minus their similarity to chunks already picked (embeddings
+        from the shared Embedder, cached since ingestion), so near-duplicates
+        don't fill the context. Results keep their retrieval score.
+      - "none": retrieval order.
+
+    All of it runs under `budget_ms`: before each batch the reranker checks
+    that the batch is expected to finish in time (a batch in progress is not
+    interrupted). If not, it returns the retrieval order; pairs already
+    scored stay cached for the next time.
+    """
+
+    def __init__(
+        self,
+        mode: str = "mmr",
+        model: Any | None = None,
+        embed: Callable[[List[str]], np.ndarray] | None = None,
+        top_k: int = 5,
+        candidates: int = 50,
+        batch_size: int = 16,
+        budget_ms: float = 150.0,
+        mmr_lambda: float = 0.7,
+        cache_entries: int = 20_000,
+    ):
+        if mode not in RERANKERS:
+            raise ValueError(f"Unknown reranker '{mode}', expected one of {RERANKERS}")
+        if mode == "cross_encoder" and model is None:
+            raise ValueError("The cross_encoder reranker needs a model")
+        if mode == "mmr" and embed is None:
+            raise ValueError("The mmr reranker needs an embed function")
+        self.mode = mode
+        self.model = model
+        self.embed = embed
+        self.top_k = top_k
+        self.candidates = max(candidates, top_k)
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.mmr_lambda = mmr_lambda
+        self.cache_entries = cache_entries
+        self._lock = threading.Lock()
+        self._scores: OrderedDict[Tuple[str, str], float] = OrderedDict()
+        self._revision = ""
+
+    def rerank(self, query: QueryContext, candidates: List[RetrievedChunk], revision: str = "") -> List[RetrievedChunk]:
+        """The best `top_k` of `candidates` (retrieval order) for `query`."""
+        if self.mode == "none" or len(candidates) <= 1:
+            return candidates[:self.top_k]
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        if self.mode == "cross_encoder":
+            reranked = self._cross_encode(query.normalized, candidates, revision, deadline)
+        else:
+            reranked = self._mmr(candidates, deadline)
+        if reranked is None:
+            tracer.incr("rag_rerank_over_budget_total")
+            logger.info("Re-ranking exceeded %.0f ms; keeping the retrieval order", self.budget_ms)
+            return candidates[:self.top_k]
+        return reranked
+
+    # ----- cross-encoder -----
+
+    def _cross_encode(
+        self, question: str, candidates: List[RetrievedChunk], revision: str, deadline: float
+    ) -> List[RetrievedChunk] | None:
+        scores = self._cached_scores(question, candidates, revision)
+        todo = [i for i, score in enumerate(scores) if score is None]
+        tracer.incr("rag_rerank_cache_hits_total", len(candidates) - len(todo))
+        slowest = 0.0
+        for start in range(0, len(todo), self.batch_size):
+            now = time.perf_counter()
+            if now + slowest > deadline:
+                return None
+            batch = todo[start:start + self.batch_size]
+            pairs = [(question, candidates[i].metadata.content) for i in batch]
+            batch_scores = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            slowest = max(slowest, time.perf_counter() - now)
+            for i, score in zip(batch, np.asarray(batch_scores, dtype="float32").reshape(-1).tolist()):
+                scores[i] = score
+            self._store_scores(question, {candidates[i].metadata.id: scores[i] for i in batch}, revision)
+        order = sorted(range(len(candidates)), key=lambda i: (-scores[i], i))[:self.top_k]
+        return [replace(candidates[i], score=scores[i]) for i in order]
+
+    def _cached_scores(self, question: str, candidates: List[RetrievedChunk], revision: str) -> List[float | None]:
+        with self._lock:
+            if revision != self._revision:
+                # Chunk ids are positional; a new index revision may reuse them.
+                self._scores.clear()
+                self._revision = revision
+            scores: List[float | None] = []
+            for rc in candidates:
+                key = (question, rc.metadata.id)
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                scores.append(score)
+            return scores
+
+    def _store_scores(self, question: str, scores: Dict[str, float], revision: str) -> None:
+        with self._lock:
+            if revision != self._revision:
+                return
+            for chunk_id, score in scores.items():
+                self._scores[(question, chunk_id)] = score
+            while len(self._scores) > self.cache_entries:
+                self._scores.popitem(last=False)
+
+    # ----- MMR -----
+
+    def _mmr(self, candidates: List[RetrievedChunk], deadline: float) -> List[RetrievedChunk] | None:
+        vectors = np.asarray(self.embed([rc.metadata.content for rc in candidates]), dtype="float32")
+        if time.perf_counter() > deadline:
+            return None
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        similarity = vectors @ vectors.T
+
+        relevance = np.asarray([rc.score for rc in candidates], dtype="float32")
+        if relevance.max() > 0:
+            relevance /= relevance.max()
+        redundancy = np.zeros(len(candidates), dtype="float32")  # max similarity to a picked chunk
+        available = np.ones(len(candidates), dtype=bool)
+        picked: List[int] = []
+        for _ in range(min(self.top_k, len(candidates))):
+            mmr = self.mmr_lambda * relevance - (1.0 - self.mmr_lambda) * redundancy
+            best = int(np.argmax(np.where(available, mmr, -np.inf)))
+            picked.append(best)
+            available[best] = False
+            np.maximum(redundancy, similarity[best], out=redundancy)
+        return [candidates[i] for i in picked]
@@ -1,18 +1,27 @@
 from __future__ import annotations
 
 import logging
-import pickle
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Tuple
 
-import faiss
 import numpy as np
 
 from app.config import RAGConfig, PathsConfig
-from rag_pipeline.ingestion import ChunkMetadata
+from rag_pipeline.chunk_store import ChunkMetadata, ChunkStore, open_chunk_store
+from rag_pipeline.index_manifest import IndexManifest
+from rag_pipeline.lazy_imports import lazy_import
+from rag_pipeline.lexical_index import LexicalIndex
+from rag_pipeline.query_context import QueryContext, as_query_context
+from rag_pipeline.registry import ResourceRegistry, get_registry
+from rag_pipeline.vector_index import migrate_index, prepare_vectors, to_similarity, write_index_atomic
+from services.tracing import get_tracer
+
+# Imported on first use: FAISS is heavy and not needed to render the UI.
+faiss = lazy_import("faiss")
 
 logger = logging.getLogger(__name__)
+tracer = get_tracer()
 
 
 @dataclass
@@ -26,84 +35,185 @@ class VectorStore:
     Local FAISS-based vector store with metadata.
 
     - Tries to use SentenceTransformer for query embeddings.
-    - Falls back to the same byte-based embedding used in ingestion
+    - With the default "cosine" metric, vectors are unit length and scores
+      are real cosine similarities, so `score_threshold` is meaningful.
+      Stores in an older format are migrated when loaded.
+    - Falls back to the same NumPy embedding used in ingestion
       if the model is not available (to avoid Torch NotImplementedError).
+    - With `hybrid_search`, `search` / `search_many` also query the BM25
+      index written by ingestion and fuse both rankings (reciprocal-rank
+      fusion), so exact plan names, codes and prices are found even when
+      the embedding misses them. `search_vectors` stays dense-only.
     """
 
-    def __init__(self, paths: PathsConfig, rag_cfg: RAGConfig):
+    def __init__(
+        self,
+        paths: PathsConfig,
+        rag_cfg: RAGConfig,
+        registry: ResourceRegistry | None = None,
+    ):
         self.paths = paths
         self.cfg = rag_cfg
+        self.registry = registry or get_registry()
         self.index_path = self.paths.vector_store_dir / "index.faiss"
-        self.meta_path = self.paths.vector_store_dir / "chunks.pkl"
+        self.manifest_path = self.paths.vector_store_dir / "manifest.json"
 
         self.index: faiss.Index | None = None
-        self.chunks: List[ChunkMetadata] = []
+        # Memory-mapped; rows become ChunkMetadata only when accessed.
+        self.chunks: ChunkStore | List[ChunkMetadata] = []
         self.embedding_dim: int = 768
+        self.metric: str = self.cfg.index_metric
+        self.revision: str = ""  # IndexManifest.revision of the loaded index
+        self.lexical: LexicalIndex | None = None  # BM25 index, same revision
 
-        self.st_model = None
-        try:
-            from sentence_transformers import SentenceTransformer  # type: ignore
-
-            logger.info(
-                "Trying to load SentenceTransformer model '%s' for retrieval",
-                self.cfg.embedding_model_name,
-            )
-            self.st_model = SentenceTransformer(self.cfg.embedding_model_name)
-        except Exception as e:
-            logger.error(
-                "Failed to load SentenceTransformer for retrieval; "
-                "fallback embeddings will be used. Error: %s",
-                e,
-            )
-            self.st_model = None
+        # Same Embedder (model + cache, or fallback) as IngestionEngine.
+        self.embedder = self.registry.embedder(self.paths, self.cfg)
+        self.st_model = self.embedder.st_model
 
     def load(self) -> bool:
-        if not self.index_path.exists() or not self.meta_path.exists():
+        chunks = open_chunk_store(self.paths.vector_store_dir)
+        if not self.index_path.exists() or chunks is None:
             logger.warning("Vector store not found. Index or metadata file missing.")
             return False
-        self.index = faiss.read_index(str(self.index_path))
+        index = faiss.read_index(str(self.index_path))
+        manifest = IndexManifest.load(self.manifest_path)
+        lexical = LexicalIndex.load(self.paths.vector_store_dir, self.cfg.bm25_k1, self.cfg.bm25_b)
+        if lexical is not None and lexical.revision != manifest.revision:
+            logger.warning("BM25 index does not match the vector index; keyword search off until re-ingestion")
+            lexical = None
+        index, migrated = migrate_index(index, manifest, self.cfg)
+        if migrated:
+            # Persist so the conversion happens once, not on every load.
+            manifest.new_revision()
+            write_index_atomic(index, self.index_path)
+            if lexical is not None:  # ids are unchanged
+                lexical.save(self.paths.vector_store_dir, manifest.revision)
+            manifest.save(self.manifest_path)
+        self.index = index
+        self.lexical = lexical
+        self.metric = manifest.metric
+        self.revision = manifest.revision
         self.embedding_dim = int(self.index.d)
-        with self.meta_path.open("rb") as f:
-            self.chunks = pickle.load(f)
+        self.chunks = chunks
+        if self.embedding_dim != self.embedder.dim:
+            logger.error(
+                "Index dim %d does not match embedder '%s' dim %d; re-index your documents.",
+                self.embedding_dim,
+                self.embedder.name,
+                self.embedder.dim,
+            )
         logger.info("Vector store loaded: %d chunks (dim=%d)", len(self.chunks), self.embedding_dim)
         return True
 
     def is_ready(self) -> bool:
         return self.index is not None and len(self.chunks) > 0
 
-    def _embed_query(self, query: str) -> np.ndarray:
-        if self.st_model is not None:
-            emb = self.st_model.encode([query], convert_to_numpy=True)
-            return emb.astype("float32")
+    def source_counts(self) -> Dict[str, int]:
+        """Number of indexed chunks per source document."""
+        if isinstance(self.chunks, ChunkStore):
+            return self.chunks.source_counts()
+        return {}
+
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        if self.st_model is None:
+            logger.warning("Using fallback '%s' embedding for query.", self.embedder.fallback)
+        # Repeated questions are served from the shared embedding cache.
+        return self.embedder.embed(queries)
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Query vectors as searched: float32, unit length for cosine."""
+        with tracer.span("embed"):
+            return prepare_vectors(self._embed_queries(list(queries)), self.metric)
+
+    def search(self, query: str | QueryContext, top_k: int | None = None) -> List[RetrievedChunk]:
+        """
+        Retrieve for one query. A QueryContext is embedded at most once: a
+        vector it already holds (or computes here) is shared with the rest
+        of the turn.
+        """
+        if not self.is_ready():
+            logger.warning("Vector store is not ready for search.")
+            return []
+        query = as_query_context(query, self.embed_queries)
+        results = self._search([query], query.embedding[None, :], top_k)[0]
+        logger.info("Search for '%s' returned %d hits", query.text, len(results))
+        return results
 
-        logger.warning("Using fallback byte-based embedding for query.")
-        dim = self.embedding_dim or 768
-        arr = np.zeros(dim, dtype="float32")
-        for i, ch in enumerate(query.encode("utf-8")[:dim]):
-            arr[i] = ch / 255.0
-        return arr.reshape(1, -1)
+    def search_many(self, queries: List[str], top_k: int | None = None) -> List[List[RetrievedChunk]]:
+        """
+        Retrieve for several queries at once; one result list per query.
 
-    def search(self, query: str, top_k: int | None = None) -> List[RetrievedChunk]:
+        All queries are embedded in one batch and searched with a single
+        `index.search` call (see `search_vectors`).
+        """
+        if not queries:
+            return []
         if not self.is_ready():
             logger.warning("Vector store is not ready for search.")
-            return []
+            return [[] for _ in queries]
+        contexts = [as_query_context(q) for q in queries]
+        return self._search(contexts, self.embed_queries([q.normalized for q in contexts]), top_k)
 
+    def _search(
+        self, queries: List[QueryContext], q_embs: np.ndarray, top_k: int | None
+    ) -> List[List[RetrievedChunk]]:
         if top_k is None:
             top_k = self.cfg.top_k
-
-        q_emb = self._embed_query(query)
-
-        distances, indices = self.index.search(q_emb, top_k)
-        results: List[RetrievedChunk] = []
-
-        for score, idx in zip(distances[0], indices[0]):
-            if idx < 0 or idx >= len(self.chunks):
-                continue
-            # faiss gives L2 distance; turn into pseudo-similarity [0,1]
-            sim = float(max(0.0, 1.0 - score))
-            if sim < self.cfg.score_threshold:
-                continue
-            results.append(RetrievedChunk(metadata=self.chunks[idx], score=sim))
-
-        logger.info("Search for '%s' returned %d hits", query, len(results))
-        return results
+        if self.lexical is None or not self.cfg.hybrid_search:
+            return self._materialize(self._dense_hits(q_embs, top_k))
+        n_candidates = max(top_k, self.cfg.hybrid_candidates)
+        dense = self._dense_hits(q_embs, n_candidates)
+        with tracer.span("lexical_search"):
+            lexical = [self.lexical.search(q.terms, n_candidates)[0] for q in queries]
+        return self._materialize(
+            [self._fuse(d_pos, self.chunks.positions(l_ids), top_k) for (d_pos, _), l_ids in zip(dense, lexical)]
+        )
+
+    def _fuse(self, dense_pos: np.ndarray, lexical_pos: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reciprocal-rank fusion of two rankings of row positions. Scores are
+        scaled to [0, 1]: 1 is first in both lists.
+        """
+        k = self.cfg.rrf_k
+        fused: Dict[int, float] = {}
+        for ranking in (dense_pos, lexical_pos[lexical_pos >= 0]):
+            for rank, pos in enumerate(ranking.tolist()):
+                fused[pos] = fused.get(pos, 0.0) + 1.0 / (k + rank + 1)
+        best = sorted(fused, key=lambda pos: (-fused[pos], pos))[:top_k]
+        scale = (k + 1) / 2.0
+        return (
+            np.asarray(best, dtype="int64"),
+            np.asarray([fused[pos] * scale for pos in best], dtype="float32"),
+        )
+
+    def search_vectors(self, q_embs: np.ndarray, top_k: int | None = None) -> List[List[RetrievedChunk]]:
+        """
+        Dense search with vectors from `embed_queries`; one result list per row.
+        """
+        if not self.is_ready():
+            logger.warning("Vector store is not ready for search.")
+            return [[] for _ in range(len(q_embs))]
+        return self._materialize(self._dense_hits(q_embs, self.cfg.top_k if top_k is None else top_k))
+
+    def _dense_hits(self, q_embs: np.ndarray, top_k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (row positions, similarities) per query, best first.
+
+        Score / missing-id filtering and the chunk row lookup are done on the
+        whole (n_queries, top_k) matrix in NumPy.
+        """
+        with tracer.span("search"):
+            distances, indices = self.index.search(q_embs, top_k)
+        sims = to_similarity(distances, self.metric)
+
+        keep = (indices >= 0) & (sims >= self.cfg.score_threshold)
+        positions = np.full(indices.shape, -1, dtype="int64")
+        positions[keep] = self.chunks.positions(indices[keep])
+        keep &= positions >= 0
+        return [(positions[q][keep[q]], sims[q][keep[q]]) for q in range(len(q_embs))]
+
+    def _materialize(self, hits: List[Tuple[np.ndarray, np.ndarray]]) -> List[List[RetrievedChunk]]:
+        return [
+            [RetrievedChunk(metadata=self.chunks.row(int(pos)), score=float(score)) for pos, score in zip(*row)]
+            for row in hits
+        ]
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+from app.config import RAGConfig
+from rag_pipeline.index_manifest import IndexManifest
+from rag_pipeline.lazy_imports import lazy_import
+
+# Imported on first use: FAISS is heavy and not needed to render the UI.
+faiss = lazy_import("faiss")
+
+logger = logging.getLogger(__name__)
+
+# 1: IndexFlatL2 over raw embeddings, no metric recorded (original format)
+# 2: ids mapped (IndexIDMap2, or native IVF ids), metric recorded in the
+#    manifest, cosine stores unit vectors
+INDEX_FORMAT_VERSION = 2
+
+METRICS = ("cosine", "l2")
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+
+def _faiss_metric(metric: str) -> int:
+    if metric not in METRICS:
+        raise ValueError(f"Unknown index metric '{metric}', expected one of {METRICS}")
+    return faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+
+
+def choose_index_type(n_vectors: int, cfg: RAGConfig) -> str:
+    """Resolve `cfg.index_type`; "auto" picks the tier from the corpus size."""
+    if cfg.index_type != "auto":
+        if cfg.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{cfg.index_type}', expected 'auto' or one of {INDEX_TYPES}")
+        if cfg.index_type == "ivfpq" and n_vectors < _ivfpq_min_train(cfg):
+            return "flat"  # too few vectors to train the PQ codebooks
+        return cfg.index_type
+    if n_vectors < cfg.hnsw_min_vectors:
+        return "flat"
+    if n_vectors < cfg.ivfpq_min_vectors:
+        return "hnsw"
+    return "ivfpq"
+
+
+def _ivfpq_min_train(cfg: RAGConfig) -> int:
+    return 39 * (2 ** cfg.pq_nbits)
+
+
+def index_type_of(index: faiss.Index) -> str:
+    if faiss.try_extract_index_ivf(index) is not None:
+        return "ivfpq"
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    # HNSW graphs cannot drop nodes; such indexes are rebuilt instead.
+    return index_type_of(index) != "hnsw"
+
+
+def _pq_subquantizers(dim: int, requested: int) -> int:
+    if requested:
+        return requested
+    # ~8 dims per sub-quantizer, falling back to any divisor of dim.
+    for m in (dim // 8, 64, 48, 32, 24, 16, 8, 4, 2, 1):
+        if m and dim % m == 0:
+            return m
+    return 1
+
+
+def new_index(dim: int, metric: str, index_type: str = "flat", cfg: RAGConfig | None = None) -> faiss.Index:
+    """
+    Create an empty index that accepts caller-provided FAISS ids.
+
+    Flat and HNSW are wrapped in IndexIDMap2. IVF-PQ keeps ids natively
+    (IndexIDMap2 would desync on remove_ids) and needs `train` before use.
+    """
+    faiss_metric = _faiss_metric(metric)
+    if index_type == "flat":
+        base = faiss.IndexFlatIP(dim) if metric == "cosine" else faiss.IndexFlatL2(dim)
+        return faiss.IndexIDMap2(base)
+    if cfg is None:
+        raise ValueError(f"Index type '{index_type}' needs a RAGConfig for its parameters")
+    if index_type == "hnsw":
+        base = faiss.IndexHNSWFlat(dim, cfg.hnsw_m, faiss_metric)
+        base.hnsw.efConstruction = cfg.hnsw_ef_construction
+        return faiss.IndexIDMap2(base)
+    if index_type == "ivfpq":
+        raise ValueError("IVF-PQ indexes are created by build_index (they need training data)")
+    raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+
+
+def _new_ivfpq(vectors: np.ndarray, metric: str, cfg: RAGConfig) -> faiss.Index:
+    n, dim = vectors.shape
+    nlist = cfg.ivf_nlist or int(4 * np.sqrt(n))
+    nlist = max(1, min(nlist, n // 39 or 1))  # faiss wants >= 39 training points per list
+    quantizer = faiss.IndexFlatIP(dim) if metric == "cosine" else faiss.IndexFlatL2(dim)
+    index = faiss.IndexIVFPQ(
+        quantizer, dim, nlist, _pq_subquantizers(dim, cfg.pq_m), cfg.pq_nbits, _faiss_metric(metric)
+    )
+
+    sample = vectors
+    if n > cfg.ivf_train_sample:
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(n, cfg.ivf_train_sample, replace=False)]
+    logger.info("Training IVF-PQ (nlist=%d) on %d of %d vectors", nlist, len(sample), n)
+    index.train(sample)
+    # Hashtable direct map: reconstruct / remove by arbitrary FAISS id.
+    index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    return index
+
+
+def build_index(vectors: np.ndarray, ids: np.ndarray, metric: str, cfg: RAGConfig) -> faiss.Index:
+    """Build the index tier chosen for `len(vectors)` from already-prepared vectors."""
+    dim = vectors.shape[1]
+    index_type = choose_index_type(len(vectors), cfg)
+    if index_type == "ivfpq":
+        index = _new_ivfpq(vectors, metric, cfg)
+    else:
+        index = new_index(dim, metric, index_type, cfg)
+    if len(ids):
+        index.add_with_ids(vectors, np.asarray(ids, dtype="int64"))
+    configure_search(index, cfg)
+    logger.info("Built %s index with %d vectors", index_type, index.ntotal)
+    return index
+
+
+def configure_search(index: faiss.Index, cfg: RAGConfig) -> None:
+    """Apply query-time knobs (efSearch / nprobe); they are not persisted by FAISS."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = cfg.ivf_nprobe
+        return
+    if isinstance(index, faiss.IndexIDMap2):
+        inner = faiss.downcast_index(index.index)
+        if isinstance(inner, faiss.IndexHNSW):
+            inner.hnsw.efSearch = cfg.hnsw_ef_search
+
+
+def prepare_vectors(embs: np.ndarray, metric: str) -> np.ndarray:
+    """Return float32 vectors ready to add / search; unit length for cosine."""
+    embs = np.ascontiguousarray(embs, dtype="float32")
+    if metric == "cosine":
+        embs = embs.copy()
+        faiss.normalize_L2(embs)
+    return embs
+
+
+def to_similarity(distances: np.ndarray, metric: str) -> np.ndarray:
+    """Map raw FAISS scores to similarities (higher is better)."""
+    if metric == "cosine":
+        # Inner product of unit vectors is the cosine similarity itself.
+        return distances
+    # L2 distance; pseudo-similarity kept from the original store.
+    return np.maximum(0.0, 1.0 - distances)
+
+
+def reconstruct_all(index: faiss.Index) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return (ids, vectors) for every vector stored in `index`.
+
+    Exact for flat and HNSW; IVF-PQ returns the (lossy) PQ reconstructions.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        invlists = ivf.invlists
+        parts = [
+            faiss.rev_swig_ptr(invlists.get_ids(lst), invlists.list_size(lst)).copy()
+            for lst in range(ivf.nlist)
+            if invlists.list_size(lst)
+        ]
+        ids = np.concatenate(parts).astype("int64") if parts else np.zeros(0, dtype="int64")
+        if ivf.direct_map.type == faiss.DirectMap.NoMap:
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        vectors = np.zeros((len(ids), index.d), dtype="float32")
+        for row, vid in enumerate(ids):
+            vectors[row] = index.reconstruct(int(vid))
+        return ids, vectors
+    if isinstance(index, faiss.IndexIDMap2):
+        ids = faiss.vector_to_array(index.id_map).astype("int64")
+        vectors = index.index.reconstruct_n(0, index.ntotal)
+        return ids, vectors
+    return np.arange(index.ntotal, dtype="int64"), index.reconstruct_n(0, index.ntotal)
+
+
+def write_index_atomic(index: faiss.Index, path: Path) -> None:
+    # Readers in other sessions / processes never see a partially written file.
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    faiss.write_index(index, str(tmp_path))
+    os.replace(tmp_path, path)
+
+
+def _is_id_mapped(index: faiss.Index) -> bool:
+    return isinstance(index, faiss.IndexIDMap2) or faiss.try_extract_index_ivf(index) is not None
+
+
+def migrate_index(index: faiss.Index, manifest: IndexManifest, cfg: RAGConfig) -> Tuple[faiss.Index, bool]:
+    """
+    Bring an index to the current format, the configured metric and the
+    index tier chosen for its size.
+
+    Returns (index, migrated). Vectors keep their FAISS ids; for cosine they
+    are re-normalized, which is what makes the stored scores calibrated.
+    """
+    metric = cfg.index_metric
+    target_type = choose_index_type(index.ntotal, cfg)
+    up_to_date = (
+        _is_id_mapped(index)
+        and manifest.format_version == INDEX_FORMAT_VERSION
+        and manifest.metric == metric
+        and index_type_of(index) == target_type
+    )
+    if up_to_date:
+        configure_search(index, cfg)
+        return index, False
+
+    logger.info(
+        "Migrating vector index (format %d, %s, %s) -> (format %d, %s, %s)",
+        manifest.format_version,
+        manifest.metric,
+        index_type_of(index),
+        INDEX_FORMAT_VERSION,
+        metric,
+        target_type,
+    )
+    ids, vectors = reconstruct_all(index)
+    if len(ids):
+        migrated = build_index(prepare_vectors(vectors, metric), ids, metric, cfg)
+    else:
+        migrated = new_index(index.d, metric, "flat" if target_type == "ivfpq" else target_type, cfg)
+    manifest.format_version = INDEX_FORMAT_VERSION
+    manifest.metric = metric
+    return migrated, True
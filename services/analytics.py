@@ -1,9 +1,51 @@
 from __future__ import annotations
 
-from collections import Counter
-from dataclasses import dataclass
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rollup granularities: bucket width and how long buckets are kept (None = forever).
+ROLLUPS: Dict[str, Tuple[int, float | None]] = {
+    "minute": (60, 2 * 86_400.0),
+    "hour": (3600, 90 * 86_400.0),
+    "day": (86_400, None),
+}
+PRUNE_INTERVAL_S = 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS qa_log (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    intent TEXT NOT NULL,
+    niche TEXT NOT NULL,
+    retrieved_ids TEXT NOT NULL,
+    trace TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    intent TEXT NOT NULL,
+    niche TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (intent, niche)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollups (
+    granularity TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    intent TEXT NOT NULL,
+    niche TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (granularity, bucket, intent, niche)
+) WITHOUT ROWID;
+"""
 
 
 @dataclass
@@ -13,15 +55,37 @@ class QARecord:
     answer: str
     intent: str
     retrieved_ids: List[str]
+    # Per-turn latency breakdown: stage -> milliseconds (see services.tracing).
+    trace: Dict[str, float] = field(default_factory=dict)
+    niche: str = ""
 
 
 class AnalyticsStore:
     """
-    Lightweight in-memory store for basic analytics and evaluation hooks.
+    Persistent Q&A analytics in SQLite (WAL, shared by worker processes).
+
+    - every turn is appended to the raw `qa_log` table
+    - the same transaction bumps a counter per (intent, niche) and the
+      minute / hour / day rollup buckets, so dashboard queries read a
+      handful of pre-aggregated rows instead of scanning the log
+    - old minute / hour buckets are pruned after their retention (ROLLUPS)
+
+    `db_path=None` keeps everything in memory (tests, benchmarks).
     """
 
-    def __init__(self) -> None:
-        self.records: List[QARecord] = []
+    def __init__(self, db_path: Path | None = None) -> None:
+        if db_path is not None:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path) if db_path else ":memory:", check_same_thread=False, timeout=10.0)
+        if db_path is not None:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+        self._last_prune = 0.0
+
+    # ----- writes -----
 
     def add_record(
         self,
@@ -29,19 +93,117 @@ class AnalyticsStore:
         answer: str,
         intent: str,
         retrieved_ids: List[str],
+        trace: Dict[str, float] | None = None,
+        niche: str = "",
     ) -> None:
-        self.records.append(
-            QARecord(
-                timestamp=datetime.utcnow().isoformat(),
-                question=question,
-                answer=answer,
-                intent=intent,
-                retrieved_ids=retrieved_ids,
-            )
-        )
-
-    def get_intent_counts(self) -> Dict[str, int]:
-        return Counter(r.intent for r in self.records)
+        now = time.time()
+        timestamp = datetime.utcfromtimestamp(now).isoformat()
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO qa_log (timestamp, question, answer, intent, niche, retrieved_ids, trace) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (timestamp, question, answer, intent, niche, json.dumps(retrieved_ids), json.dumps(trace or {})),
+                )
+                self._db.execute(
+                    "INSERT INTO counters (intent, niche, n) VALUES (?, ?, 1) "
+                    "ON CONFLICT(intent, niche) DO UPDATE SET n = n + 1",
+                    (intent, niche),
+                )
+                self._db.executemany(
+                    "INSERT INTO rollups (granularity, bucket, intent, niche, n) VALUES (?, ?, ?, ?, 1) "
+                    "ON CONFLICT(granularity, bucket, intent, niche) DO UPDATE SET n = n + 1",
+                    [(name, int(now // width) * width, intent, niche) for name, (width, _) in ROLLUPS.items()],
+                )
+        if now - self._last_prune >= PRUNE_INTERVAL_S:
+            self.prune_rollups(now)
+
+    def prune_rollups(self, now: float | None = None) -> int:
+        """Drop rollup buckets older than their retention; returns rows removed."""
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock:
+            self._last_prune = now
+            with self._db:
+                for name, (_, retention) in ROLLUPS.items():
+                    if retention is not None:
+                        cur = self._db.execute(
+                            "DELETE FROM rollups WHERE granularity = ? AND bucket < ?", (name, now - retention)
+                        )
+                        removed += cur.rowcount
+        return removed
+
+    # ----- queries (pre-aggregated) -----
+
+    def get_intent_counts(self, niche: str | None = None) -> Dict[str, int]:
+        """Questions per intent, overall or for one niche."""
+        sql = "SELECT intent, SUM(n) FROM counters"
+        params: Tuple = ()
+        if niche is not None:
+            sql += " WHERE niche = ?"
+            params = (niche,)
+        with self._lock:
+            rows = self._db.execute(sql + " GROUP BY intent ORDER BY intent", params).fetchall()
+        return {intent: int(n) for intent, n in rows}
+
+    def get_niche_counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT niche, SUM(n) FROM counters GROUP BY niche ORDER BY niche").fetchall()
+        return {niche: int(n) for niche, n in rows}
+
+    def total(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT COALESCE(SUM(n), 0) FROM counters").fetchone()[0])
+
+    def timeseries(
+        self,
+        granularity: str = "hour",
+        since: float | None = None,
+        intent: str | None = None,
+        niche: str | None = None,
+    ) -> List[Tuple[str, int]]:
+        """
+        (bucket start as ISO UTC, questions) per bucket from the rollups,
+        oldest first; `since` is a Unix timestamp, and the bucket containing
+        it is included.
+        """
+        if granularity not in ROLLUPS:
+            raise ValueError(f"Unknown granularity '{granularity}'; expected one of {sorted(ROLLUPS)}")
+        where = ["granularity = ?"]
+        params: List = [granularity]
+        if since is not None:
+            width = ROLLUPS[granularity][0]
+            where.append("bucket >= ?")
+            params.append(int(since // width) * width)
+        for column, value in (("intent", intent), ("niche", niche)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT bucket, SUM(n) FROM rollups WHERE {' AND '.join(where)} GROUP BY bucket ORDER BY bucket",
+                params,
+            ).fetchall()
+        return [(datetime.utcfromtimestamp(bucket).isoformat(), int(n)) for bucket, n in rows]
+
+    # ----- raw log -----
+
+    def recent(self, limit: int = 20) -> List[QARecord]:
+        """The latest raw records, newest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT timestamp, question, answer, intent, retrieved_ids, trace, niche "
+                "FROM qa_log ORDER BY id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            QARecord(ts, question, answer, intent, json.loads(ids), json.loads(trace), niche)
+            for ts, question, answer, intent, ids, trace, niche in rows
+        ]
+
+    def last_record(self) -> QARecord | None:
+        records = self.recent(1)
+        return records[0] if records else None
 
     def evaluate_response(self, record: QARecord) -> Dict[str, float]:
         """
@@ -50,3 +212,7 @@ class AnalyticsStore:
         """
         # TODO: integrate with RAGAS or custom eval later.
         return {"dummy_score": 1.0}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
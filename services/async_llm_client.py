@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List
+
+from app.config import LLMConfig
+from services.llm_client import BaseLLMClient
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class LLMRequestError(RuntimeError):
+    """A chat-completion request failed for good (after retries, or not retryable)."""
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter: `rate` tokens per second, at most
+    `capacity` saved up for bursts. rate <= 0 disables limiting.
+
+    Refill and take happen without an await in between, so coroutines on
+    one event loop need no lock.
+    """
+
+    def __init__(self, rate: float, capacity: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.clock = clock
+        self.tokens = float(self.capacity)
+        self._last = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self) -> float:
+        """Take a token; returns 0.0 on success, else the seconds to wait."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+def backoff_delay(attempt: int, cfg: LLMConfig, retry_after: float | None = None) -> float:
+    """Jittered exponential backoff; a server `Retry-After` is honoured up to `backoff_max_s`."""
+    cap = min(cfg.backoff_max_s, cfg.backoff_base_s * (2 ** attempt))
+    delay = cap / 2 + random.uniform(0, cap / 2)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cfg.backoff_max_s))
+    return delay
+
+
+def _retry_after(headers: Any) -> float | None:
+    value = headers.get("retry-after") if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class AsyncBaseLLMClient(ABC):
+    """Asyncio counterpart of BaseLLMClient."""
+
+    @abstractmethod
+    async def generate(self, messages: List[Dict[str, str]], max_tokens: int = 512) -> str:
+        raise NotImplementedError
+
+    async def generate_stream(self, messages: List[Dict[str, str]], max_tokens: int = 512) -> AsyncIterator[str]:
+        yield await self.generate(messages, max_tokens=max_tokens)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class AsyncOpenAIClient(AsyncBaseLLMClient):
+    """
+    Chat Completions over a pooled `httpx.AsyncClient`; works with any
+    OpenAI-compatible endpoint (`LLMConfig.base_url`).
+
+    - connections are kept alive and reused (pool size = max_concurrency)
+    - per-request timeouts (`timeout_s`, `connect_timeout_s`)
+    - 429 / 5xx / connection errors are retried with jittered exponential
+      backoff, honouring `Retry-After`; other errors raise LLMRequestError
+    - a semaphore caps in-flight requests, a token bucket caps the rate
+
+    An instance belongs to the event loop it is first used on.
+    """
+
+    def __init__(self, cfg: LLMConfig, transport: Any | None = None):
+        try:
+            import httpx  # type: ignore
+        except ImportError as exc:
+            raise RuntimeError("httpx is not installed. Run `pip install httpx`.") from exc
+
+        self._httpx = httpx
+        self.cfg = cfg
+        self.model_name = cfg.model_name
+        self.base_url = cfg.base_url
+        self._semaphore = asyncio.Semaphore(max(1, cfg.max_concurrency))
+        self._bucket = TokenBucket(cfg.rate_limit_rps, cfg.rate_limit_burst)
+
+        headers = {"Content-Type": "application/json"}
+        if cfg.api_key:
+            headers["Authorization"] = f"Bearer {cfg.api_key}"
+        pool = max(1, cfg.max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=cfg.base_url,
+            headers=headers,
+            timeout=httpx.Timeout(cfg.timeout_s, connect=cfg.connect_timeout_s),
+            limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool),
+            transport=transport,
+        )
+
+    def _payload(self, messages: List[Dict[str, str]], max_tokens: int, stream: bool) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"model": self.model_name, "messages": messages, "max_tokens": max_tokens}
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    async def _retry_wait(self, attempt: int, reason: str, retry_after: float | None = None) -> None:
+        delay = backoff_delay(attempt, self.cfg, retry_after)
+        logger.warning(
+            "LLM request failed (%s); retry %d/%d in %.2fs", reason, attempt + 1, self.cfg.max_retries, delay
+        )
+        await asyncio.sleep(delay)
+
+    async def generate(self, messages: List[Dict[str, str]], max_tokens: int = 512) -> str:
+        payload = self._payload(messages, max_tokens, stream=False)
+        httpx = self._httpx
+        async with self._semaphore:
+            for attempt in range(self.cfg.max_retries + 1):
+                await self._bucket.acquire()
+                last = attempt == self.cfg.max_retries
+                try:
+                    resp = await self._client.post("/chat/completions", json=payload)
+                except httpx.TransportError as e:
+                    if last:
+                        raise LLMRequestError(f"LLM request failed: {e!r}") from e
+                    await self._retry_wait(attempt, repr(e))
+                    continue
+                if resp.status_code in RETRY_STATUS and not last:
+                    await self._retry_wait(attempt, f"HTTP {resp.status_code}", _retry_after(resp.headers))
+                    continue
+                if resp.status_code >= 400:
+                    raise LLMRequestError(
+                        f"LLM request failed with HTTP {resp.status_code}: {resp.text[:200]}",
+                        status=resp.status_code,
+                    )
+                return resp.json()["choices"][0]["message"]["content"] or ""
+        raise AssertionError("unreachable")
+
+    async def generate_stream(self, messages: List[Dict[str, str]], max_tokens: int = 512) -> AsyncIterator[str]:
+        """
+        Server-sent events from `stream: true`. Retries only happen before
+        the first delta has been yielded; a stream broken later raises.
+        """
+        payload = self._payload(messages, max_tokens, stream=True)
+        httpx = self._httpx
+        yielded = False
+        async with self._semaphore:
+            for attempt in range(self.cfg.max_retries + 1):
+                await self._bucket.acquire()
+                last = attempt == self.cfg.max_retries
+                try:
+                    async with self._client.stream("POST", "/chat/completions", json=payload) as resp:
+                        if resp.status_code in RETRY_STATUS and not last:
+                            await resp.aread()
+                            await self._retry_wait(attempt, f"HTTP {resp.status_code}", _retry_after(resp.headers))
+                            continue
+                        if resp.status_code >= 400:
+                            body = (await resp.aread()).decode("utf-8", errors="replace")
+                            raise LLMRequestError(
+                                f"LLM request failed with HTTP {resp.status_code}: {body[:200]}",
+                                status=resp.status_code,
+                            )
+                        async for line in resp.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data == "[DONE]":
+                                return
+                            choices = json.loads(data).get("choices") or []
+                            delta = choices[0].get("delta", {}).get("content") if choices else None
+                            if delta:
+                                yielded = True
+                                yield delta
+                        return
+                except httpx.TransportError as e:
+                    if last or yielded:
+                        raise LLMRequestError(f"LLM request failed: {e!r}") from e
+                    await self._retry_wait(attempt, repr(e))
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+# ----- sync bridge -----
+
+
+class _LoopThread:
+    """An event loop running forever in a daemon thread."""
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-client-loop", daemon=True)
+        self.thread.start()
+
+    def run(self, coro: Any) -> Any:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def stop(self) -> None:
+        """Stop the loop, wait for its thread to exit and close it."""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+_DONE = object()
+
+
+class SyncLLMClient(BaseLLMClient):
+    """
+    BaseLLMClient facade over an AsyncBaseLLMClient.
+
+    All calls run on one background event loop, so every Streamlit session
+    shares the async client's connection pool, semaphore and rate limiter.
+    Errors propagate (RAGChain falls back to the retrieved passages).
+    """
+
+    def __init__(self, factory: Callable[[], AsyncBaseLLMClient]):
+        self._runner = _LoopThread()
+        try:
+            # Create the client on the loop it will live on.
+            self.client = self._runner.run(self._create(factory))
+        except BaseException:
+            self._runner.stop()
+            raise
+        # Identify the model behind the facade (RAGChain's answer cache namespace).
+        self.model_name: str = getattr(self.client, "model_name", "")
+        self.base_url: str = getattr(self.client, "base_url", "")
+
+    @staticmethod
+    async def _create(factory: Callable[[], AsyncBaseLLMClient]) -> AsyncBaseLLMClient:
+        return factory()
+
+    def generate(self, messages: List[Dict[str, str]], max_tokens: int = 512) -> str:
+        return self._runner.run(self.client.generate(messages, max_tokens=max_tokens))
+
+    def generate_stream(self, messages: List[Dict[str, str]], max_tokens: int = 512) -> Iterator[str]:
+        deltas: queue.Queue = queue.Queue()
+
+        async def pump() -> None:
+            try:
+                async for delta in self.client.generate_stream(messages, max_tokens=max_tokens):
+                    deltas.put(delta)
+            except BaseException as e:  # re-raised in the consuming thread
+                deltas.put(e)
+            finally:
+                deltas.put(_DONE)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._runner.loop)
+        try:
+            while True:
+                item = deltas.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            future.cancel()  # consumer stopped early: stop reading the response
+
+    def close(self) -> None:
+        if self._runner.loop.is_closed():
+            return
+        try:
+            self._runner.run(self.client.aclose())
+        finally:
+            self._runner.stop()
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 import csv
 import logging
-from dataclasses import dataclass, asdict
+import sqlite3
+import threading
+from dataclasses import dataclass, asdict, fields
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict
+from typing import Any, Dict, IO, Iterable, Iterator, List
 
 logger = logging.getLogger(__name__)
 
@@ -21,25 +23,109 @@ class Lead:
     conversation_summary: str
 
 
+# Column order of the table and of CSV exports / imports (the original leads.csv format).
+LEAD_FIELDS = [f.name for f in fields(Lead)]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    source TEXT NOT NULL,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    interest TEXT NOT NULL,
+    conversation_summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leads_timestamp ON leads (timestamp);
+CREATE INDEX IF NOT EXISTS leads_email ON leads (email);
+CREATE INDEX IF NOT EXISTS leads_interest ON leads (interest);
+
+-- Row count kept by triggers so count() never scans the table.
+CREATE TABLE IF NOT EXISTS lead_stats (id INTEGER PRIMARY KEY CHECK (id = 1), n INTEGER NOT NULL);
+INSERT OR IGNORE INTO lead_stats (id, n) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS leads_count_insert AFTER INSERT ON leads
+BEGIN UPDATE lead_stats SET n = n + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS leads_count_delete AFTER DELETE ON leads
+BEGIN UPDATE lead_stats SET n = n - 1 WHERE id = 1; END;
+
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+_INSERT = f"INSERT INTO leads ({', '.join(LEAD_FIELDS)}) VALUES ({', '.join('?' for _ in LEAD_FIELDS)})"
+
+
+def _row(lead: Lead | Dict[str, Any]) -> tuple:
+    data = asdict(lead) if isinstance(lead, Lead) else lead
+    return tuple(str(data.get(name) or "") for name in LEAD_FIELDS)
+
+
+def _csv_batches(csv_path: Path, batch_size: int) -> Iterator[List[Dict[str, str]]]:
+    """Rows of a leads.csv-format file, `batch_size` at a time."""
+    batch: List[Dict[str, str]] = []
+    with csv_path.open("r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
 class LeadStore:
     """
-    Simple CSV-backed lead store.
-    Designed so it can be swapped for Google Sheets / Airtable later.
+    SQLite-backed lead store (WAL, so several worker processes can append
+    while others read).
+
+    - `append_lead` / `append_leads` insert one row or a batch in one transaction
+    - `count()` is O(1) (trigger-maintained counter)
+    - `query()` pages through leads newest first, optionally filtered by
+      email / interest / time range (all indexed)
+    - `export_csv` / `import_csv` stream the original leads.csv format
+
+    A `legacy_csv` from the CSV-based store is imported on every open until
+    the import is recorded in the `meta` table; the check, the import and
+    the record are one IMMEDIATE transaction, so it happens exactly once.
     """
 
-    def __init__(self, csv_path: Path):
-        self.csv_path = csv_path
-        self._ensure_file()
+    def __init__(self, db_path: Path, legacy_csv: Path | None = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+        if legacy_csv is not None:
+            self._migrate_csv(Path(legacy_csv))
 
-    def _ensure_file(self) -> None:
-        if not self.csv_path.exists():
-            logger.info("Creating leads CSV at %s", self.csv_path)
-            self.csv_path.parent.mkdir(parents=True, exist_ok=True)
-            with self.csv_path.open("w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(
-                    ["timestamp", "source", "name", "email", "phone", "interest", "conversation_summary"]
-                )
+    def _migrate_csv(self, csv_path: Path) -> None:
+        """
+        Import the legacy CSV once. The flag check, the import and the flag
+        are one IMMEDIATE transaction: a worker starting at the same time
+        waits for it and then sees the flag, so no lead is imported twice.
+        """
+        if not csv_path.exists():
+            return
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                done = self._db.execute("SELECT value FROM meta WHERE key = 'legacy_csv'").fetchone()
+                n = 0
+                if done is None:
+                    for rows in _csv_batches(csv_path, 1000):
+                        self._db.executemany(_INSERT, [_row(row) for row in rows])
+                        n += len(rows)
+                    self._db.execute("INSERT INTO meta (key, value) VALUES ('legacy_csv', ?)", (str(csv_path),))
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        if done is None:
+            logger.info("Migrated %d leads from %s into %s", n, csv_path, self.db_path)
+
+    # ----- writes -----
 
     def append_lead(
         self,
@@ -59,25 +145,100 @@ class LeadStore:
             interest=interest,
             conversation_summary=conversation_summary,
         )
-        with self.csv_path.open("a", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(
-                [
-                    lead.timestamp,
-                    lead.source,
-                    lead.name,
-                    lead.email,
-                    lead.phone,
-                    lead.interest,
-                    lead.conversation_summary,
-                ]
-            )
+        with self._lock:
+            self._db.execute(_INSERT, _row(lead))
+            self._db.commit()
         logger.info("Lead appended: %s", lead)
         return lead
 
+    def append_leads(self, leads: Iterable[Lead | Dict[str, Any]]) -> int:
+        """Insert many leads (Lead objects or dicts with LEAD_FIELDS keys) in one transaction."""
+        rows = [_row(lead) for lead in leads]
+        if not rows:
+            return 0
+        with self._lock:
+            with self._db:
+                self._db.executemany(_INSERT, rows)
+        return len(rows)
+
+    # ----- reads -----
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT n FROM lead_stats WHERE id = 1").fetchone()[0])
+
+    def query(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        email: str | None = None,
+        interest: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> List[Dict[str, str]]:
+        """
+        One page of leads, newest first. `since` / `until` are ISO timestamps
+        (inclusive / exclusive); `email` and `interest` match exactly.
+        """
+        where: List[str] = []
+        params: List[Any] = []
+        for column, value in (("email", email), ("interest", interest)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("timestamp < ?")
+            params.append(until)
+        sql = f"SELECT {', '.join(LEAD_FIELDS)} FROM leads"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        params += [max(0, limit), max(0, offset)]
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [dict(zip(LEAD_FIELDS, row)) for row in rows]
+
+    def iter_leads(self, batch_size: int = 1000) -> Iterator[Dict[str, str]]:
+        """All leads in insertion order, fetched `batch_size` rows at a time."""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    f"SELECT id, {', '.join(LEAD_FIELDS)} FROM leads WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(zip(LEAD_FIELDS, row[1:]))
+            last_id = rows[-1][0]
+
     def load_leads(self) -> List[Dict[str, str]]:
-        if not self.csv_path.exists():
-            return []
-        with self.csv_path.open("r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            return list(reader)
+        """Every lead, oldest first. Prefer `count()` / `query()` for large stores."""
+        return list(self.iter_leads())
+
+    # ----- CSV -----
+
+    def export_csv(self, out: Path | IO[str]) -> int:
+        """Stream all leads to a CSV path or text file object; returns the row count."""
+        if isinstance(out, (str, Path)):
+            with Path(out).open("w", newline="", encoding="utf-8") as f:
+                return self.export_csv(f)
+        writer = csv.DictWriter(out, fieldnames=LEAD_FIELDS)
+        writer.writeheader()
+        n = 0
+        for lead in self.iter_leads():
+            writer.writerow(lead)
+            n += 1
+        return n
+
+    def import_csv(self, csv_path: Path, batch_size: int = 1000) -> int:
+        """Append leads from a CSV in the leads.csv format, `batch_size` rows per transaction."""
+        return sum(self.append_leads(rows) for rows in _csv_batches(Path(csv_path), batch_size))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -2,13 +2,16 @@ from __future__ import annotations
 
 import logging
 import os
+import re
 from abc import ABC, abstractmethod
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 
 from app.config import LLMConfig
 
 logger = logging.getLogger(__name__)
 
+LLM_ERROR_MESSAGE = "There was an error contacting the language model. Please try again later."
+
 
 class BaseLLMClient(ABC):
     """Abstract interface for any chat-completion style LLM."""
@@ -17,6 +20,14 @@ class BaseLLMClient(ABC):
     def generate(self, messages: List[Dict[str, str]], max_tokens: int = 512) -> str:
         raise NotImplementedError
 
+    def generate_stream(self, messages: List[Dict[str, str]], max_tokens: int = 512) -> Iterator[str]:
+        """
+        Yield the answer as text deltas as soon as they are produced.
+
+        Clients without native streaming yield the finished answer once.
+        """
+        yield self.generate(messages, max_tokens=max_tokens)
+
 
 class DummyLLMClient(BaseLLMClient):
     """
@@ -32,6 +43,11 @@ class DummyLLMClient(BaseLLMClient):
         )
         return f"{system_hint}\n\nYou asked: {user_msg}\n\nPlease configure a real LLM (e.g. OpenAI) to get smarter, natural answers."
 
+    def generate_stream(self, messages: List[Dict[str, str]], max_tokens: int = 512) -> Iterator[str]:
+        # Word by word, so the streaming UI path can be exercised without a provider.
+        for match in re.finditer(r"\s*\S+", self.generate(messages, max_tokens=max_tokens)):
+            yield match.group(0)
+
 
 class OpenAIChatClient(BaseLLMClient):
     """
@@ -64,7 +80,27 @@ class OpenAIChatClient(BaseLLMClient):
             return completion.choices[0].message.content or ""
         except Exception as e:
             logger.error("OpenAIChatClient error: %s", e, exc_info=True)
-            return "There was an error contacting the language model. Please try again later."
+            return LLM_ERROR_MESSAGE
+
+    def generate_stream(self, messages: List[Dict[str, str]], max_tokens: int = 512) -> Iterator[str]:
+        streamed = False
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    streamed = True
+                    yield delta
+        except Exception as e:
+            logger.error("OpenAIChatClient streaming error: %s", e, exc_info=True)
+            yield ("\n\n" if streamed else "") + LLM_ERROR_MESSAGE
 
 
 def get_llm_client(cfg: LLMConfig) -> Tuple[BaseLLMClient, str]:
@@ -74,6 +110,15 @@ def get_llm_client(cfg: LLMConfig) -> Tuple[BaseLLMClient, str]:
     provider = (cfg.provider or "").lower()
 
     if provider == "openai" and cfg.api_key:
+        if cfg.async_client:
+            from services.async_llm_client import AsyncOpenAIClient, SyncLLMClient
+
+            try:
+                client = SyncLLMClient(lambda: AsyncOpenAIClient(cfg))
+                logger.info("Initialized pooled async OpenAI client with model %s", cfg.model_name)
+                return client, f"OpenAI · {cfg.model_name}"
+            except RuntimeError as e:
+                logger.warning("Async LLM client unavailable (%s); using OpenAIChatClient.", e)
         logger.info("Initializing OpenAIChatClient with model %s", cfg.model_name)
         client = OpenAIChatClient(model_name=cfg.model_name, api_key=cfg.api_key)
         return client, f"OpenAI · {cfg.model_name}"
@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from app.config import PathsConfig, SessionConfig
+from rag_pipeline.agent import LeadState
+
+logger = logging.getLogger(__name__)
+
+# ----- serialization -----
+
+# First byte of every blob: the encoding of the rest.
+_PLAIN = b"j"  # compact JSON
+_ZLIB = b"z"  # zlib-compressed compact JSON
+COMPRESS_MIN_BYTES = 512  # below this zlib's header outweighs the savings
+
+_ROLE_CODES = {"user": "u", "assistant": "a", "system": "s"}
+_ROLE_NAMES = {code: role for role, code in _ROLE_CODES.items()}
+
+
+@dataclass
+class SessionState:
+    """Everything a chat session needs across reruns, workers and restarts."""
+
+    lead: LeadState = field(default_factory=LeadState)
+    chat_history: List[Dict[str, str]] = field(default_factory=list)
+    questions_count: int = 0
+
+
+def dumps_state(state: SessionState, max_history: int = 0) -> bytes:
+    """
+    Encode a session as compact JSON: positional lead fields, one-letter
+    role codes, no whitespace; zlib-compressed once it is big enough to pay
+    off. `max_history` > 0 keeps only the most recent chat messages.
+    """
+    history = state.chat_history[-max_history:] if max_history > 0 else state.chat_history
+    lead = state.lead
+    payload = {
+        "l": [lead.name, lead.email, lead.phone, lead.interest],
+        "h": [[_ROLE_CODES.get(m["role"], m["role"]), m["content"]] for m in history],
+        "q": state.questions_count,
+    }
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        return _ZLIB + zlib.compress(raw, 6)
+    return _PLAIN + raw
+
+
+def loads_state(blob: bytes) -> SessionState:
+    kind, body = blob[:1], blob[1:]
+    if kind == _ZLIB:
+        body = zlib.decompress(body)
+    elif kind != _PLAIN:
+        raise ValueError(f"Unknown session encoding {kind!r}")
+    payload = json.loads(body.decode("utf-8"))
+    return SessionState(
+        lead=LeadState(*payload["l"]),
+        chat_history=[{"role": _ROLE_NAMES.get(role, role), "content": content} for role, content in payload["h"]],
+        questions_count=int(payload.get("q", 0)),
+    )
+
+
+# ----- backends -----
+
+
+class SessionStore(ABC):
+    """
+    Conversation state keyed by session id.
+
+    States are stored serialized, so callers always get their own copy and
+    any worker process sharing the backend sees the same session. Every
+    `put` pushes the expiry `ttl_s` seconds out; sessions that are not
+    written for that long are dropped (ttl_s <= 0 keeps them forever).
+    """
+
+    def __init__(self, ttl_s: float = 86_400.0, max_history: int = 0):
+        self.ttl_s = ttl_s
+        self.max_history = max_history
+
+    def _expires(self, now: float) -> float:
+        return now + self.ttl_s if self.ttl_s > 0 else float("inf")
+
+    def get(self, session_id: str) -> SessionState | None:
+        blob = self._get(session_id)
+        if blob is None:
+            return None
+        try:
+            return loads_state(blob)
+        except (ValueError, KeyError, TypeError, zlib.error) as e:
+            logger.warning("Discarding unreadable session %s: %s", session_id, e)
+            self.delete(session_id)
+            return None
+
+    def put(self, session_id: str, state: SessionState) -> None:
+        self._put(session_id, dumps_state(state, self.max_history))
+
+    @abstractmethod
+    def _get(self, session_id: str) -> bytes | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _put(self, session_id: str, blob: bytes) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Drop expired sessions now; returns how many were removed."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """Per-process store; sessions are lost on restart and not shared between workers."""
+
+    def __init__(self, ttl_s: float = 86_400.0, max_history: int = 0):
+        super().__init__(ttl_s, max_history)
+        self._lock = threading.Lock()
+        self._data: Dict[str, Tuple[float, bytes]] = {}
+
+    def _get(self, session_id: str) -> bytes | None:
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._data[session_id]
+                return None
+            return entry[1]
+
+    def _put(self, session_id: str, blob: bytes) -> None:
+        with self._lock:
+            self._data[session_id] = (self._expires(time.time()), blob)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (expires, _) in self._data.items() if expires <= now]
+            for sid in expired:
+                del self._data[sid]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a SQLite file (WAL), shared by every worker process on the
+    host. Expired rows are swept at most once per `sweep_interval_s`.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        ttl_s: float = 86_400.0,
+        max_history: int = 0,
+        sweep_interval_s: float = 300.0,
+    ):
+        super().__init__(ttl_s, max_history)
+        self.db_path = Path(db_path)
+        self.sweep_interval_s = sweep_interval_s
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, state BLOB NOT NULL, expires REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+        self._db.commit()
+
+    def _get(self, session_id: str) -> bytes | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state FROM sessions WHERE id = ? AND expires > ?", (session_id, time.time())
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def _put(self, session_id: str, blob: bytes) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO sessions (id, state, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET state = excluded.state, expires = excluded.expires",
+                (session_id, blob, self._expires(now)),
+            )
+            self._db.commit()
+        if now - self._last_sweep >= self.sweep_interval_s:
+            self.purge_expired()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._db.commit()
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            self._last_sweep = now
+            cur = self._db.execute("DELETE FROM sessions WHERE expires <= ?", (now,))
+            self._db.commit()
+        return cur.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions WHERE expires > ?", (time.time(),)).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions in Redis or any server speaking its protocol (Valkey, KeyDB,
+    Dragonfly, a local redis-server), shared by workers on any host.
+    Expiry uses native key TTLs, so `purge_expired` has nothing to do.
+
+    Uses the `redis` client from requirements.txt and a running server at
+    `url` (locally: `redis-server`, or `docker run -d -p 6379:6379 redis:7`),
+    unless a client object with `get` / `set(name, value, ex=...)` /
+    `delete` is passed in.
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        ttl_s: float = 86_400.0,
+        max_history: int = 0,
+        prefix: str = "copilot:session:",
+        client: Any | None = None,
+    ):
+        super().__init__(ttl_s, max_history)
+        self.prefix = prefix
+        if client is None:
+            try:
+                import redis  # type: ignore
+            except ImportError as exc:
+                raise RuntimeError("redis is not installed. Run `pip install redis`.") from exc
+            client = redis.Redis.from_url(url)
+        self._client = client
+
+    def _key(self, session_id: str) -> str:
+        return self.prefix + session_id
+
+    def _get(self, session_id: str) -> bytes | None:
+        return self._client.get(self._key(session_id))
+
+    def _put(self, session_id: str, blob: bytes) -> None:
+        ex = max(1, int(self.ttl_s)) if self.ttl_s > 0 else None
+        self._client.set(self._key(session_id), blob, ex=ex)
+
+    def delete(self, session_id: str) -> None:
+        self._client.delete(self._key(session_id))
+
+    def purge_expired(self) -> int:
+        return 0
+
+    def close(self) -> None:
+        close = getattr(self._client, "close", None)
+        if close is not None:
+            close()
+
+
+def create_session_store(paths: PathsConfig, cfg: SessionConfig) -> SessionStore:
+    """Build the backend named by `cfg.backend` ("memory", "sqlite" or "redis")."""
+    backend = cfg.backend.lower()
+    if backend == "memory":
+        return InMemorySessionStore(cfg.ttl_s, cfg.max_history_messages)
+    if backend == "sqlite":
+        return SQLiteSessionStore(paths.sessions_db, cfg.ttl_s, cfg.max_history_messages)
+    if backend == "redis":
+        return RedisSessionStore(cfg.redis_url, cfg.ttl_s, cfg.max_history_messages)
+    raise ValueError(f"Unknown session backend '{cfg.backend}'")
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterator, List
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Prometheus histogram bucket bounds, in seconds.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RESERVOIR = 2048  # recent samples kept per stage for p50 / p95 / p99
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    pos = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[pos]
+
+
+class Histogram:
+    """Cumulative Prometheus buckets plus a reservoir of recent samples for quantiles."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last one is +Inf
+        self.recent: Deque[float] = deque(maxlen=RESERVOIR)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.recent.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        """count, mean and p50 / p95 / p99 in milliseconds."""
+        values = sorted(self.recent)
+        return {
+            "count": self.count,
+            "mean_ms": 1000 * self.total / self.count if self.count else 0.0,
+            "p50_ms": 1000 * _quantile(values, 0.50),
+            "p95_ms": 1000 * _quantile(values, 0.95),
+            "p99_ms": 1000 * _quantile(values, 0.99),
+        }
+
+
+@dataclass
+class Span:
+    name: str
+    start_ms: float  # offset from the start of the trace
+    duration_ms: float
+
+
+@dataclass
+class Trace:
+    """All spans recorded while one chat turn (or ingestion run) was active."""
+
+    name: str
+    started: float = field(default_factory=time.perf_counter)
+    timestamp: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    spans: List[Span] = field(default_factory=list)
+    total_ms: float = 0.0
+    values: Dict[str, float] = field(default_factory=dict)  # non-latency data, e.g. prompt tokens
+
+    def add(self, name: str, start: float, seconds: float) -> None:
+        self.spans.append(Span(name, 1000 * (start - self.started), 1000 * seconds))
+
+    def stage_totals(self) -> Dict[str, float]:
+        """Milliseconds per stage name (spans of the same stage are summed)."""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span.name] = totals.get(span.name, 0.0) + span.duration_ms
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "total_ms": self.total_ms,
+            "spans": [span.__dict__ for span in self.spans],
+            "values": dict(self.values),
+        }
+
+
+_CURRENT_TRACE: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("current_trace", default=None)
+
+
+class Tracer:
+    """
+    Lightweight in-process tracing: spans, latency histograms and counters.
+
+    - `span("embed")` times a block, feeds the `rag_stage_seconds` histogram
+      and, inside `trace(...)`, is attached to the current trace.
+    - `trace("chat_turn")` collects the spans of one turn; finished traces
+      are appended to `jsonl_path` if set.
+    - `prometheus_text()` renders everything in the Prometheus text format;
+      `serve_prometheus(port)` exposes it on http://localhost:<port>/metrics.
+    """
+
+    def __init__(self, jsonl_path: Path | None = None, enabled: bool = True):
+        self.jsonl_path = jsonl_path
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, float] = {}
+        self._server: ThreadingHTTPServer | None = None
+
+    # ----- recording -----
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            hist = self._histograms.get(stage)
+            if hist is None:
+                hist = self._histograms[stage] = Histogram()
+            hist.observe(seconds)
+
+    def incr(self, counter: str, value: float = 1.0) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0.0) + value
+
+    def annotate(self, name: str, value: float) -> None:
+        """Add `value` to `name` on the current trace (sizes, counts; not latencies)."""
+        if not self.enabled:
+            return
+        trace = _CURRENT_TRACE.get()
+        if trace is not None:
+            trace.values[name] = trace.values.get(name, 0.0) + value
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe(stage, seconds)
+            trace = _CURRENT_TRACE.get()
+            if trace is not None:
+                trace.add(stage, start, seconds)
+
+    @contextmanager
+    def trace(self, name: str) -> Iterator[Trace]:
+        trace = Trace(name)
+        token = _CURRENT_TRACE.set(trace)
+        try:
+            yield trace
+        finally:
+            _CURRENT_TRACE.reset(token)
+            trace.total_ms = 1000 * (time.perf_counter() - trace.started)
+            if self.enabled:
+                self.observe(name, trace.total_ms / 1000)
+                self._export(trace)
+
+    def _export(self, trace: Trace) -> None:
+        if self.jsonl_path is None:
+            return
+        line = json.dumps(trace.to_dict())
+        with self._lock:
+            with Path(self.jsonl_path).open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    # ----- reading -----
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage count / mean / p50 / p95 / p99 (ms)."""
+        with self._lock:
+            return {stage: hist.summary() for stage, hist in sorted(self._histograms.items())}
+
+    def counters(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP rag_stage_seconds Latency of RAG pipeline stages.",
+            "# TYPE rag_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, hist in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, n in zip(list(BUCKETS) + ["+Inf"], hist.buckets):
+                    cumulative += n
+                    lines.append(f'rag_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'rag_stage_seconds_sum{{stage="{stage}"}} {hist.total}')
+                lines.append(f'rag_stage_seconds_count{{stage="{stage}"}} {hist.count}')
+            for counter, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE {counter} counter")
+                lines.append(f"{counter} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port: int, host: str = "127.0.0.1") -> None:
+        """Start a background /metrics endpoint (once per tracer)."""
+        if self._server is not None:
+            return
+        # Imported here: http.server is only needed when metrics are exposed.
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            # Another Streamlit worker may already serve this port.
+            logger.warning("Prometheus endpoint not started on %s:%d: %s", host, port, e)
+            return
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        logger.info("Prometheus metrics on http://%s:%d/metrics", host, port)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+_TRACER = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer."""
+    return _TRACER
+
+
+def configure_tracer(jsonl_path: Path | None = None, prometheus_port: int = 0, enabled: bool = True) -> Tracer:
+    tracer = get_tracer()
+    tracer.enabled = enabled
+    tracer.jsonl_path = jsonl_path
+    if enabled and prometheus_port:
+        tracer.serve_prometheus(prometheus_port)
+    return tracer
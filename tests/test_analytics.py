@@ -0,0 +1,51 @@
+# tests/test_analytics.py
+import time
+from pathlib import Path
+
+from services.analytics import AnalyticsStore
+
+
+def _add(store: AnalyticsStore, intent: str, niche: str = "Gyms") -> None:
+    store.add_record("q", "a", intent, ["c1"], trace={"total": 12.5}, niche=niche)
+
+
+def test_counters_and_rollups_persist_across_instances(tmp_path: Path):
+    store = AnalyticsStore(tmp_path / "analytics.sqlite")
+    for intent in ["sales", "sales", "support"]:
+        _add(store, intent)
+    _add(store, "sales", niche="Clinics")
+    store.close()
+
+    store = AnalyticsStore(tmp_path / "analytics.sqlite")
+    assert store.get_intent_counts() == {"sales": 3, "support": 1}
+    assert store.get_intent_counts(niche="Clinics") == {"sales": 1}
+    assert store.get_niche_counts() == {"Clinics": 1, "Gyms": 3}
+    assert store.total() == 4
+    for granularity in ("minute", "hour", "day"):
+        assert sum(n for _, n in store.timeseries(granularity)) == 4
+    assert sum(n for _, n in store.timeseries("hour", intent="support")) == 1
+    assert store.last_record().trace == {"total": 12.5}
+
+
+def test_old_minute_buckets_are_pruned_but_daily_ones_kept():
+    store = AnalyticsStore()
+    _add(store, "general")
+    assert store.prune_rollups(now=time.time() + 3 * 86_400) == 1
+    assert store.timeseries("minute") == []
+    assert len(store.timeseries("day")) == 1
+    assert store.get_intent_counts() == {"general": 1}
+
+
+def test_timeseries_since_includes_the_bucket_containing_it(monkeypatch):
+    hour = 3600 * 480_000
+    store = AnalyticsStore()
+    monkeypatch.setattr("services.analytics.time.time", lambda: hour - 600)  # previous hour
+    _add(store, "sales")
+    monkeypatch.setattr("services.analytics.time.time", lambda: hour + 1800)  # mid-hour
+    _add(store, "sales")
+    _add(store, "support")
+
+    since = hour + 1200  # not on a bucket boundary
+    assert [n for _, n in store.timeseries("hour", since=since)] == [2]
+    assert [n for _, n in store.timeseries("minute", since=since)] == [2]
+    assert [n for _, n in store.timeseries("hour", since=hour - 1)] == [1, 2]
@@ -0,0 +1,58 @@
+# tests/test_answer_cache.py
+import time
+from pathlib import Path
+
+import numpy as np
+
+from rag_pipeline.answer_cache import AnswerCache
+
+
+def _vec(*values):
+    return np.array(values, dtype="float32")
+
+
+def test_similar_question_with_same_chunks_hits(tmp_path: Path):
+    cache = AnswerCache(tmp_path / "a.sqlite", space="m", dim=3, threshold=0.9)
+    cache.put(_vec(1, 0, 0), ["b", "a"], "rev1", "Gold is $49.")
+
+    assert cache.get(_vec(0.98, 0.1, 0), ["a", "b"], "rev1") == "Gold is $49."
+    assert cache.get(_vec(0, 1, 0), ["a", "b"], "rev1") is None  # different question
+    assert cache.get(_vec(1, 0, 0), ["a"], "rev1") is None  # different chunks
+    assert cache.get(_vec(1, 0, 0), ["a", "b"], "rev2") is None  # index changed
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+
+def test_entries_persist_expire_and_evict_lru(tmp_path: Path):
+    db = tmp_path / "a.sqlite"
+    cache = AnswerCache(db, space="m", dim=2, max_entries=2)
+    cache.put(_vec(1, 0), ["a"], "r", "A")
+    cache.put(_vec(0, 1), ["b"], "r", "B")
+    cache.get(_vec(1, 0), ["a"], "r")  # "A" is now the most recently used
+    cache.put(_vec(1, 1), ["c"], "r", "C")  # evicts "B"
+
+    reopened = AnswerCache(db, space="m", dim=2, max_entries=2)
+    assert len(reopened) == 2
+    assert reopened.get(_vec(1, 0), ["a"], "r") == "A"
+    assert reopened.get(_vec(0, 1), ["b"], "r") is None
+
+    expired = AnswerCache(tmp_path / "b.sqlite", space="m", dim=2, ttl_s=0.001)
+    expired.put(_vec(1, 0), ["a"], "r", "A")
+    time.sleep(0.01)
+    assert expired.get(_vec(1, 0), ["a"], "r") is None
+
+
+def test_codes_are_freed_and_shared_table_stays_bounded(tmp_path: Path):
+    db = tmp_path / "a.sqlite"
+    cache = AnswerCache(db, space="m", dim=2, max_entries=2)
+    for i in range(20):  # a new index revision per answer
+        cache.put(_vec(1, i), ["a"], f"rev{i}", f"A{i}")
+    assert len(cache._codes) == len(cache._code_refs) == 2
+    assert cache.get(_vec(1, 19), ["a"], "rev19") == "A19"
+
+    # A second worker on the same database: the table holds `max_entries` rows, not 2x.
+    other = AnswerCache(db, space="m", dim=2, max_entries=2)
+    other.put(_vec(0, 1), ["b"], "r", "B")
+    other.put(_vec(1, 1), ["c"], "r", "C")
+    cache.put(_vec(1, 0), ["d"], "r", "D")
+    (rows,) = cache._db.execute("SELECT COUNT(*) FROM answers WHERE space = 'm'").fetchone()
+    assert rows == 2
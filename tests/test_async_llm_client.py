@@ -0,0 +1,184 @@
+# tests/test_async_llm_client.py
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.config import LLMConfig
+from services.async_llm_client import LLMRequestError, TokenBucket, backoff_delay
+
+
+def test_token_bucket_allows_burst_then_paces():
+    now = [0.0]
+    bucket = TokenBucket(rate=2.0, capacity=3, clock=lambda: now[0])
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    now[0] += 0.5
+    assert bucket.try_acquire() == 0.0
+
+
+def test_backoff_is_jittered_exponential_and_capped():
+    cfg = LLMConfig(backoff_base_s=1.0, backoff_max_s=4.0)
+    for attempt, cap in [(0, 1.0), (1, 2.0), (5, 4.0)]:
+        delay = backoff_delay(attempt, cfg)
+        assert cap / 2 <= delay <= cap
+    assert backoff_delay(0, cfg, retry_after=3.0) == 3.0
+
+
+class _MockServer:
+    """OpenAI-compatible /chat/completions that fails `fail_first` times with 429."""
+
+    def __init__(self, fail_first: int = 0, delay_s: float = 0.0):
+        self.fail_first = fail_first
+        self.delay_s = delay_s
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json"):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with server.lock:
+                    server.requests += 1
+                    attempt = server.requests
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    time.sleep(server.delay_s)
+                    if attempt <= server.fail_first:
+                        self._send(429, '{"error": "rate limited"}')
+                    elif payload.get("stream"):
+                        events = [
+                            {"choices": [{"delta": {"content": word}}]} for word in ("Hello", " there")
+                        ]
+                        body = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+                        self._send(200, body, "text/event-stream")
+                    else:
+                        self._send(200, json.dumps({"choices": [{"message": {"content": "Hello there"}}]}))
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _cfg(url: str, **overrides) -> LLMConfig:
+    values = dict(
+        api_key="test", base_url=url, backoff_base_s=0.01, backoff_max_s=0.05, rate_limit_rps=0.0
+    )
+    values.update(overrides)
+    return LLMConfig(**values)
+
+
+def test_retries_on_429_then_succeeds():
+    pytest.importorskip("httpx")
+    from services.async_llm_client import AsyncOpenAIClient
+
+    server = _MockServer(fail_first=2)
+
+    async def run():
+        client = AsyncOpenAIClient(_cfg(server.url, max_retries=3))
+        try:
+            return await client.generate([{"role": "user", "content": "hi"}])
+        finally:
+            await client.aclose()
+
+    try:
+        assert asyncio.run(run()) == "Hello there"
+        assert server.requests == 3
+    finally:
+        server.close()
+
+
+def test_gives_up_after_max_retries():
+    pytest.importorskip("httpx")
+    from services.async_llm_client import AsyncOpenAIClient
+
+    server = _MockServer(fail_first=10)
+
+    async def run():
+        client = AsyncOpenAIClient(_cfg(server.url, max_retries=1))
+        try:
+            await client.generate([{"role": "user", "content": "hi"}])
+        finally:
+            await client.aclose()
+
+    try:
+        with pytest.raises(LLMRequestError) as exc:
+            asyncio.run(run())
+        assert exc.value.status == 429
+        assert server.requests == 2
+    finally:
+        server.close()
+
+
+def test_concurrency_cap_and_sync_streaming_bridge():
+    pytest.importorskip("httpx")
+    from services.async_llm_client import AsyncOpenAIClient, SyncLLMClient
+
+    server = _MockServer(delay_s=0.05)
+    cfg = _cfg(server.url, max_concurrency=2)
+
+    async def run():
+        client = AsyncOpenAIClient(cfg)
+        try:
+            messages = [{"role": "user", "content": "hi"}]
+            return await asyncio.gather(*(client.generate(messages) for _ in range(6)))
+        finally:
+            await client.aclose()
+
+    try:
+        assert asyncio.run(run()) == ["Hello there"] * 6
+        assert server.max_in_flight <= 2
+
+        sync_client = SyncLLMClient(lambda: AsyncOpenAIClient(cfg))
+        deltas = list(sync_client.generate_stream([{"role": "user", "content": "hi"}]))
+        assert deltas == ["Hello", " there"]
+        sync_client.close()
+    finally:
+        server.close()
+
+
+def test_sync_client_close_stops_the_loop_thread():
+    from services.async_llm_client import AsyncBaseLLMClient, SyncLLMClient
+
+    class _Echo(AsyncBaseLLMClient):
+        closed = False
+
+        async def generate(self, messages, max_tokens=512):
+            return messages[-1]["content"]
+
+        async def aclose(self):
+            self.closed = True
+
+    sync_client = SyncLLMClient(_Echo)
+    assert sync_client.generate([{"role": "user", "content": "hi"}]) == "hi"
+    thread = sync_client._runner.thread
+    sync_client.close()
+    assert sync_client.client.closed
+    assert not thread.is_alive() and sync_client._runner.loop.is_closed()
+    sync_client.close()  # idempotent
@@ -0,0 +1,27 @@
+# tests/test_benchmarks.py
+from pathlib import Path
+
+from benchmarks.corpus import make_corpus
+from benchmarks.suite import compare, import_profile
+from rag_pipeline.ingestion import parse_file
+
+
+def test_synthetic_corpus_covers_all_formats(tmp_path: Path):
+    files = make_corpus(tmp_path, n_chunks=60)
+    assert {p.suffix for p in files} == {".txt", ".md", ".pdf"}
+    n_chunks = sum(len(parse_file(p, 1200, 250)[0]) for p in files)
+    assert 45 <= n_chunks <= 75
+
+
+def test_compare_flags_slowdowns_in_both_directions():
+    baseline = {"results": {"10": {"search_k5_p50_ms": 1.0, "search_k5_qps": 100.0, "chunks": 10}}}
+    current = {"results": {"10": {"search_k5_p50_ms": 1.5, "search_k5_qps": 95.0, "chunks": 10}}}
+    rows = {row["metric"]: row["regressed"] for row in compare(current, baseline, tolerance=0.1)}
+    assert rows == {"search_k5_p50_ms": True, "search_k5_qps": False}
+
+
+def test_app_modules_import_without_faiss_or_torch():
+    profile = import_profile()
+    assert profile["heavy_loaded"] == []
+    assert profile["total_ms"] > 0
+    assert any(row["module"] == "rag_pipeline.retrieval" for row in profile["top_level"])
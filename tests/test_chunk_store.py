@@ -0,0 +1,71 @@
+# tests/test_chunk_store.py
+from pathlib import Path
+
+import numpy as np
+
+from rag_pipeline import chunk_store
+from rag_pipeline.chunk_store import ChunkMetadata, ChunkStore, ChunkStoreWriter, write_chunk_store
+
+
+def _chunk(i: int, source: str) -> ChunkMetadata:
+    return ChunkMetadata(
+        id=f"{source}::p{i}::c0",
+        content=f"chunk {i} · café",
+        source=source,
+        page=i if i % 2 else None,
+        section="Pricing" if i == 3 else None,
+    )
+
+
+def test_round_trip_and_lookup_by_faiss_id(tmp_path: Path):
+    chunks = {vid: _chunk(vid, "a.pdf" if vid < 20 else "b.md") for vid in (3, 7, 20, 42)}
+    write_chunk_store(tmp_path, chunks)
+
+    store = ChunkStore.open(tmp_path)
+    assert len(store) == 4
+    assert store.get(42) == chunks[42]
+    assert store.get(3).section == "Pricing"
+    assert store.get(5) is None
+    assert store.positions(np.array([42, 8, 3])).tolist() == [3, -1, 0]
+    assert store.source_counts() == {"a.pdf": 2, "b.md": 2}
+
+
+def test_rewrite_drops_rows_and_keeps_one_previous_generation(tmp_path: Path):
+    write_chunk_store(tmp_path, {vid: _chunk(vid, "a.pdf") for vid in range(5)})
+    old = ChunkStore.open(tmp_path)
+
+    writer = ChunkStoreWriter(tmp_path)
+    writer.copy_from(old, ~np.isin(old.ids, [1, 2]))
+    writer.add(9, _chunk(9, "c.txt"))
+    writer.commit()
+
+    store = ChunkStore.open(tmp_path)
+    assert store.ids.tolist() == [0, 3, 4, 9]
+    assert [c.content for c in store] == [_chunk(i, "x").content for i in (0, 3, 4, 9)]
+    assert store.get(9).source == "c.txt"
+    # A reader that read the old pointer can still open the old generation;
+    # it goes with the next commit.
+    assert ChunkStore(old.root).ids.tolist() == list(range(5))
+    write_chunk_store(tmp_path, {0: _chunk(0, "a.pdf")})
+    assert not old.root.exists() and store.root.exists()
+    assert len(list(tmp_path.glob("chunks-*"))) == 2
+
+
+def test_open_rereads_a_pointer_that_moved_on(tmp_path: Path, monkeypatch):
+    write_chunk_store(tmp_path, {0: _chunk(0, "a.pdf")})
+    stale = ChunkStore.open(tmp_path).root
+    write_chunk_store(tmp_path, {1: _chunk(1, "a.pdf")})
+    current = write_chunk_store(tmp_path, {2: _chunk(2, "a.pdf")}).root
+    assert not stale.exists()
+
+    # The first read returns what a reader saw before the last two commits.
+    reads = []
+    read_pointer = chunk_store._read_pointer
+
+    def racing_read(pointer):
+        reads.append(pointer)
+        return {"dir": stale.name} if len(reads) == 1 else read_pointer(pointer)
+
+    monkeypatch.setattr(chunk_store, "_read_pointer", racing_read)
+    store = ChunkStore.open(tmp_path)
+    assert store.root == current and store.ids.tolist() == [2]
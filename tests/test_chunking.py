@@ -0,0 +1,90 @@
+# tests/test_chunking.py
+from dataclasses import replace
+from pathlib import Path
+
+from app.config import load_config
+from benchmarks.chunking import run
+from benchmarks.corpus import large_document
+from rag_pipeline.chunk_store import ChunkStore
+from rag_pipeline.chunking import chunk_structured
+from rag_pipeline.ingestion import IngestionEngine, parse_file
+
+DOC = """# Pricing
+
+The gold membership costs $49 per month. It includes 3 sessions per week. "Great value!" Students get 10% off.
+
+## Refund policy
+
+Refunds are processed within 5 days, e.g. a cancellation on Monday is refunded by Saturday.
+Contact the front desk to start a refund.
+
+Opening hours
+We open at 6am on weekdays. We close at 10pm.
+"""
+
+
+def test_chunks_follow_headings_and_carry_sections():
+    chunks, section = chunk_structured(DOC, "faq.md", None, size=120, overlap=40)
+    assert [c.section for c in chunks][0] == "Pricing"
+    assert {c.section for c in chunks} == {"Pricing", "Refund policy", "Opening hours"}
+    assert section == "Opening hours"
+    # A heading always opens a chunk, and no chunk spans two sections.
+    assert any(c.content.startswith("## Refund policy") for c in chunks)
+    for c in chunks:
+        assert c.content.count("#") <= 2
+    assert [c.id for c in chunks] == [f"faq.md::p0::c{i}" for i in range(len(chunks))]
+
+
+def test_chunks_end_on_sentences_and_overlap_whole_sentences():
+    text = large_document(20_000, wrap=90, seed=3)
+    words = set(text.split())
+    chunks, _ = chunk_structured(text, "big.md", None, size=600, overlap=150)
+    assert all(len(c.content) <= 600 for c in chunks)
+    for c in chunks:
+        assert c.content.split()[0] in words  # never starts mid-word
+        assert c.content[-1] in ".!?"  # ends a sentence (headings break on paragraphs)
+    # Neighbours in the same section share whole sentences, not fragments.
+    shared = [b for a, b in zip(chunks, chunks[1:]) if a.section == b.section and b.content[:30] in a.content]
+    assert shared
+    assert all(b.content[0].isupper() for b in shared)
+
+
+def test_abbreviations_and_long_words_do_not_break_badly():
+    chunks, _ = chunk_structured("Visit e.g. our site. " * 3 + "x" * 300, "a.txt", None, size=100, overlap=0)
+    assert "".join(c.content for c in chunks).replace(" ", "") == ("Visit e.g. our site. " * 3 + "x" * 300).replace(" ", "")
+    assert all(len(c.content) <= 100 for c in chunks)
+    assert not any(c.content.startswith("our site") for c in chunks)
+
+
+def test_section_carries_over_pdf_pages():
+    page1, section = chunk_structured("Refund policy\nRefunds take 5 days.", "a.pdf", 1, 1200, 250)
+    page2, _ = chunk_structured("Refunds to gift cards are instant.", "a.pdf", 2, 1200, 250, section)
+    assert page1[0].section == page2[0].section == "Refund policy"
+    assert page2[0].id == "a.pdf::p2::c0"
+
+
+def test_parse_file_and_manifest_use_the_configured_chunker(tmp_path: Path):
+    doc = tmp_path / "faq.md"
+    doc.write_text(DOC, encoding="utf-8")
+    assert {c.section for c in parse_file(doc, 1200, 250)[0]} == {"Pricing", "Refund policy", "Opening hours"}
+    assert {c.section for c in parse_file(doc, 1200, 250, chunker="fixed")[0]} == {None}
+
+    cfg = load_config()
+    cfg.paths.vector_store_dir = tmp_path / "vs"
+    IngestionEngine(cfg.paths, cfg.rag).ingest_files([doc])
+    assert {c.section for c in ChunkStore.open(cfg.paths.vector_store_dir)} == {"Pricing", "Refund policy", "Opening hours"}
+
+    # The file is unchanged, but the manifest records the old chunking: everything is re-chunked.
+    IngestionEngine(cfg.paths, replace(cfg.rag, chunker="fixed")).ingest_files([doc])
+    assert {c.section for c in ChunkStore.open(cfg.paths.vector_store_dir)} == {None}
+
+
+def test_chunking_benchmark_reports_both_chunkers():
+    rows = run(mb=0.05, repeat=1)
+    assert {(r["layout"], r["chunker"]) for r in rows} == {
+        (layout, chunker)
+        for layout in ("wrapped", "pdf_pages", "long_lines")
+        for chunker in ("fixed", "structure")
+    }
+    structure = [r for r in rows if r["chunker"] == "structure"]
+    assert all(r["mid_word_start"] == 0 and r["with_section"] == 1 for r in structure)
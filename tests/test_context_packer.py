@@ -0,0 +1,64 @@
+# tests/test_context_packer.py
+import random
+
+from benchmarks.corpus import paragraph
+from rag_pipeline.chunk_store import ChunkMetadata
+from rag_pipeline.context_packer import ContextPacker, TokenCounter, overlap_length
+from rag_pipeline.ingestion import chunk_text
+from rag_pipeline.retrieval import RetrievedChunk
+from services.tracing import Tracer
+
+
+def _retrieved(chunks, scores):
+    return [RetrievedChunk(metadata=c, score=s) for c, s in zip(chunks, scores)]
+
+
+def test_neighbouring_chunks_merge_without_repeating_the_overlap():
+    text = paragraph(random.Random(0), 3000)
+    chunks = chunk_text(text, "pricing.txt", None, size=1200, overlap=250)
+    assert len(chunks) >= 3
+    assert overlap_length(chunks[0].content, chunks[1].content) >= 200
+
+    packed = ContextPacker(max_tokens=10_000).pack(_retrieved(chunks[:3], [0.5, 0.9, 0.7]))
+    assert len(packed.blocks) == 1
+    block = packed.blocks[0]
+    assert block.ids == [c.id for c in chunks[:3]] and block.score == 0.9
+    assert block.content == text[: len(block.content)]
+    assert packed.deduped_chars >= 400
+
+
+def test_budget_is_filled_by_score_and_sources_are_ordered():
+    counter = TokenCounter()
+    chunks = [
+        ChunkMetadata(f"{src}::p1::c{i * 2}", f"{src} passage {i} " + "word " * 40, src, 1, None)
+        for i, src in enumerate(["b.pdf", "a.pdf", "c.pdf"])
+    ]
+    unbounded = ContextPacker(max_tokens=10_000, counter=counter).pack(_retrieved(chunks, [0.4, 0.8, 0.6]))
+    assert len(unbounded.blocks) == 3  # three sources, nothing to merge
+    packer = ContextPacker(max_tokens=unbounded.blocks[0].tokens + unbounded.blocks[1].tokens, counter=counter)
+
+    packed = packer.pack(_retrieved(chunks, [0.4, 0.8, 0.6]))
+    assert [b.source for b in packed.blocks] == ["a.pdf", "c.pdf"]
+    assert packed.sources() == ["a.pdf", "c.pdf"]
+    assert packed.dropped_ids == ["b.pdf::p1::c0"]
+    assert packed.tokens <= packer.max_tokens
+
+
+def test_oversized_top_block_is_truncated_and_prompt_tokens_are_traced(monkeypatch):
+    from rag_pipeline import rag_chain as rag_chain_module
+    from rag_pipeline.rag_chain import RAGChain
+    from services.llm_client import DummyLLMClient
+
+    big = ChunkMetadata("faq.md::p0::c0", "refund " * 500, "faq.md", None, None)
+    packer = ContextPacker(max_tokens=100)
+    packed = packer.pack(_retrieved([big], [0.9]))
+    assert packed.blocks and packed.tokens <= 100
+
+    tracer = Tracer()
+    monkeypatch.setattr(rag_chain_module, "tracer", tracer)
+    chain = RAGChain(DummyLLMClient(), None, packer=packer)
+    with tracer.trace("turn") as turn:
+        prompt = chain._build_system_prompt("refunds?", _retrieved([big], [0.9]))
+    assert turn.values["prompt_tokens"] == packer.counter.count(prompt)
+    assert turn.values["context_tokens"] == packed.tokens
+    assert tracer.counters()["rag_prompt_tokens_total"] == turn.values["prompt_tokens"]
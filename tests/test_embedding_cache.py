@@ -0,0 +1,45 @@
+# tests/test_embedding_cache.py
+from pathlib import Path
+
+import numpy as np
+
+from rag_pipeline.embedding_cache import EmbeddingCache
+
+
+def _fake_model(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), t.count("a")] for t in texts], dtype="float32")
+
+    return encode
+
+
+def test_cache_hits_skip_model_and_persist(tmp_path: Path):
+    calls = []
+    cache = EmbeddingCache(tmp_path, "m", dim=2, max_entries=8, memory_entries=2)
+
+    first = cache.get_many(["price?", "refund", "price?"], _fake_model(calls))
+    assert calls == [["price?", "refund"]]
+    assert cache.misses == 3 and cache.hits == 0
+
+    again = cache.get_many(["  price? ", "refund"], _fake_model(calls))
+    assert len(calls) == 1
+    assert cache.hits == 2
+    np.testing.assert_array_equal(again, first[:2])
+
+    reopened = EmbeddingCache(tmp_path, "m", dim=2, max_entries=8, memory_entries=2)
+    reopened.get_many(["refund"], _fake_model(calls))
+    assert len(calls) == 1 and reopened.hits == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path):
+    calls = []
+    cache = EmbeddingCache(tmp_path, "m", dim=2, max_entries=2, memory_entries=0)
+    cache.get_many(["a"], _fake_model(calls))
+    cache.get_many(["b"], _fake_model(calls))
+    cache.get_many(["a"], _fake_model(calls))  # touch "a"
+    cache.get_many(["c"], _fake_model(calls))  # evicts "b"
+
+    calls.clear()
+    cache.get_many(["a", "b", "c"], _fake_model(calls))
+    assert calls == [["b"]]
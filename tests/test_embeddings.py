@@ -0,0 +1,25 @@
+# tests/test_embeddings.py
+import numpy as np
+
+from rag_pipeline.embeddings import byte_embeddings, hashed_ngram_embeddings
+
+
+def test_byte_embeddings_match_per_byte_reference():
+    texts = ["hello", "", "café prices " * 100]
+    dim = 64
+    expected = np.zeros((len(texts), dim), dtype="float32")
+    for row, t in enumerate(texts):
+        for i, ch in enumerate(t.encode("utf-8")[:dim]):
+            expected[row, i] = ch / 255.0
+    np.testing.assert_array_equal(byte_embeddings(texts, dim), expected)
+
+
+def test_ngram_embeddings_rank_related_text_higher():
+    docs = ["Gold membership costs $49 per month", "Refunds take five business days"]
+    query = "how much is the gold membership?"
+    embs = hashed_ngram_embeddings(docs + [query], dim=256)
+    np.testing.assert_allclose(np.linalg.norm(embs, axis=1), 1.0, rtol=1e-5)
+    sims = embs[:2] @ embs[2]
+    assert sims[0] > sims[1]
+    # Batching must not change results.
+    np.testing.assert_allclose(hashed_ngram_embeddings([query], dim=256)[0], embs[2], rtol=1e-6)
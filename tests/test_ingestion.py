@@ -2,6 +2,7 @@
 from pathlib import Path
 
 from app.config import load_config
+from rag_pipeline.chunk_store import ChunkStore
 from rag_pipeline.ingestion import IngestionEngine
 
 
@@ -13,3 +14,70 @@ def test_ingestion_runs_on_sample(tmp_path: Path):
     engine = IngestionEngine(cfg.paths, cfg.rag)
     n_chunks = engine.ingest_files([sample])
     assert n_chunks > 0
+
+
+def _engine(tmp_path: Path) -> IngestionEngine:
+    cfg = load_config()
+    cfg.paths.vector_store_dir = tmp_path / "vs"
+    return IngestionEngine(cfg.paths, cfg.rag)
+
+
+def test_incremental_ingestion_only_embeds_changed_files(tmp_path: Path, monkeypatch):
+    engine = _engine(tmp_path)
+    a = tmp_path / "a.txt"
+    b = tmp_path / "b.txt"
+    a.write_text("Gold membership is $49 per month.", encoding="utf-8")
+    b.write_text("Refunds are processed within 5 days.", encoding="utf-8")
+    engine.ingest_files([a, b])
+
+    embedded = []
+    original = engine._embed_texts
+    monkeypatch.setattr(engine, "_embed_texts", lambda texts: embedded.extend(texts) or original(texts))
+
+    b.write_text("Refunds are processed within 10 days.", encoding="utf-8")
+    engine.ingest_files([a, b])
+    assert embedded == ["Refunds are processed within 10 days."]
+
+    chunks = ChunkStore.open(engine.paths.vector_store_dir)
+    assert sorted(c.content for c in chunks) == [
+        "Gold membership is $49 per month.",
+        "Refunds are processed within 10 days.",
+    ]
+
+
+def test_prune_missing_removes_deleted_documents(tmp_path: Path):
+    engine = _engine(tmp_path)
+    a = tmp_path / "a.txt"
+    b = tmp_path / "b.txt"
+    a.write_text("Gold membership is $49 per month.", encoding="utf-8")
+    b.write_text("Refunds are processed within 5 days.", encoding="utf-8")
+    engine.ingest_files([a, b])
+
+    engine.ingest_files([a], prune_missing=True)
+    chunks = ChunkStore.open(engine.paths.vector_store_dir)
+    assert {c.source for c in chunks} == {"a.txt"}
+
+
+def test_streaming_ingestion_embeds_in_batches_and_reports_progress(tmp_path: Path, monkeypatch):
+    engine = _engine(tmp_path)
+    engine.cfg.chunk_size_chars = 40
+    engine.cfg.chunk_overlap_chars = 0
+    engine.cfg.embed_batch_size = 3
+    files = []
+    for i in range(3):
+        path = tmp_path / f"doc{i}.txt"
+        path.write_text(" ".join(f"word{i}{j}" for j in range(40)), encoding="utf-8")
+        files.append(path)
+
+    batches = []
+    original = engine._embed_texts
+    monkeypatch.setattr(engine, "_embed_texts", lambda texts: batches.append(len(texts)) or original(texts))
+    snapshots = []
+    n_chunks = engine.ingest_files(files, progress=lambda p: snapshots.append((p.files_done, p.embedded)))
+
+    assert max(batches) <= 3
+    assert sum(batches) == n_chunks
+    assert snapshots[-1] == (3, n_chunks)
+    chunks = ChunkStore.open(engine.paths.vector_store_dir)
+    assert len(chunks) == n_chunks
+    assert [c.id for c in chunks][:2] == ["doc0.txt::p0::c0", "doc0.txt::p0::c1"]
@@ -0,0 +1,77 @@
+# tests/test_lead_store.py
+import csv
+import io
+from pathlib import Path
+
+from services.lead_store import LEAD_FIELDS, Lead, LeadStore
+
+
+def _lead(i: int) -> Lead:
+    return Lead(
+        timestamp=f"2024-01-01T00:00:{i:02d}",
+        source="chat",
+        name=f"Lead {i}",
+        email=f"lead{i}@example.com",
+        phone="+1 555 0100",
+        interest="gold membership" if i % 2 else "starter plan",
+        conversation_summary="Lead from chat",
+    )
+
+
+def test_batch_insert_count_and_pages(tmp_path: Path):
+    store = LeadStore(tmp_path / "leads.sqlite")
+    assert store.append_leads(_lead(i) for i in range(25)) == 25
+    store.append_lead("chat", "Ana", "ana@example.com", "555", "yoga", "summary")
+    assert store.count() == 26
+
+    first = store.query(limit=10)
+    assert first[0]["name"] == "Ana"  # newest first
+    assert len(store.query(limit=10, offset=20)) == 6
+    assert [r["name"] for r in store.query(email="lead3@example.com")] == ["Lead 3"]
+    assert len(store.query(interest="gold membership", limit=100)) == 12
+    assert len(store.query(since="2024-01-01T00:00:20", until="2024-01-01T00:00:23")) == 3
+
+
+def test_legacy_csv_is_imported_once_and_round_trips(tmp_path: Path):
+    legacy = tmp_path / "leads.csv"
+    with legacy.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=LEAD_FIELDS)
+        writer.writeheader()
+        for i in range(3):
+            writer.writerow(_lead(i).__dict__)
+
+    store = LeadStore(tmp_path / "leads.sqlite", legacy_csv=legacy)
+    store.close()
+    store = LeadStore(tmp_path / "leads.sqlite", legacy_csv=legacy)  # reopening does not re-import
+    assert store.count() == 3
+
+    out = io.StringIO()
+    assert store.export_csv(out) == 3
+    assert out.getvalue() == legacy.read_text(encoding="utf-8").replace("\n", "\r\n")
+
+
+def test_workers_starting_together_import_legacy_csv_once(tmp_path: Path):
+    import threading
+
+    legacy = tmp_path / "leads.csv"
+    with legacy.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=LEAD_FIELDS)
+        writer.writeheader()
+        for i in range(5000):
+            writer.writerow(_lead(i % 60).__dict__)
+
+    db = tmp_path / "leads.sqlite"
+    LeadStore(db).close()  # schema exists, legacy CSV not imported yet
+    start = threading.Barrier(4)
+    stores = []
+
+    def worker():
+        start.wait()
+        stores.append(LeadStore(db, legacy_csv=legacy))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(stores) == 4 and all(store.count() == 5000 for store in stores)
@@ -0,0 +1,109 @@
+# tests/test_lexical_index.py
+from dataclasses import replace
+from pathlib import Path
+
+from app.config import load_config
+from benchmarks.hybrid import run
+from rag_pipeline.index_manifest import IndexManifest
+from rag_pipeline.ingestion import IngestionEngine
+from rag_pipeline.lexical_index import LEXICAL_FILE, LexicalIndex, LexicalIndexWriter, tokenize
+from rag_pipeline.registry import ResourceRegistry
+
+
+def _cfg(tmp_path: Path):
+    cfg = load_config()
+    cfg.paths.vector_store_dir = tmp_path / "vs"
+    return cfg
+
+
+def test_tokenize_keeps_prices_and_codes_whole():
+    assert tokenize("The Gold 12-month plan is $49 (SKU GX-200).") == [
+        "gold", "12-month", "12", "month", "plan", "$49", "49", "sku", "gx-200", "gx", "200",
+    ]
+    assert tokenize("What is it?") == []
+
+
+def test_bm25_ranks_rare_exact_terms_first():
+    writer = LexicalIndexWriter(None)
+    writer.add(
+        [10, 11, 12],
+        ["gold plan costs $49 per month", "silver plan costs $29 per month", "gold gold gold plan"],
+    )
+    index = writer.build()
+    ids, scores = index.search(tokenize("$29 plan"), k=3)
+    assert ids[0] == 11 and len(ids) == 3 and scores[0] > scores[1]
+    ids, _ = index.search(tokenize("gold"), k=3)
+    assert ids.tolist() == [12, 10]  # higher term frequency first
+    assert index.search(["unknown"], k=3)[0].size == 0
+
+
+def test_writer_removes_stale_documents_and_unused_terms(tmp_path: Path):
+    writer = LexicalIndexWriter(None)
+    writer.add([0, 1], ["gold plan $49", "silver plan $29"])
+    base = writer.build()
+    base.save(tmp_path, revision="r1")
+
+    loaded = LexicalIndex.load(tmp_path)
+    assert loaded.revision == "r1" and len(loaded) == 2
+    writer = LexicalIndexWriter(loaded, stale_ids=[0])
+    writer.add([2], ["platinum plan $99"])
+    index = writer.build()
+
+    assert index.doc_ids.tolist() == [1, 2]
+    assert "gold" not in index.term_ids and "platinum" in index.term_ids
+    assert index.search(["plan"], k=5)[0].tolist() == [1, 2]
+    assert index.search(["$99"], k=5)[0].tolist() == [2]
+
+
+def test_ingestion_keeps_bm25_index_in_sync(tmp_path: Path):
+    cfg = _cfg(tmp_path)
+    reg = ResourceRegistry()
+    reg._models[cfg.rag.embedding_model_name] = None  # NumPy fallback embedding
+    gold, silver = tmp_path / "gold.txt", tmp_path / "silver.txt"
+    gold.write_text("Gold 12-month plan, SKU GX-4821, costs $49 per month.", encoding="utf-8")
+    silver.write_text("Silver 12-month plan, SKU SV-1037, costs $29 per month.", encoding="utf-8")
+    engine = IngestionEngine(cfg.paths, cfg.rag, registry=reg)
+    engine.ingest_files([gold, silver])
+
+    path = cfg.paths.vector_store_dir / LEXICAL_FILE
+    manifest = IndexManifest.load(cfg.paths.vector_store_dir / "manifest.json")
+    assert LexicalIndex.load(cfg.paths.vector_store_dir).revision == manifest.revision
+
+    engine.remove_documents(["silver.txt"])
+    lexical = LexicalIndex.load(cfg.paths.vector_store_dir)
+    assert len(lexical) == 1 and "sv-1037" not in lexical.term_ids
+
+    # A missing (or out-of-date) BM25 file is rebuilt from the chunk store.
+    path.unlink()
+    engine.ingest_files([gold, silver])
+    lexical = LexicalIndex.load(cfg.paths.vector_store_dir)
+    assert len(lexical) == 2 and "sv-1037" in lexical.term_ids
+
+
+def test_hybrid_search_finds_exact_sku(tmp_path: Path):
+    cfg = _cfg(tmp_path)
+    reg = ResourceRegistry()
+    reg._models[cfg.rag.embedding_model_name] = None
+    docs = []
+    for i, (sku, price) in enumerate([("GX-4821", "$49"), ("GX-4822", "$59"), ("GX-7310", "$69")]):
+        doc = tmp_path / f"plan{i}.txt"
+        doc.write_text(f"Plan {i} (SKU {sku}) costs {price} per month and includes classes.", encoding="utf-8")
+        docs.append(doc)
+    IngestionEngine(cfg.paths, cfg.rag, registry=reg).ingest_files(docs)
+    store = reg.vector_store(cfg.paths, cfg.rag)
+    assert store.lexical is not None and store.lexical.revision == store.revision
+
+    hits = store.search("what is in gx-7310?", top_k=1)
+    assert "GX-7310" in hits[0].metadata.content
+    assert 0.0 < hits[0].score <= 1.0
+    assert [h[0].metadata.content for h in store.search_many(["$59 plan"], top_k=1)] == [docs[1].read_text()]
+
+    store.cfg = replace(cfg.rag, hybrid_search=False)
+    assert all(h.score >= cfg.rag.score_threshold for h in store.search("what is in gx-7310?"))
+
+
+def test_hybrid_benchmark_runs_small():
+    results = run(n_plans=60, n_queries=12, k=5)
+    assert results["corpus"]["chunks"] == 60
+    assert results["hybrid"]["recall@5"] >= results["dense"]["recall@5"]
+    assert results["hybrid"]["recall@5_sku"] == 1.0
@@ -0,0 +1,73 @@
+# tests/test_query_context.py
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.config import load_config
+from rag_pipeline.agent import Agent, Intent
+from rag_pipeline.answer_cache import AnswerCache
+from rag_pipeline.ingestion import IngestionEngine
+from rag_pipeline.intent_classifier import EmbeddingIntentClassifier
+from rag_pipeline.query_context import QueryContext, as_query_context
+from rag_pipeline.rag_chain import RAGChain
+from rag_pipeline.registry import ResourceRegistry
+from services.llm_client import DummyLLMClient
+
+
+class _CountingEmbed:
+    def __init__(self, embed):
+        self.embed = embed
+        self.texts = []
+
+    def __call__(self, texts):
+        self.texts.extend(texts)
+        return self.embed(texts)
+
+
+def test_artifacts_are_computed_once_and_lazily():
+    embed = _CountingEmbed(lambda texts: np.ones((len(texts), 4), dtype="float32"))
+    query = QueryContext("  How much\n is gold? ", embed=embed, count_tokens=len)
+    assert query.timings == {} and embed.texts == []
+    assert query.normalized == "How much is gold?"
+    assert query.embedding.shape == (4,) and query.embedding is query.embedding
+    assert query.token_count == len("How much is gold?") == query.token_count
+    assert embed.texts == ["How much is gold?"]
+    assert set(query.timings) == {"embed_ms", "tokenize_ms"}
+
+    with pytest.raises(RuntimeError, match="embed"):
+        QueryContext("no model").embedding
+    # Strings are wrapped; a context keeps the functions it was created with.
+    assert as_query_context("hi", embed).embed is embed
+    assert as_query_context(query, lambda texts: None) is query and query.embed is embed
+
+
+def test_one_forward_pass_per_turn(tmp_path: Path):
+    cfg = load_config()
+    cfg.paths.vector_store_dir = tmp_path / "vs"
+    reg = ResourceRegistry()
+    reg._models[cfg.rag.embedding_model_name] = None  # NumPy fallback embedding
+    doc = tmp_path / "pricing.txt"
+    doc.write_text("Gold membership costs $49 per month. Joining is free in May.", encoding="utf-8")
+    IngestionEngine(cfg.paths, cfg.rag, registry=reg).ingest_files([doc])
+    store = reg.vector_store(cfg.paths, cfg.rag)
+
+    classifier = EmbeddingIntentClassifier(
+        store.embedder,
+        {Intent.SALES: ["how much is it to join", "gold membership price"], Intent.GENERAL: ["where are you located"]},
+    )
+    cache = AnswerCache(tmp_path / "answers.sqlite", space="test", dim=store.embedder.dim)
+    chain = RAGChain(DummyLLMClient(), store, answer_cache=cache)
+
+    for _ in range(2):  # the second turn is answered from the cache
+        embed = _CountingEmbed(store.embed_queries)
+        query = QueryContext("How much is the gold membership?", embed=embed)
+        answer, retrieved, _ = chain.answer(query, [])
+        _, intent, _, _ = Agent(classifier=classifier).process_turn(query, answer)
+        assert retrieved and intent == Intent.SALES
+        assert embed.texts == ["How much is the gold membership?"]
+    assert set(query.timings) == {"embed_ms", "tokenize_ms"}  # RAGChain supplied its token counter
+
+    # Plain strings still work everywhere.
+    assert store.search("How much is the gold membership?")[0].metadata.id == retrieved[0].metadata.id
+    assert Agent().process_turn("What does gold cost?", "")[1] == Intent.SALES
@@ -0,0 +1,115 @@
+# tests/test_rag_chain.py
+import numpy as np
+
+from rag_pipeline.answer_cache import AnswerCache
+from rag_pipeline.chunk_store import ChunkMetadata
+from rag_pipeline.rag_chain import RAGChain
+from rag_pipeline.retrieval import RetrievedChunk
+from services.llm_client import BaseLLMClient, DummyLLMClient
+
+
+class _StubStore:
+    revision = "r1"
+
+    def is_ready(self):
+        return True
+
+    def embed_queries(self, queries):
+        return np.ones((len(queries), 4), dtype="float32") / 2
+
+    def search_vectors(self, q_embs, top_k=None):
+        meta = ChunkMetadata("pricing.txt::p0::c0", "Gold is $49.", "pricing.txt", None, None)
+        return [[RetrievedChunk(metadata=meta, score=0.9)] for _ in q_embs]
+
+    def search(self, query, top_k=None):
+        return self.search_vectors(query.embedding[None, :], top_k)[0]
+
+
+class _CountingLLM(DummyLLMClient):
+    calls = 0
+
+    def generate(self, messages, max_tokens=512):
+        self.calls += 1
+        return super().generate(messages, max_tokens)
+
+
+class _FailingLLM(BaseLLMClient):
+    def generate(self, messages, max_tokens=512):
+        raise RuntimeError("boom")
+
+    def generate_stream(self, messages, max_tokens=512):
+        yield "Partial"
+        raise RuntimeError("boom")
+
+
+def test_answer_stream_matches_blocking_answer():
+    chain = RAGChain(DummyLLMClient(), _StubStore())
+    answer, _, _ = chain.answer("How much is gold?", [])
+    stream, retrieved, ids = chain.answer_stream("How much is gold?", [])
+    parts = list(stream)
+    assert len(parts) > 1
+    assert "".join(parts) == answer
+    assert ids == ["pricing.txt::p0::c0"] and retrieved[0].score == 0.9
+
+
+def test_answer_stream_falls_back_to_passages_on_error():
+    chain = RAGChain(_FailingLLM(), _StubStore())
+    text = "".join(chain.answer_stream("How much is gold?", [])[0])
+    assert text.startswith("Partial\n\nThere was an error")
+    assert "pricing.txt: Gold is $49." in text
+
+
+def test_answer_cache_skips_llm_and_respects_index_revision(tmp_path):
+    llm = _CountingLLM()
+    store = _StubStore()
+    cache = AnswerCache(tmp_path / "answers.sqlite", space="test", dim=4)
+    chain = RAGChain(llm, store, answer_cache=cache)
+
+    first, _, _ = chain.answer("How much is gold?", [])
+    second = "".join(chain.answer_stream("How much is gold?", [])[0])
+    assert second == first and llm.calls == 1
+
+    store.revision = "r2"  # re-ingestion
+    chain.answer("How much is gold?", [])
+    assert llm.calls == 2
+
+
+def test_answer_cache_hit_skips_prompt_packing(tmp_path):
+    cache = AnswerCache(tmp_path / "answers.sqlite", space="test", dim=4)
+    chain = RAGChain(DummyLLMClient(), _StubStore(), answer_cache=cache)
+    first, _, _ = chain.answer("How much is gold?", [])
+
+    packed = []
+    pack = chain.packer.pack
+    chain.packer.pack = lambda retrieved: packed.append(retrieved) or pack(retrieved)
+    assert chain.answer("How much is gold?", [])[0] == first
+    assert "".join(chain.answer_stream("How much is gold?", [])[0]) == first
+    assert packed == []
+
+
+def test_answer_cache_is_not_shared_between_models(tmp_path):
+    from services.async_llm_client import AsyncBaseLLMClient, SyncLLMClient
+
+    class _Model(AsyncBaseLLMClient):
+        def __init__(self, model_name, base_url="https://api.openai.com/v1"):
+            self.model_name, self.base_url, self.calls = model_name, base_url, 0
+
+        async def generate(self, messages, max_tokens=512):
+            self.calls += 1
+            return f"{self.model_name} says Gold is $49."
+
+    store = _StubStore()
+    cache = AnswerCache(tmp_path / "answers.sqlite", space="test", dim=4)
+    clients = [
+        SyncLLMClient(lambda: _Model("gpt-4o-mini")),
+        SyncLLMClient(lambda: _Model("gpt-4o")),
+        SyncLLMClient(lambda: _Model("gpt-4o", base_url="http://localhost:8000/v1")),
+    ]
+    answers = [RAGChain(llm, store, answer_cache=cache).answer("How much is gold?", [])[0] for llm in clients]
+    assert answers[0].startswith("gpt-4o-mini") and answers[1].startswith("gpt-4o says")
+    assert [llm.client.calls for llm in clients] == [1, 1, 1]
+    # The same model and endpoint still hit.
+    assert RAGChain(clients[1], store, answer_cache=cache).answer("How much is gold?", [])[0] == answers[1]
+    assert clients[1].client.calls == 1
+    for llm in clients:
+        llm.close()
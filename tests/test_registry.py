@@ -0,0 +1,71 @@
+# tests/test_registry.py
+from pathlib import Path
+
+from app.config import load_config
+from rag_pipeline import registry as registry_module
+from rag_pipeline.ingestion import IngestionEngine
+from rag_pipeline.registry import ResourceRegistry
+
+
+def test_embedding_model_loaded_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        registry_module, "_load_sentence_transformer", lambda name: calls.append(name)
+    )
+    reg = ResourceRegistry()
+    reg.embedding_model("m")
+    reg.embedding_model("m")
+    assert calls == ["m"]
+
+
+def test_vector_store_cached_until_ingestion_invalidates(tmp_path: Path):
+    cfg = load_config()
+    cfg.paths.vector_store_dir = tmp_path / "vs"
+    reg = ResourceRegistry()
+
+    store = reg.vector_store(cfg.paths, cfg.rag)
+    assert reg.vector_store(cfg.paths, cfg.rag) is store
+    assert not store.is_ready()
+
+    sample = tmp_path / "sample.txt"
+    sample.write_text("Our gold membership costs $49 per month.", encoding="utf-8")
+    IngestionEngine(cfg.paths, cfg.rag, registry=reg).ingest_files([sample])
+
+    fresh = reg.vector_store(cfg.paths, cfg.rag)
+    assert fresh is not store
+    assert fresh.is_ready()
+
+
+def test_lead_and_analytics_stores_shared_across_reruns(tmp_path: Path, monkeypatch):
+    cfg = load_config()
+    cfg.paths.leads_db = tmp_path / "leads.sqlite"
+    cfg.paths.leads_csv = tmp_path / "leads.csv"
+    cfg.paths.analytics_db = tmp_path / "analytics.sqlite"
+    reg = ResourceRegistry()
+
+    leads = reg.lead_store(cfg.paths)
+    analytics = reg.analytics_store(cfg.paths)
+    assert reg.lead_store(cfg.paths) is leads and reg.analytics_store(cfg.paths) is analytics
+
+    # The retention DELETE runs once per PRUNE_INTERVAL_S, not once per rerun.
+    prunes = []
+    prune = analytics.prune_rollups
+    monkeypatch.setattr(analytics, "prune_rollups", lambda now=None: prunes.append(now) or prune(now))
+    for _ in range(3):
+        reg.analytics_store(cfg.paths).add_record("How much?", "$49", "sales", [])
+    assert len(prunes) == 1
+
+
+def test_warm_up_builds_resources_in_background(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(registry_module, "_load_sentence_transformer", lambda name: None)
+    cfg = load_config()
+    cfg.paths.vector_store_dir = tmp_path / "vs"
+    cfg.paths.answer_cache_db = tmp_path / "answers.sqlite"
+    reg = ResourceRegistry()
+    assert reg.warmup_state() == "idle" and reg.is_warm()
+
+    reg.warm_up(cfg.paths, cfg.rag)
+    reg.warm_up(cfg.paths, cfg.rag)  # no second thread
+    assert reg.wait_warm(timeout=30)
+    assert reg.warmup_state() == "ready"
+    assert reg.vector_store(cfg.paths, cfg.rag) is reg.vector_store(cfg.paths, cfg.rag)
@@ -0,0 +1,121 @@
+# tests/test_reranker.py
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.config import load_config
+from benchmarks.rerank import run
+from rag_pipeline.chunk_store import ChunkMetadata
+from rag_pipeline.embeddings import hashed_ngram_embeddings
+from rag_pipeline.ingestion import IngestionEngine
+from rag_pipeline.query_context import QueryContext
+from rag_pipeline.rag_chain import RAGChain
+from rag_pipeline.registry import ResourceRegistry
+from rag_pipeline.reranker import Reranker
+from rag_pipeline.retrieval import RetrievedChunk
+from services.llm_client import DummyLLMClient
+
+
+def _chunk(i: int, content: str, score: float) -> RetrievedChunk:
+    return RetrievedChunk(ChunkMetadata(f"doc.txt::p0::c{i}", content, "doc.txt", None, None), score)
+
+
+class _FakeCrossEncoder:
+    """Scores a pair by how many question words the chunk contains."""
+
+    def __init__(self, delay_s: float = 0.0):
+        self.batches = []
+        self.delay_s = delay_s
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.batches.append(len(pairs))
+        time.sleep(self.delay_s)
+        return np.array([sum(w in text.lower() for w in question.lower().split()) for question, text in pairs])
+
+
+CANDIDATES = [
+    _chunk(0, "Opening hours are 6am to 10pm.", 0.9),
+    _chunk(1, "Gold membership costs $49 per month.", 0.8),
+    _chunk(2, "Silver membership costs $29 per month.", 0.7),
+    _chunk(3, "Parking is free for members.", 0.6),
+]
+
+
+def test_cross_encoder_reorders_in_batches_and_caches_scores():
+    model = _FakeCrossEncoder()
+    reranker = Reranker("cross_encoder", model=model, top_k=2, batch_size=3)
+    query = QueryContext("gold membership price")
+
+    hits = reranker.rerank(query, CANDIDATES, revision="r1")
+    assert [h.metadata.id for h in hits] == ["doc.txt::p0::c1", "doc.txt::p0::c2"]
+    assert [h.score for h in hits] == [2.0, 1.0]
+    assert model.batches == [3, 1]
+
+    # Same question and revision: served from the cache; a new revision is not.
+    assert reranker.rerank(query, CANDIDATES, revision="r1") == hits
+    assert model.batches == [3, 1]
+    reranker.rerank(query, CANDIDATES, revision="r2")
+    assert model.batches == [3, 1, 3, 1]
+
+
+def test_over_budget_keeps_retrieval_order():
+    model = _FakeCrossEncoder(delay_s=0.03)
+    reranker = Reranker("cross_encoder", model=model, top_k=2, batch_size=2, budget_ms=40)
+    query = QueryContext("gold membership price")
+
+    assert reranker.rerank(query, CANDIDATES) == CANDIDATES[:2]
+    assert model.batches == [2]  # the second batch would not have fit
+    # The batch that ran is cached, so the next turn gets further.
+    assert [h.metadata.id for h in reranker.rerank(query, CANDIDATES)][0] == "doc.txt::p0::c1"
+
+
+def test_mmr_skips_near_duplicates():
+    candidates = [
+        _chunk(0, "Gold membership costs $49 per month.", 0.9),
+        _chunk(1, "Gold membership costs $49 per month!", 0.88),
+        _chunk(2, "Towels are included with every membership.", 0.6),
+    ]
+    reranker = Reranker("mmr", embed=lambda texts: hashed_ngram_embeddings(texts, 256), top_k=2, mmr_lambda=0.5)
+    assert [h.metadata.id for h in reranker.rerank(QueryContext("gold"), candidates)] == [
+        "doc.txt::p0::c0",
+        "doc.txt::p0::c2",
+    ]
+    assert Reranker("none", top_k=2).rerank(QueryContext("gold"), candidates) == candidates[:2]
+    with pytest.raises(ValueError, match="Unknown reranker"):
+        Reranker("bm25")
+
+
+def test_rag_chain_overfetches_and_reranks(tmp_path: Path):
+    cfg = load_config()
+    cfg.paths.vector_store_dir = tmp_path / "vs"
+    cfg.rag.top_k = 2
+    cfg.rag.reranker = "cross_encoder"
+    reg = ResourceRegistry()
+    reg._models[cfg.rag.embedding_model_name] = None  # NumPy fallback embedding
+    reg._cross_encoders[cfg.rag.reranker_model] = None  # model unavailable: MMR
+    docs = []
+    for i, text in enumerate(["Gold membership costs $49 per month.", "Silver membership costs $29.", "We open at 6am."]):
+        doc = tmp_path / f"doc{i}.txt"
+        doc.write_text(text, encoding="utf-8")
+        docs.append(doc)
+    IngestionEngine(cfg.paths, cfg.rag, registry=reg).ingest_files(docs)
+    store = reg.vector_store(cfg.paths, cfg.rag)
+
+    reranker = reg.reranker(cfg.paths, cfg.rag)
+    assert reranker.mode == "mmr" and reranker is reg.reranker(cfg.paths, cfg.rag)
+    searched = []
+    search = store.search
+    store.search = lambda query, top_k=None: searched.append(top_k) or search(query, top_k)
+    chain = RAGChain(DummyLLMClient(), store, reranker=reranker)
+
+    _, retrieved, _ = chain.answer("How much is gold membership?", [])
+    assert searched == [cfg.rag.rerank_candidates]
+    assert 0 < len(retrieved) <= 2 and "Gold" in retrieved[0].metadata.content
+
+
+def test_rerank_benchmark_runs_small():
+    results = run(n_plans=40, n_queries=9)
+    assert set(results) == {"none", "mmr"}  # no cross-encoder model here
+    assert results["mmr"]["duplicate_share"] <= results["none"]["duplicate_share"]
@@ -0,0 +1,101 @@
+# tests/test_retrieval.py
+import json
+import pickle
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from app.config import load_config
+from rag_pipeline.embeddings import hashed_ngram_embeddings
+from rag_pipeline.ingestion import ChunkMetadata, IngestionEngine
+from rag_pipeline.registry import ResourceRegistry
+from rag_pipeline.vector_index import index_type_of
+
+
+def _cfg(tmp_path: Path):
+    cfg = load_config()
+    cfg.paths.vector_store_dir = tmp_path / "vs"
+    return cfg
+
+
+def test_search_returns_cosine_scores(tmp_path: Path):
+    cfg = _cfg(tmp_path)
+    reg = ResourceRegistry()
+    doc = tmp_path / "pricing.txt"
+    doc.write_text("Gold membership costs $49 per month.", encoding="utf-8")
+    IngestionEngine(cfg.paths, cfg.rag, registry=reg).ingest_files([doc])
+
+    store = reg.vector_store(cfg.paths, cfg.rag)
+    hits = store.search("Gold membership costs $49 per month.")
+    assert len(hits) == 1
+    assert abs(hits[0].score - 1.0) < 1e-4
+
+
+def test_legacy_l2_store_is_migrated_on_load(tmp_path: Path):
+    cfg = _cfg(tmp_path)
+    vs_dir = cfg.paths.vector_store_dir
+    vs_dir.mkdir()
+    texts = ["Gold membership costs $49 per month.", "Refunds take five days."]
+    legacy = faiss.IndexFlatL2(cfg.rag.fallback_embedding_dim)
+    legacy.add(hashed_ngram_embeddings(texts, cfg.rag.fallback_embedding_dim) * 3.0)
+    faiss.write_index(legacy, str(vs_dir / "index.faiss"))
+    with (vs_dir / "chunks.pkl").open("wb") as f:
+        pickle.dump([ChunkMetadata(f"doc::p0::c{i}", t, "doc.txt", None, None) for i, t in enumerate(texts)], f)
+
+    store = ResourceRegistry().vector_store(cfg.paths, cfg.rag)
+    hits = store.search("Refunds take five days.")
+    assert hits[0].metadata.content == "Refunds take five days."
+    assert abs(hits[0].score - 1.0) < 1e-4
+
+    manifest = json.loads((vs_dir / "manifest.json").read_text())
+    assert manifest["metric"] == "cosine" and manifest["format_version"] == 2
+    assert isinstance(faiss.read_index(str(vs_dir / "index.faiss")), faiss.IndexIDMap2)
+    assert np.isclose(store.index.index.reconstruct(0) @ store.index.index.reconstruct(0), 1.0)
+
+
+def test_auto_index_tier_switches_to_hnsw_and_handles_updates(tmp_path: Path):
+    cfg = _cfg(tmp_path)
+    cfg.rag.hnsw_min_vectors = 2
+    reg = ResourceRegistry()
+    engine = IngestionEngine(cfg.paths, cfg.rag, registry=reg)
+    a = tmp_path / "a.txt"
+    b = tmp_path / "b.txt"
+    a.write_text("Gold membership costs $49 per month.", encoding="utf-8")
+    b.write_text("Refunds take five days.", encoding="utf-8")
+    engine.ingest_files([a])
+    assert index_type_of(faiss.read_index(str(engine.index_path))) == "flat"
+
+    engine.ingest_files([a, b])
+    assert index_type_of(faiss.read_index(str(engine.index_path))) == "hnsw"
+
+    # HNSW cannot remove vectors: a changed document forces a rebuild.
+    b.write_text("Refunds take ten days.", encoding="utf-8")
+    engine.ingest_files([a, b])
+    store = reg.vector_store(cfg.paths, cfg.rag)
+    assert store.index.ntotal == 2
+    assert store.search("Refunds take ten days.")[0].metadata.content == "Refunds take ten days."
+
+
+def test_search_many_matches_single_query_search(tmp_path: Path):
+    cfg = _cfg(tmp_path)
+    reg = ResourceRegistry()
+    docs = {"a.txt": "Gold membership costs $49 per month.", "b.txt": "Refunds take five days."}
+    paths = []
+    for name, text in docs.items():
+        path = tmp_path / name
+        path.write_text(text, encoding="utf-8")
+        paths.append(path)
+    IngestionEngine(cfg.paths, cfg.rag, registry=reg).ingest_files(paths)
+
+    store = reg.vector_store(cfg.paths, cfg.rag)
+    queries = ["Refunds take five days.", "Gold membership costs $49 per month.", "zzzz"]
+    batched = store.search_many(queries, top_k=2)
+    assert len(batched) == 3
+    for query, hits in zip(queries, batched):
+        single = store.search(query, top_k=2)
+        assert [(h.metadata.id, round(h.score, 5)) for h in hits] == [
+            (h.metadata.id, round(h.score, 5)) for h in single
+        ]
+    assert batched[0][0].metadata.content == "Refunds take five days."
+    assert store.search_many([]) == []
@@ -0,0 +1,94 @@
+# tests/test_session_store.py
+from pathlib import Path
+
+import pytest
+
+from rag_pipeline.agent import Agent, LeadState
+from services.session_store import (
+    InMemorySessionStore,
+    RedisSessionStore,
+    SessionState,
+    SQLiteSessionStore,
+    dumps_state,
+    loads_state,
+)
+
+
+class FakeRedis:
+    """The three commands RedisSessionStore uses, with key expiry."""
+
+    def __init__(self):
+        self.data = {}
+        self.now = 0.0
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= self.now):
+            return None
+        return entry[0]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value, self.now + ex if ex else None)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def _state(n_messages: int = 2) -> SessionState:
+    history = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} about the gold membership"}
+        for i in range(n_messages)
+    ]
+    return SessionState(LeadState(name="Ana", email="ana@example.com"), history, questions_count=n_messages // 2)
+
+
+@pytest.mark.parametrize("n_messages", [2, 200])
+def test_serialization_round_trip_is_compact(n_messages):
+    state = _state(n_messages)
+    blob = dumps_state(state)
+    assert loads_state(blob) == state
+    assert blob[:1] == (b"z" if n_messages > 2 else b"j")
+    assert len(blob) < len(repr(state))
+
+
+def test_history_is_trimmed_to_the_latest_messages():
+    state = loads_state(dumps_state(_state(10), max_history=4))
+    assert [m["content"] for m in state.chat_history] == [f"message {i} about the gold membership" for i in range(6, 10)]
+
+
+def _stores(tmp_path: Path):
+    return [
+        InMemorySessionStore(ttl_s=60),
+        SQLiteSessionStore(tmp_path / "sessions.sqlite", ttl_s=60),
+        RedisSessionStore(ttl_s=60, client=FakeRedis()),
+    ]
+
+
+def test_sessions_are_isolated_and_resumable(tmp_path: Path):
+    for store in _stores(tmp_path):
+        agent = Agent()
+        agent.process_turn("My name is Ana", "Hello!")
+        store.put("a", SessionState(lead=agent.lead_state))
+        store.put("b", SessionState())
+
+        resumed = Agent(store.get("a").lead)
+        assert resumed.lead_state.name == "Ana"
+        assert store.get("b").lead == LeadState()
+        assert store.get("missing") is None
+        store.delete("a")
+        assert store.get("a") is None
+
+
+def test_sqlite_sessions_are_shared_between_connections_and_expire(tmp_path: Path):
+    writer = SQLiteSessionStore(tmp_path / "sessions.sqlite", ttl_s=60)
+    reader = SQLiteSessionStore(tmp_path / "sessions.sqlite", ttl_s=60)
+    writer.put("s1", _state())
+    assert reader.get("s1") == _state()
+
+    # Expired as soon as it is written; the writer's own sweep is not due yet.
+    expiring = SQLiteSessionStore(tmp_path / "sessions.sqlite", ttl_s=1e-9)
+    expiring._last_sweep = float("inf")
+    expiring.put("s2", _state())
+    assert reader.get("s2") is None
+    assert reader.purge_expired() == 1
+    assert len(reader) == 1
@@ -0,0 +1,41 @@
+# tests/test_tracing.py
+import json
+from pathlib import Path
+
+from services.tracing import Tracer
+
+
+def test_spans_feed_histograms_traces_and_exports(tmp_path: Path):
+    jsonl = tmp_path / "traces.jsonl"
+    tracer = Tracer(jsonl_path=jsonl)
+    with tracer.trace("chat_turn") as turn:
+        with tracer.span("embed"):
+            pass
+        with tracer.span("search"):
+            pass
+        with tracer.span("embed"):
+            pass
+    tracer.incr("rag_answers_total")
+
+    assert [s.name for s in turn.spans] == ["embed", "search", "embed"]
+    assert set(turn.stage_totals()) == {"embed", "search"}
+    assert turn.total_ms >= sum(turn.stage_totals().values())
+
+    summary = tracer.summary()
+    assert summary["embed"]["count"] == 2 and summary["chat_turn"]["count"] == 1
+    assert summary["embed"]["p50_ms"] <= summary["embed"]["p99_ms"]
+
+    text = tracer.prometheus_text()
+    assert 'rag_stage_seconds_bucket{stage="embed",le="+Inf"} 2' in text
+    assert 'rag_stage_seconds_count{stage="search"} 1' in text
+    assert "rag_answers_total 1" in text
+
+    exported = [json.loads(line) for line in jsonl.read_text().splitlines()]
+    assert exported[0]["name"] == "chat_turn" and len(exported[0]["spans"]) == 3
+
+
+def test_spans_outside_a_trace_are_still_measured():
+    tracer = Tracer()
+    with tracer.span("agent"):
+        pass
+    assert tracer.summary()["agent"]["count"] == 1